@@ -0,0 +1,39 @@
+"""Araç masraf uygulamasının Streamlit'ten bağımsız çekirdeği.
+
+Alt modüller (ve pandas) ilk kullanıldıklarında yüklenir; `import arac_core` hiçbir
+ağır modülü yüklemez ve dosya/ağ işlemi yapmaz.
+"""
+
+import importlib
+
+# Paket düzeyinde sunulan adlar -> tanımlandıkları alt modül
+_DISA_ACIK = {
+    "KATEGORILER_TUMU": "schema", "KATEGORILER_DIGER": "schema", "KM_GEREKEN_KATEGORILER": "schema",
+    "REQUIRED_COLUMNS": "schema", "SIRALAMA_SUTUNLARI": "schema", "create_empty_dataframe": "schema",
+    "Storage": "storage", "StorageError": "storage", "GoogleSheetsStorage": "storage",
+    "SQLiteStorage": "storage", "create_storage": "storage",
+    "changeset_from_editor": "storage", "diff_frames": "storage",
+    "compute_trips": "analysis", "fuel_records": "analysis", "expand_installments": "analysis",
+    "installments_due": "analysis", "monthly_fuel_summary": "analysis", "trip_averages": "analysis",
+    "Rollups": "rollups",
+    "RollingFuelMetrics": "consumption", "iter_outliers": "consumption", "flag_outliers": "consumption",
+    "OdometerIndex": "odometer", "forecast_maintenance": "maintenance", "forecast_fleet": "maintenance",
+    "SharedDataset": "shared", "ConflictError": "storage", "SheetDriftError": "storage",
+    "Fleet": "fleet",
+    "Settings": "config", "ConfigError": "config", "open_storage": "config", "open_fleet": "config",
+    "vehicle_sheets": "config",
+}
+
+__all__ = sorted(_DISA_ACIK)
+
+
+def __getattr__(ad):
+    if ad not in _DISA_ACIK:
+        raise AttributeError(f"module 'arac_core' has no attribute '{ad}'")
+    deger = getattr(importlib.import_module(f".{_DISA_ACIK[ad]}", __name__), ad)
+    globals()[ad] = deger
+    return deger
+
+
+def __dir__():
+    return __all__
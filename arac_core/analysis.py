@@ -0,0 +1,157 @@
+"""Yakıt ve masraf analizlerinin (trip, taksit) hesaplama motorları."""
+
+import numpy as np
+import pandas as pd
+
+TRIP_SUTUNLARI = [
+    "Başlangıç KM", "Bitiş KM", "Gidilen KM", "Tüketilen Litre",
+    "Harcanan Para (Trip)", "L/100km (Ort.)", "TL/km (Ort.)",
+]
+
+
+def fuel_records(df):
+    """Yakıt kayıtlarını KM'ye göre sıralı ve index'i sıfırlanmış olarak döndürür."""
+    return df[df["Masraf Türü"] == 'Yakıt'].sort_values(by="KM Sayacı").reset_index(drop=True)
+
+
+#
+# --- "TRIP" (FULL-TO-FULL) HESAPLAMASI ---
+#
+def compute_trips(yakit_df):
+    """'Full Dolum'dan 'Full Dolum'a tamamlanmış seyahatleri tek geçişte hesaplar.
+
+    yakit_df KM'ye göre sıralı olmalıdır (bkz. fuel_records). Her satıra, kendisinden
+    önceki 'Full Dolum' sayısı kadar bir segment numarası verilir; böylece bir trip,
+    başlangıç deposundan sonraki kısmi dolumlar ile bitiş deposunu içeren segmenttir.
+    Litre ve tutar toplamları segmentlere göre np.bincount ile tek seferde alınır.
+    Gidilen KM'si 0 olan tripler atlanır.
+    """
+    full_mu = (yakit_df["Dolum Türü"] == 'Full Dolum').to_numpy()
+    full_konumlar = np.flatnonzero(full_mu)
+    if len(full_konumlar) < 2:
+        return pd.DataFrame(columns=TRIP_SUTUNLARI)
+
+    km = yakit_df["KM Sayacı"].to_numpy(dtype=float)
+    litre = np.nan_to_num(yakit_df["Litre"].to_numpy(dtype=float))
+    tutar = np.nan_to_num(yakit_df["Tutar"].to_numpy(dtype=float))
+
+    # Segment k (k >= 1): (k-1). full dolumdan sonraki satırlar ile k. full dolum (dahil)
+    segment = np.cumsum(full_mu) - full_mu
+    trip_sayisi = len(full_konumlar) - 1
+    segment_litre = np.bincount(segment, weights=litre, minlength=trip_sayisi + 2)[1:trip_sayisi + 1]
+    segment_tutar = np.bincount(segment, weights=tutar, minlength=trip_sayisi + 2)[1:trip_sayisi + 1]
+
+    baslangic_km = km[full_konumlar[:-1]]
+    bitis_km = km[full_konumlar[1:]]
+    gidilen_km = bitis_km - baslangic_km
+
+    gecerli = gidilen_km > 0
+    gidilen = gidilen_km[gecerli]
+    return pd.DataFrame({
+        "Başlangıç KM": baslangic_km[gecerli].astype(int),
+        "Bitiş KM": bitis_km[gecerli].astype(int),
+        "Gidilen KM": gidilen.astype(int),
+        "Tüketilen Litre": segment_litre[gecerli],
+        "Harcanan Para (Trip)": segment_tutar[gecerli],
+        "L/100km (Ort.)": segment_litre[gecerli] / gidilen * 100,
+        "TL/km (Ort.)": segment_tutar[gecerli] / gidilen,
+    })
+
+
+def trip_averages(trip_raporlari_df):
+    """Tamamlanmış triplerin genel L/100km ve TL/km ortalamalarını döndürür."""
+    if trip_raporlari_df.empty:
+        return 0, 0
+
+    toplam_trip_km = trip_raporlari_df['Gidilen KM'].sum()
+    toplam_trip_litre = trip_raporlari_df['Tüketilen Litre'].sum()
+    toplam_trip_para = trip_raporlari_df['Harcanan Para (Trip)'].sum()
+
+    if toplam_trip_km <= 0:
+        return 0, 0
+    return (toplam_trip_litre / toplam_trip_km) * 100, toplam_trip_para / toplam_trip_km
+
+
+def monthly_fuel_summary(yakit_df):
+    """Her ay yakıta harcanan parayı ve alınan litreyi (sadece harcama olan aylar) döndürür."""
+    yakit_aylik = yakit_df.set_index('Tarih')
+    
+    aylik_ozet = yakit_aylik.resample('ME').agg(
+        Toplam_Harcanan_Para_TL=('Tutar', 'sum'),
+        Toplam_Alınan_Litre=('Litre', 'sum')
+    )
+    
+    return format_monthly_summary(aylik_ozet)
+
+
+def format_monthly_summary(aylik_ozet):
+    """Ay sonu tarihleriyle indexlenmiş (Toplam_Harcanan_Para_TL, Toplam_Alınan_Litre) tabloyu gösterime hazırlar."""
+    # Sadece harcama olan ayları göster
+    aylik_ozet = aylik_ozet[aylik_ozet['Toplam_Harcanan_Para_TL'] > 0]
+    
+    aylik_ozet = aylik_ozet.rename(columns={
+        'Toplam_Harcanan_Para_TL': 'Toplam Harcanan Para (TL)',
+        'Toplam_Alınan_Litre': 'Toplam Alınan Litre',
+    })
+    
+    aylik_ozet.index = aylik_ozet.index.strftime('%Y-%B')
+    return aylik_ozet.sort_index(ascending=False)
+
+
+def split_by_category(df):
+    """Masrafları tek geçişte kategorilere ayırır: {kategori: kategori_df}."""
+    return {kategori: grup for kategori, grup in df.groupby("Masraf Türü", sort=False, observed=True)}
+
+
+#
+# --- TAKSİT (ÖDEME PLANI) HESAPLAMASI ---
+#
+def _month_numbers(tarihler):
+    """Tarihleri 'yıl * 12 + ay' biçiminde tam sayı ay numarasına çevirir."""
+    return tarihler.astype('datetime64[M]').astype(np.int64)
+
+
+def expand_installments(df):
+    """Her masrafı taksit sayısı kadar aylık ödeme satırına açar.
+
+    Satırlar 'Taksit Sayısı' kadar tekrarlanır; i. taksitin tarihi, başlangıç ayına i ay
+    eklenerek bulunur ve gün, relativedelta'daki gibi ayın son gününe kırpılır.
+    Dönen sütunlar: "Ödeme Tarihi", "Kategori", "Ödeme Tutarı".
+    """
+    taksit = df['Taksit Sayısı'].to_numpy(dtype=np.int64)
+    gecerli = np.flatnonzero(taksit > 0)
+    adet = taksit[gecerli]
+
+    satir = np.repeat(gecerli, adet)
+    # Her tekrarın kendi satırı içindeki sırası (0, 1, ..., n-1)
+    ofset = np.arange(len(satir)) - np.repeat(np.cumsum(adet) - adet, adet)
+
+    tarih = df['Tarih'].to_numpy(dtype='datetime64[ns]')[satir]
+    gun_baslangici = tarih.astype('datetime64[D]')
+    ay_baslangici = tarih.astype('datetime64[M]')
+
+    hedef_ay = ay_baslangici + ofset.astype('timedelta64[M]')
+    ay_uzunlugu = (hedef_ay + 1).astype('datetime64[D]') - hedef_ay.astype('datetime64[D]')
+    gun = np.minimum(gun_baslangici - ay_baslangici.astype('datetime64[D]'), ay_uzunlugu - np.timedelta64(1, 'D'))
+    odeme_tarihi = hedef_ay.astype('datetime64[D]') + gun + (tarih - gun_baslangici)
+
+    return pd.DataFrame({
+        "Ödeme Tarihi": odeme_tarihi.astype('datetime64[ns]'),
+        "Kategori": df['Masraf Türü'].to_numpy()[satir],
+        "Ödeme Tutarı": (df['Tutar'].to_numpy(dtype=float) / np.maximum(taksit, 1))[satir],
+    })
+
+
+def installments_due(df, ay):
+    """Verilen aya (herhangi bir tarihi) düşen taksit ödemelerini kategori bazında toplar.
+
+    Ödeme satırları oluşturulmaz: i. taksit her zaman başlangıç ayından i ay sonraya
+    düştüğü için, bir masrafın o ay ödemesi olup olmadığı ay farkından bulunur.
+    """
+    taksit = df['Taksit Sayısı'].to_numpy(dtype=np.int64)
+    hedef = _month_numbers(np.datetime64(pd.Timestamp(ay), 'M'))
+    fark = hedef - _month_numbers(df['Tarih'].to_numpy(dtype='datetime64[ns]'))
+
+    odenecek = (taksit > 0) & (fark >= 0) & (fark < taksit)
+    tutar = df['Tutar'].to_numpy(dtype=float)[odenecek] / taksit[odenecek]
+    return pd.Series(tutar, index=df['Masraf Türü'].to_numpy()[odenecek]).groupby(level=0).sum()
@@ -0,0 +1,81 @@
+"""Veri sürümüne göre anahtarlanan, boyutu sınırlı analiz önbelleği."""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def data_version(df):
+    """DataFrame'in içeriğinden (index dahil) kısa bir sürüm damgası üretir.
+
+    Sadece veri yüklendiğinde hesaplanır (kayıtlar sıra numarasıyla sürümlenir, bkz.
+    SharedDataset); aynı içeriğe sahip oturumlar aynı damgayı alır ve önbelleği paylaşır.
+    """
+    ozet = hashlib.blake2b(digest_size=16)
+    ozet.update(str(len(df)).encode())
+    ozet.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return ozet.hexdigest()
+
+
+class AnalyticsCache:
+    """(sürüm, anahtar) → sonuç eşlemesi tutan, en az kullanılanı atan (LRU) önbellek.
+
+    Streamlit oturumları ayrı thread'lerde çalıştığı için erişimler kilitlenir.
+    Döndürülen sonuçlar paylaşılır; çağıran taraf onları değiştirmemelidir.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._kayitlar = OrderedDict()
+        self._kilit = threading.Lock()
+
+    def get_or_compute(self, surum, anahtar, fn, *args):
+        """Sonuç önbellekteyse döndürür, yoksa fn(*args) ile hesaplayıp saklar."""
+        tam_anahtar = (surum, anahtar)
+        with self._kilit:
+            if tam_anahtar in self._kayitlar:
+                self._kayitlar.move_to_end(tam_anahtar)
+                self.hits += 1
+                return self._kayitlar[tam_anahtar]
+            self.misses += 1
+
+        # Hesaplama kilit dışında yapılır; aynı anda iki oturum hesaplarsa sonuncusu kalır
+        sonuc = fn(*args)
+
+        with self._kilit:
+            self._kayitlar[tam_anahtar] = sonuc
+            self._kayitlar.move_to_end(tam_anahtar)
+            while len(self._kayitlar) > self.maxsize:
+                self._kayitlar.popitem(last=False)
+        return sonuc
+
+    def get(self, surum, anahtar, varsayilan=None):
+        """Sonuç önbellekteyse döndürür, yoksa varsayilan (hesaplama yapılmaz)."""
+        tam_anahtar = (surum, anahtar)
+        with self._kilit:
+            if tam_anahtar in self._kayitlar:
+                self._kayitlar.move_to_end(tam_anahtar)
+                self.hits += 1
+                return self._kayitlar[tam_anahtar]
+            self.misses += 1
+        return varsayilan
+
+    def put(self, surum, anahtar, sonuc):
+        """Başka yerde (örn. süreç havuzunda) hesaplanmış bir sonucu saklar."""
+        with self._kilit:
+            self._kayitlar[(surum, anahtar)] = sonuc
+            self._kayitlar.move_to_end((surum, anahtar))
+            while len(self._kayitlar) > self.maxsize:
+                self._kayitlar.popitem(last=False)
+
+    def clear(self):
+        """Bütün kayıtları siler."""
+        with self._kilit:
+            self._kayitlar.clear()
+
+    def __len__(self):
+        return len(self._kayitlar)
@@ -0,0 +1,317 @@
+"""Komut satırı: raporlar ve bakım işleri (sıkıştırma, içe/dışa aktarma) tarayıcı olmadan.
+
+Örnekler:
+    python -m arac_core summary
+    python -m arac_core report trips --format csv > tripler.csv
+    python -m arac_core report installments --month 2024-05
+    python -m arac_core report maintenance
+    python -m arac_core report rolling --days 90
+    python -m arac_core import eski_fisler.xlsx --validate-only
+    python -m arac_core export yedek.parquet
+    python -m arac_core compact
+    python -m arac_core flush --discard
+    python -m arac_core --arac "Kamyonet" summary
+    python -m arac_core fleet --format csv
+
+Ayarlar .streamlit/secrets.toml dosyasından (arayüzle aynı), yoksa ortam
+değişkenlerinden okunur. Ağır modüller sadece çalıştırılan komut için yüklenir.
+"""
+
+import argparse
+import os
+import sys
+
+from .config import DEFAULT_SECRETS_PATH, ConfigError, Settings, open_storage, read_secrets, vehicle_sheets
+
+RAPORLAR = ["trips", "monthly", "categories", "installments", "maintenance", "rolling", "outliers"]
+CIKTI_BICIMLERI = ["table", "csv", "json"]
+DISA_AKTARMA_KAPSAMLARI = ["all", "trips", "monthly"]
+
+
+def _settings(args):
+    """secrets.toml + ortam değişkenleri; komut satırı seçenekleri hepsinin önüne geçer."""
+    ayarlar = Settings(read_secrets(args.secrets))
+    ustune_yaz = {"STORAGE_BACKEND": args.backend, "SQLITE_PATH": args.sqlite}
+    if args.sync:
+        ustune_yaz["WRITE_BEHIND"] = False
+
+    def ayar(anahtar, varsayilan=None):
+        deger = ustune_yaz.get(anahtar)
+        return deger if deger is not None else ayarlar.get(anahtar, varsayilan)
+    return ayar
+
+
+def _sheet(args, ayar):
+    """--arac ile seçilen aracın çalışma sayfası (verilmezse ilk araç)."""
+    sayfalar = vehicle_sheets(ayar)
+    if args.arac is None:
+        return next(iter(sayfalar.values()))
+    if args.arac not in sayfalar:
+        raise ConfigError(f"'{args.arac}' adlı araç yok; araçlar: {', '.join(sayfalar)}")
+    return sayfalar[args.arac]
+
+
+def _load(args):
+    """Seçili aracın depolamasını açar ve veriyi yükler; (storage, df) döndürür."""
+    from .storage import StorageError
+
+    ayar = _settings(args)
+    storage = open_storage(ayar, sayfa=_sheet(args, ayar))
+    # Kapanmış oturumlardan devralınan yazmalar yüklemeden önce gönderilir (load beklemez)
+    flush = getattr(storage, "flush", None)
+    if flush is not None and not flush(timeout=300):
+        durum = storage.status()
+        raise StorageError(f"{durum['bekleyen']} bekleyen yazma gönderilemedi: {durum['son_hata']}")
+    df = storage.load()
+    for etiket, sutun, deger in storage.parse_errors:
+        print(f"uyarı: {etiket + 2}. satır, '{sutun}' okunamadı: {deger!r}", file=sys.stderr)
+    return storage, df
+
+
+def _finish(storage):
+    """Arka planda yazma açıksa kuyruk boşalana kadar bekler."""
+    flush = getattr(storage, "flush", None)
+    if flush is not None and not flush(timeout=300):
+        durum = storage.status()
+        print(f"hata: {durum['bekleyen']} yazma gönderilemedi: {durum['son_hata']}", file=sys.stderr)
+        return 2
+    return 0
+
+
+def _print_frame(df, bicim, index=False):
+    if bicim == "csv":
+        df.to_csv(sys.stdout, index=index, sep=";", decimal=",", date_format="%Y-%m-%d")
+    elif bicim == "json":
+        print(df.to_json(orient="records", force_ascii=False, date_format="iso", indent=2))
+    else:
+        print(df.to_string(index=index))
+
+
+#
+# --- KOMUTLAR ---
+#
+def cmd_summary(args):
+    from .rollups import Rollups
+
+    _, df = _load(args)
+    if df.empty:
+        print("Kayıt yok.")
+        return 0
+    rollups = Rollups.from_frame(df)
+    print(f"Kayıt sayısı : {len(df):,}")
+    print(f"Tarih aralığı: {df['Tarih'].min():%Y-%m-%d} - {df['Tarih'].max():%Y-%m-%d}")
+    print(f"Son KM       : {int(df['KM Sayacı'].max()):,}")
+    print(f"Toplam       : {rollups.total():,.2f} TL")
+    for kategori in sorted(rollups.kategoriler, key=rollups.total, reverse=True):
+        print(f"  {kategori:<18} {rollups.total(kategori):>14,.2f} TL  ({rollups.count(kategori):,} kayıt)")
+    return 0
+
+
+def cmd_report(args):
+    import pandas as pd
+
+    from .analysis import compute_trips, fuel_records, installments_due, monthly_fuel_summary
+    from .maintenance import forecast_maintenance
+
+    _, df = _load(args)
+    if args.name == "trips":
+        _print_frame(compute_trips(fuel_records(df)), args.format)
+    elif args.name == "monthly":
+        _print_frame(monthly_fuel_summary(fuel_records(df)).rename_axis("Ay").reset_index(), args.format)
+    elif args.name == "categories":
+        ozet = df.groupby("Masraf Türü", observed=True).agg(
+            Kayit=("Tutar", "size"), Toplam=("Tutar", "sum"), Son_Tarih=("Tarih", "max"),
+        ).sort_values("Toplam", ascending=False)
+        _print_frame(ozet.reset_index(), args.format)
+    elif args.name in ("rolling", "outliers"):
+        from .consumption import VARSAYILAN_PENCERE, RollingFuelMetrics, outlier_rows
+
+        metrikler = RollingFuelMetrics.from_frame(df, args.window or VARSAYILAN_PENCERE, args.days)
+        if args.name == "rolling":
+            _print_frame(metrikler.trips(), args.format)
+        else:
+            _print_frame(outlier_rows(metrikler.iter_trips(), "L/100km"), args.format)
+            _print_frame(outlier_rows(metrikler.iter_fills(), "TL/L"), args.format)
+    elif args.name == "maintenance":
+        _print_frame(forecast_maintenance(df, pd.Timestamp.now()).reset_index(), args.format)
+    else:
+        ay = pd.Timestamp(args.month) if args.month else pd.Timestamp.now()
+        odemeler = installments_due(df, ay)
+        _print_frame(odemeler.rename("Ödeme").rename_axis("Kategori").reset_index(), args.format)
+    return 0
+
+
+def cmd_compact(args):
+    storage, df = _load(args)
+    storage.rewrite(df)
+    sonuc = _finish(storage)
+    if sonuc == 0:
+        print(f"{len(df):,} kayıt sıralanıp baştan yazıldı.")
+    return sonuc
+
+
+def cmd_import(args):
+    from .importer import import_file
+
+    storage, df = _load(args)
+
+    def ilerleme(asama, tamamlanan, toplam):
+        if asama == "okuma":
+            print(f"\r{tamamlanan:,} satır okundu...", end="", file=sys.stderr)
+        else:
+            print(f"\r{tamamlanan:,} / {toplam:,} satır kaydedildi...", end="", file=sys.stderr)
+
+    with open(args.file, "rb") as dosya:
+        _, _, rapor = import_file(
+            dosya, args.file, storage, df, ondalik=args.decimal,
+            sadece_dogrula=args.validate_only, ilerleme=ilerleme,
+        )
+    print(file=sys.stderr)
+    for satir, sutun, deger, sebep in rapor["hatalar"]:
+        print(f"{satir}. satır, {sutun}: {sebep} ({deger!r})", file=sys.stderr)
+    print(f"{rapor['okunan']:,} satır okundu, {rapor['gecerli']:,} geçerli, {rapor['yazilan']:,} kaydedildi, "
+          f"{len(rapor['hatalar']):,} hatalı.")
+    if "hata" in rapor:
+        print(f"hata: kaydetme yarıda kaldı: {rapor['hata']}", file=sys.stderr)
+        return 2
+    return _finish(storage)
+
+
+def cmd_export(args):
+    from .analysis import compute_trips, fuel_records, monthly_fuel_summary
+    from .exporter import BICIMLER, export_frame
+
+    bicim = args.format or args.target.rsplit(".", 1)[-1].lower()
+    if bicim not in BICIMLER:
+        print(f"hata: biçim anlaşılamadı ('{bicim}'); --format ile {', '.join(BICIMLER)} seçin.", file=sys.stderr)
+        return 1
+
+    _, df = _load(args)
+    if args.scope == "trips":
+        df = compute_trips(fuel_records(df))
+    elif args.scope == "monthly":
+        df = monthly_fuel_summary(fuel_records(df)).rename_axis("Ay").reset_index()
+    with open(args.target, "wb") as hedef:
+        export_frame(df, bicim, hedef)
+    print(f"{len(df):,} satır '{args.target}' dosyasına yazıldı.")
+    return 0
+
+
+def cmd_flush(args):
+    from .config import journal_path, snapshot_path
+    from .snapshot import SheetSnapshot
+    from .write_behind import WriteJournal
+
+    ayar = _settings(args)
+    sayfa = _sheet(args, ayar)
+    # Sadece kapanmış oturumların günlükleri devralınır; çalışan arayüzün kuyruğuna dokunulmaz
+    gunluk = WriteJournal(journal_path(ayar, sayfa))
+    try:
+        bekleyen = gunluk.pending()
+        if not bekleyen:
+            print("Kapanmış oturumlardan kalan yazma yok.")
+            return 0
+        if args.discard:
+            # Gönderilemeyen yazmalar atılır; anlık görüntü E-Tabloyla artık uyuşmayabilir
+            gunluk.mark_done([i for i, _ in bekleyen])
+            SheetSnapshot(snapshot_path(ayar, sayfa)).invalidate()
+            print(f"{len(bekleyen)} bekleyen yazma atıldı.")
+            return 0
+    finally:
+        # Atılmayan işlemler dosyada kalır ve aşağıdaki depolama tarafından devralınır
+        gunluk.close()
+    print(f"{len(bekleyen)} bekleyen yazma gönderiliyor...")
+    storage, _ = _load(args)
+    return _finish(storage)
+
+
+def cmd_fleet(args):
+    import pandas as pd
+
+    from .config import open_fleet
+    from .fleet import Fleet, fleet_ranking
+
+    filo = Fleet(open_fleet(_settings(args)))
+    try:
+        durumlar, hatalar = filo.load_all()
+        for arac, hata in hatalar.items():
+            print(f"uyarı: '{arac}' yüklenemedi: {hata}", file=sys.stderr)
+        if not durumlar:
+            return 1
+        ay = pd.Timestamp(args.month) if args.month else pd.Timestamp.now()
+        ozetler, hesap_hatalari = filo.analyze(durumlar, ay)
+        for arac, hata in hesap_hatalari.items():
+            print(f"uyarı: '{arac}' hesaplanamadı: {hata}", file=sys.stderr)
+        hatalar.update(hesap_hatalari)
+        if not ozetler:
+            return 1
+        _print_frame(fleet_ranking(ozetler).reset_index(), args.format)
+    finally:
+        filo.shutdown()
+    return 2 if hatalar else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m arac_core", description="Araç masraf takibi - komut satırı")
+    parser.add_argument("--secrets", default=DEFAULT_SECRETS_PATH, help="secrets.toml yolu")
+    parser.add_argument("--backend", choices=["sheets", "sqlite"], help="Depolama motoru (STORAGE_BACKEND)")
+    parser.add_argument("--sqlite", help="SQLite dosyası (SQLITE_PATH)")
+    parser.add_argument("--sync", action="store_true", help="Arka planda yazma (WRITE_BEHIND) kapalı, doğrudan yaz")
+    parser.add_argument("--arac", help="Filoda işlem yapılacak araç (ARACLAR), varsayılan ilk araç")
+    komutlar = parser.add_subparsers(dest="command", required=True)
+
+    komutlar.add_parser("summary", help="Kayıt sayısı ve kategori toplamları").set_defaults(func=cmd_summary)
+
+    rapor = komutlar.add_parser("report", help="Trip, aylık yakıt, kategori, taksit, bakım veya kayan ortalama raporu")
+    rapor.add_argument("name", choices=RAPORLAR)
+    rapor.add_argument("--month", help="installments için ay (YYYY-MM), varsayılan bu ay")
+    rapor.add_argument("--window", type=int, help="rolling için pencere (son N trip), varsayılan 5")
+    rapor.add_argument("--days", type=int, help="rolling için pencere son N gün (--window yerine)")
+    rapor.add_argument("--format", choices=CIKTI_BICIMLERI, default="table")
+    rapor.set_defaults(func=cmd_report)
+
+    komutlar.add_parser("compact", help="Sayfayı sıralayıp baştan yaz").set_defaults(func=cmd_compact)
+
+    ice = komutlar.add_parser("import", help="CSV/XLSX dosyasından toplu içe aktar")
+    ice.add_argument("file")
+    ice.add_argument("--decimal", choices=[",", "."], default=",", help="Ondalık ayırıcı")
+    ice.add_argument("--validate-only", action="store_true", help="Sadece doğrula, kaydetme")
+    ice.set_defaults(func=cmd_import)
+
+    disa = komutlar.add_parser("export", help="Veriyi veya raporları dosyaya aktar")
+    disa.add_argument("target", help="Hedef dosya (.csv, .parquet, .xlsx)")
+    disa.add_argument("--scope", choices=DISA_AKTARMA_KAPSAMLARI, default="all")
+    disa.add_argument("--format", choices=["csv", "parquet", "xlsx"])
+    disa.set_defaults(func=cmd_export)
+
+    filo = komutlar.add_parser("fleet", help="Araçların maliyet ve tüketim karşılaştırması")
+    filo.add_argument("--month", help="Bu ayki ödeme için ay (YYYY-MM), varsayılan bu ay")
+    filo.add_argument("--format", choices=CIKTI_BICIMLERI, default="table")
+    filo.set_defaults(func=cmd_fleet)
+
+    bosalt = komutlar.add_parser("flush", help="Kapanmış oturumlardan kalan arka plan yazmalarını gönder")
+    bosalt.add_argument("--discard", action="store_true", help="Göndermeden at (gönderilemeyen yazmalar için)")
+    bosalt.set_defaults(func=cmd_flush)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except ConfigError as e:
+        print(f"hata: {e}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # Çıktı 'head' gibi bir komuta bağlanmış ve erken kapanmış; çıkışta tekrar hata verilmesin
+        sys.stdout = open(os.devnull, "w")
+        return 0
+    except Exception as e:
+        from .exporter import ExportError
+        from .importer import BulkImportError
+        from .storage import StorageError
+
+        if isinstance(e, (StorageError, BulkImportError, ExportError)):
+            print(f"hata: {e}", file=sys.stderr)
+            return 1
+        raise
@@ -0,0 +1,188 @@
+"""Ayarlar, Google kimlik bilgileri ve depolamanın kurulması (Streamlit'e bağlı değildir).
+
+Arayüz ayarları st.secrets'tan, komut satırı .streamlit/secrets.toml dosyasından okur;
+ikisinde de ortam değişkenleri yedek olarak kullanılır.
+"""
+
+import os
+
+# Google Sheets'e bağlanmak için gerekli yetki kapsamları
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+]
+
+# Google E-Tablonuzun tam adı
+GOOGLE_SHEET_NAME = "Arac Masraflari"
+# E-Tablonuzdaki çalışma sayfasının adı
+WORKSHEET_NAME = "Veriler"
+
+# Filo: ARACLAR ayarı araç adlarının listesi (her aracın verisi kendi adını taşıyan çalışma
+# sayfasında) veya {araç adı: çalışma sayfası} tablosudur. Verilmezse tek araç vardır ve
+# verisi WORKSHEET_NAME sayfasındadır.
+VARSAYILAN_ARAC = "Araç"
+
+# Depolama motoru: "sheets" (Google Sheets) veya "sqlite" (yerel dosya).
+# st.secrets veya ortam değişkeni ile değiştirilebilir.
+VARSAYILAN_DEPOLAMA = "sheets"
+
+# Google Sheets yazmaları önce yerel günlüğe alınıp arka planda gönderilsin mi (WRITE_BEHIND)
+VARSAYILAN_ARKA_PLAN_YAZMA = True
+
+# Yerelde çalışırken kullanılan servis hesabı dosyası ve Streamlit'in secrets dosyası
+LOCAL_CREDS_PATH = "google_credentials.json"
+DEFAULT_SECRETS_PATH = os.path.join(".streamlit", "secrets.toml")
+
+
+class ConfigError(Exception):
+    """Ayarlar veya kimlik bilgileri okunamadığında kullanıcıya gösterilecek hatalar."""
+
+
+def parse_flag(deger):
+    """Evet/hayır ayarını okur ("1", "true", "evet" gibi metinleri de kabul eder)."""
+    if isinstance(deger, str):
+        return deger.strip().lower() in ("1", "true", "yes", "on", "evet")
+    return bool(deger)
+
+
+def read_secrets(path=DEFAULT_SECRETS_PATH):
+    """Streamlit secrets.toml dosyasını okur; dosya yoksa boş sözlük döndürür."""
+    import tomllib
+
+    try:
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    except FileNotFoundError:
+        return {}
+    except tomllib.TOMLDecodeError as e:
+        raise ConfigError(f"'{path}' okunamadı: {e}")
+
+
+class Settings:
+    """Ayarları önce secrets sözlüğünden, yoksa ortam değişkenlerinden okur."""
+
+    def __init__(self, secrets=None, environ=None):
+        self.secrets = secrets or {}
+        self.environ = os.environ if environ is None else environ
+
+    def get(self, anahtar, varsayilan=None):
+        if anahtar in self.secrets:
+            return self.secrets[anahtar]
+        return self.environ.get(anahtar, varsayilan)
+
+
+def load_credentials(ayar, creds_path=LOCAL_CREDS_PATH):
+    """Servis hesabı bilgilerini GOOGLE_SHEETS_CREDENTIALS ayarından, yoksa yerel dosyadan okur.
+
+    ayar, (anahtar, varsayilan) alan bir fonksiyondur (örn. Settings.get).
+    """
+    from google.oauth2.service_account import Credentials
+
+    bilgiler = ayar("GOOGLE_SHEETS_CREDENTIALS")
+    if bilgiler:
+        try:
+            return Credentials.from_service_account_info(dict(bilgiler), scopes=SCOPES)
+        except Exception as e:
+            raise ConfigError(f"Secrets ile kimlik doğrulama hatası: {e}")
+
+    if not os.path.exists(creds_path):
+        raise ConfigError(f"Yerel '{creds_path}' dosyası bulunamadı ({os.path.abspath(creds_path)}).")
+    try:
+        return Credentials.from_service_account_file(creds_path, scopes=SCOPES)
+    except Exception as e:
+        raise ConfigError(f"Yerel '{creds_path}' dosyası ile kimlik doğrulama hatası: {e}")
+
+
+def vehicle_sheets(ayar):
+    """{araç adı: çalışma sayfası adı}, ayarlardaki sırayla (bkz. ARACLAR)."""
+    araclar = ayar("ARACLAR", None)
+    if not araclar:
+        return {VARSAYILAN_ARAC: WORKSHEET_NAME}
+    if hasattr(araclar, "items"):
+        return {str(arac): str(sayfa) for arac, sayfa in araclar.items()}
+    if isinstance(araclar, str):
+        araclar = [arac.strip() for arac in araclar.split(",") if arac.strip()]
+    return {str(arac): str(arac) for arac in araclar}
+
+
+def sqlite_table(sayfa):
+    """Çalışma sayfasına karşılık gelen SQLite tablosu (tek araçta eski 'masraflar' tablosu)."""
+    from .storage import DEFAULT_SQLITE_TABLE
+
+    if sayfa == WORKSHEET_NAME:
+        return DEFAULT_SQLITE_TABLE
+    return f"{DEFAULT_SQLITE_TABLE}_{sayfa}".replace('"', '')
+
+
+#
+# --- YEREL DOSYA YOLLARI ---
+#
+def cache_dir(ayar):
+    from .snapshot import DEFAULT_SNAPSHOT_DIR
+
+    return ayar("SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR)
+
+
+def snapshot_path(ayar, sayfa=WORKSHEET_NAME):
+    """Çalışma sayfasının yerel Parquet anlık görüntüsünün yolu."""
+    return os.path.join(cache_dir(ayar), f"{GOOGLE_SHEET_NAME}-{sayfa}.parquet")
+
+
+def journal_path(ayar, sayfa=WORKSHEET_NAME):
+    """Arka planda yazma günlüklerinin ortak yolu (her süreç yanında kendi dosyasını açar, bkz. WriteJournal)."""
+    return os.path.join(cache_dir(ayar), f"{GOOGLE_SHEET_NAME}-{sayfa}.journal.jsonl")
+
+
+def _is_sheets(ayar):
+    return (ayar("STORAGE_BACKEND", VARSAYILAN_DEPOLAMA) or "sheets").lower() == "sheets"
+
+
+def _client_pool(ayar):
+    from .sheets_client import SheetsClientPool
+
+    return SheetsClientPool(load_credentials(ayar))
+
+
+def open_storage(ayar, worksheet_provider=None, on_error=None, sayfa=WORKSHEET_NAME):
+    """Ayarlara göre bir çalışma sayfasının (aracın) depolamasını kurar.
+
+    WRITE_BEHIND açıksa arka plan yazıcısıyla sarar. worksheet_provider verilmezse Google
+    kimlik bilgileri okunup bir istemci havuzu açılır.
+    """
+    from .storage import DEFAULT_SQLITE_PATH, create_storage
+    from .write_behind import WriteBehindStorage, WriteJournal
+
+    if worksheet_provider is None and _is_sheets(ayar):
+        pool = _client_pool(ayar)
+        worksheet_provider = lambda: pool.worksheet(GOOGLE_SHEET_NAME, sayfa)
+        on_error = on_error or pool.handle_error
+
+    storage = create_storage(
+        ayar("STORAGE_BACKEND", VARSAYILAN_DEPOLAMA),
+        worksheet_provider=worksheet_provider,
+        sqlite_path=ayar("SQLITE_PATH", DEFAULT_SQLITE_PATH),
+        snapshot_path=snapshot_path(ayar, sayfa),
+        sqlite_table=sqlite_table(sayfa),
+    )
+    if storage.supports_planning and parse_flag(ayar("WRITE_BEHIND", VARSAYILAN_ARKA_PLAN_YAZMA)):
+        storage = WriteBehindStorage(storage, WriteJournal(journal_path(ayar, sayfa)), on_error=on_error)
+    return storage
+
+
+def open_fleet(ayar, worksheet_provider_for=None, on_error=None):
+    """Her aracın depolamasını kurar: {araç adı: storage}.
+
+    worksheet_provider_for(sayfa) o sayfanın bağlantı fonksiyonunu döndürür; verilmezse
+    bütün araçlar tek bir istemci havuzunu paylaşır.
+    """
+    if worksheet_provider_for is None and _is_sheets(ayar):
+        pool = _client_pool(ayar)
+        worksheet_provider_for = lambda sayfa: (lambda: pool.worksheet(GOOGLE_SHEET_NAME, sayfa))
+        on_error = on_error or pool.handle_error
+
+    return {
+        arac: open_storage(
+            ayar, worksheet_provider_for(sayfa) if worksheet_provider_for else None, on_error, sayfa=sayfa,
+        )
+        for arac, sayfa in vehicle_sheets(ayar).items()
+    }
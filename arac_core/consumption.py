@@ -0,0 +1,236 @@
+"""Kayan (son N trip veya son N gün) tüketim ve litre fiyatı metrikleri, aykırı dolum tespiti."""
+
+import copy
+
+import numpy as np
+import pandas as pd
+
+from .analysis import fuel_records
+
+# Kayan ortalamalar varsayılan olarak son bu kadar trip (ve dolum) üzerinden alınır
+VARSAYILAN_PENCERE = 5
+# Bir değer, kendinden önceki bu kadar değerle karşılaştırılır (aykırı değer tespiti)
+VARSAYILAN_REFERANS = 30
+VARSAYILAN_Z_ESIGI = 3.0
+VARSAYILAN_IQR_KATSAYISI = 1.5
+# Referans penceresinde bundan az değer varsa karar verilmez
+_EN_AZ_REFERANS = 8
+# Bu kadar parça birikince parçalar tek tabloda birleştirilir
+_EN_COK_PARCA = 32
+
+KAYAN_TRIP_SUTUNLARI = [
+    "Bitiş Tarihi", "Başlangıç KM", "Bitiş KM", "Gidilen KM", "Tüketilen Litre", "Harcanan Para (Trip)",
+    "L/100km", "TL/km", "L/100km (Kayan)", "TL/km (Kayan)",
+]
+KAYAN_DOLUM_SUTUNLARI = ["Tarih", "KM Sayacı", "Litre", "Tutar", "TL/L", "TL/L (Kayan)"]
+
+
+def _window_sums(zaman, degerler, pencere, gun):
+    """Her satırın penceresindeki (kendisi dahil son pencere satır veya son gun gün) toplamlar.
+
+    zaman, artmayan yerleri önceki değere çekilmiş datetime64[ns] dizisidir; degerler
+    (satır, sütun) biçimindedir. Toplamlar kümülatif toplamların farkıyla tek seferde alınır.
+    """
+    kumulatif = np.vstack([np.zeros((1, degerler.shape[1])), np.cumsum(degerler, axis=0)])
+    son = np.arange(1, len(degerler) + 1)
+    if gun is None:
+        bas = np.maximum(son - pencere, 0)
+    else:
+        bas = np.searchsorted(zaman, zaman - np.timedelta64(gun, "D"), side="right")
+    return kumulatif[son] - kumulatif[bas]
+
+
+def _monotonic(tarihler):
+    """Tarihleri, geri giden (veya boş) değerleri öncekine çekerek artmayan olmaktan çıkarır."""
+    tam = np.asarray(tarihler, dtype="datetime64[ns]").view(np.int64)
+    return np.maximum.accumulate(tam).view("datetime64[ns]")
+
+
+class RollingFuelMetrics:
+    """Full-to-Full triplerin ve dolumların kayan ortalamaları; yeni yakıt kayıtlarıyla artımlı uzar.
+
+    Pencere son `pencere` trip/dolum veya (gun verilirse) son `gun` gündür. Kayan L/100km
+    ve TL/km, penceredeki triplerin toplam litre ve tutarının toplam KM'ye oranıdır; kayan
+    TL/L de penceredeki dolumların toplam tutarının toplam litreye oranıdır.
+
+    Durum, pencerenin son satırları ile son Full Dolum'dan beri bekleyen kısmi dolumlardır.
+    extend, sadece yeni kayıtları (vektörel olarak) işleyip yeni bir nesne döndürür;
+    önceki sonuç parçaları kopyalanmadan paylaşılır. Yeni kayıtlar son KM'den geride
+    kalıyorsa (araya giren veya düzeltilen kayıt) artımlı hesap mümkün değildir: None.
+    """
+
+    def __init__(self, pencere=VARSAYILAN_PENCERE, gun=None):
+        self.pencere = pencere
+        self.gun = gun
+        self._son_km = -np.inf
+        self._full_km = np.nan
+        self._bekleyen = np.zeros(2)
+        self._trip_kuyrugu = None
+        self._dolum_kuyrugu = None
+        self._trip_parcalari = ()
+        self._dolum_parcalari = ()
+
+    @classmethod
+    def from_frame(cls, df, pencere=VARSAYILAN_PENCERE, gun=None):
+        metrikler = cls(pencere, gun)
+        metrikler._consume(fuel_records(df))
+        return metrikler
+
+    def extend(self, df_yeni):
+        """Yeni satırların yakıt kayıtları eklenmiş bir kopya; artımlı eklenemiyorsa None."""
+        yakit = fuel_records(df_yeni)
+        if yakit.empty:
+            return self
+        if yakit["KM Sayacı"].iloc[0] <= self._son_km:
+            return None
+        kopya = copy.copy(self)
+        kopya._consume(yakit)
+        return kopya
+
+    def _roll(self, kuyruk, yeni, zaman_sutunu, sutunlar):
+        """Yeni satırların pencere toplamları ve sonraki pencereler için gereken son satırlar.
+
+        kuyruk, önceki çağrıdan kalan son satırlardır (ilk çağrıda None); pencere onlarla
+        birlikte hesaplanır.
+        """
+        birlesik = yeni[[zaman_sutunu] + sutunlar]
+        onceki = 0 if kuyruk is None else len(kuyruk)
+        if onceki:
+            birlesik = pd.concat([kuyruk, birlesik], ignore_index=True)
+        zaman = _monotonic(birlesik[zaman_sutunu])
+        toplamlar = _window_sums(zaman, birlesik[sutunlar].to_numpy(dtype=float), self.pencere, self.gun)
+        if self.gun is None:
+            kalan = max(len(birlesik) - (self.pencere - 1), 0)
+        else:
+            kalan = np.searchsorted(zaman, zaman[-1] - np.timedelta64(self.gun, "D"), side="right")
+        return toplamlar[onceki:], birlesik.iloc[kalan:].reset_index(drop=True)
+
+    @staticmethod
+    def _append(parcalar, parca):
+        if len(parcalar) >= _EN_COK_PARCA:
+            return (pd.concat(parcalar + (parca,), ignore_index=True),)
+        return parcalar + (parca,)
+
+    def _consume(self, yakit):
+        """KM'ye göre sıralı yeni yakıt kayıtlarını işler (compute_trips ile aynı trip tanımı)."""
+        km = yakit["KM Sayacı"].to_numpy(dtype=float)
+        litre = np.nan_to_num(yakit["Litre"].to_numpy(dtype=float))
+        tutar = np.nan_to_num(yakit["Tutar"].to_numpy(dtype=float))
+        tarih = yakit["Tarih"].to_numpy(dtype="datetime64[ns]")
+        full_mu = (yakit["Dolum Türü"] == 'Full Dolum').to_numpy()
+        full_konumlar = np.flatnonzero(full_mu)
+        self._son_km = km[-1]
+
+        # Segment k: (k-1). full dolumdan sonraki satırlar ile k. full dolum (dahil). Segment 0,
+        # önceki çağrıdan bekleyen kısmi dolumlarla birlikte önceki son full dolumdan başlayan tripi kapatır
+        segment = np.cumsum(full_mu) - full_mu
+        n = len(full_konumlar)
+        segment_litre = np.bincount(segment, weights=litre, minlength=n + 1)
+        segment_tutar = np.bincount(segment, weights=tutar, minlength=n + 1)
+        segment_litre[0] += self._bekleyen[0]
+        segment_tutar[0] += self._bekleyen[1]
+        self._bekleyen = np.array([segment_litre[n], segment_tutar[n]])
+
+        baslangic_km = np.r_[self._full_km, km[full_konumlar[:-1]]]
+        bitis_km = km[full_konumlar]
+        if n:
+            self._full_km = bitis_km[-1]
+        gidilen = bitis_km - baslangic_km
+        # İlk full dolumdan öncesi ve KM'si değişmeyen tripler atlanır (bkz. compute_trips)
+        gecerli = np.nan_to_num(gidilen) > 0
+
+        tripler = pd.DataFrame({
+            "Bitiş Tarihi": tarih[full_konumlar][gecerli],
+            "Başlangıç KM": baslangic_km[gecerli].astype(int),
+            "Bitiş KM": bitis_km[gecerli].astype(int),
+            "Gidilen KM": gidilen[gecerli].astype(int),
+            "Tüketilen Litre": segment_litre[:n][gecerli],
+            "Harcanan Para (Trip)": segment_tutar[:n][gecerli],
+        })
+        if len(tripler):
+            tripler["L/100km"] = tripler["Tüketilen Litre"] / tripler["Gidilen KM"] * 100
+            tripler["TL/km"] = tripler["Harcanan Para (Trip)"] / tripler["Gidilen KM"]
+            toplamlar, self._trip_kuyrugu = self._roll(
+                self._trip_kuyrugu, tripler, "Bitiş Tarihi", ["Gidilen KM", "Tüketilen Litre", "Harcanan Para (Trip)"],
+            )
+            tripler["L/100km (Kayan)"] = toplamlar[:, 1] / toplamlar[:, 0] * 100
+            tripler["TL/km (Kayan)"] = toplamlar[:, 2] / toplamlar[:, 0]
+            self._trip_parcalari = self._append(self._trip_parcalari, tripler)
+
+        dolum = litre > 0
+        dolumlar = pd.DataFrame({
+            "Tarih": tarih[dolum], "KM Sayacı": km[dolum].astype(int), "Litre": litre[dolum], "Tutar": tutar[dolum],
+        })
+        if len(dolumlar):
+            dolumlar["TL/L"] = dolumlar["Tutar"] / dolumlar["Litre"]
+            toplamlar, self._dolum_kuyrugu = self._roll(self._dolum_kuyrugu, dolumlar, "Tarih", ["Litre", "Tutar"])
+            dolumlar["TL/L (Kayan)"] = toplamlar[:, 1] / toplamlar[:, 0]
+            self._dolum_parcalari = self._append(self._dolum_parcalari, dolumlar)
+
+    # --- Okuma ---
+
+    def iter_trips(self):
+        """Tripleri parça parça döndürür (hepsi tek tabloda birleştirilmeden)."""
+        yield from self._trip_parcalari
+
+    def iter_fills(self):
+        """Dolumları parça parça döndürür."""
+        yield from self._dolum_parcalari
+
+    def trips(self):
+        """Bütün tripler ve kayan ortalamaları (KAYAN_TRIP_SUTUNLARI)."""
+        if not self._trip_parcalari:
+            return pd.DataFrame(columns=KAYAN_TRIP_SUTUNLARI)
+        return pd.concat(self._trip_parcalari, ignore_index=True)
+
+    def fills(self):
+        """Bütün dolumlar, litre fiyatları ve kayan litre fiyatı (KAYAN_DOLUM_SUTUNLARI)."""
+        if not self._dolum_parcalari:
+            return pd.DataFrame(columns=KAYAN_DOLUM_SUTUNLARI)
+        return pd.concat(self._dolum_parcalari, ignore_index=True)
+
+
+#
+# --- AYKIRI DEĞER TESPİTİ ---
+#
+def iter_outliers(parcalar, sutun, yontem="iqr", esik=None, referans=VARSAYILAN_REFERANS):
+    """Parça parça gelen kayıtlarda sutun'un aykırı değerlerini işaretler (üreteç).
+
+    Her değer kendinden önceki `referans` değerle karşılaştırılır: "z" yönteminde
+    ortalamadan esik (varsayılan 3) standart sapmadan, "iqr" yönteminde çeyreklerden
+    esik (varsayılan 1.5) çeyrekler açıklığından fazla uzaksa aykırıdır. Her parça
+    "Alt Sınır", "Üst Sınır" ve "Aykırı" sütunları eklenerek döner. Bellekte sadece o
+    anki parça ve son `referans` değer tutulur; çok uzun geçmişler parça parça işlenebilir.
+    """
+    if yontem not in ("z", "iqr"):
+        raise ValueError(f"Bilinmeyen yöntem: {yontem!r} ('z' veya 'iqr')")
+    if esik is None:
+        esik = VARSAYILAN_Z_ESIGI if yontem == "z" else VARSAYILAN_IQR_KATSAYISI
+
+    kuyruk = np.empty(0)
+    for parca in parcalar:
+        degerler = parca[sutun].to_numpy(dtype=float)
+        tum = np.r_[kuyruk, degerler]
+        onceki = pd.Series(tum).shift(1).rolling(referans, min_periods=min(referans, _EN_AZ_REFERANS))
+        if yontem == "z":
+            orta, yayilim = onceki.mean(), onceki.std()
+            alt, ust = orta - esik * yayilim, orta + esik * yayilim
+        else:
+            q1, q3 = onceki.quantile(0.25), onceki.quantile(0.75)
+            alt, ust = q1 - esik * (q3 - q1), q3 + esik * (q3 - q1)
+        alt, ust = alt.to_numpy()[len(kuyruk):], ust.to_numpy()[len(kuyruk):]
+        yield parca.assign(**{"Alt Sınır": alt, "Üst Sınır": ust, "Aykırı": (degerler < alt) | (degerler > ust)})
+        kuyruk = tum[-referans:]
+
+
+def flag_outliers(df, sutun, yontem="iqr", esik=None, referans=VARSAYILAN_REFERANS):
+    """iter_outliers'ın tek tablo için kısayolu."""
+    return next(iter_outliers([df], sutun, yontem, esik, referans))
+
+
+def outlier_rows(parcalar, sutun, yontem="iqr", esik=None, referans=VARSAYILAN_REFERANS):
+    """Sadece aykırı işaretlenen satırlar (parçalar işlenirken diğerleri bırakılır)."""
+    aykirilar = [parca[parca["Aykırı"]] for parca in iter_outliers(parcalar, sutun, yontem, esik, referans)]
+    if not aykirilar:
+        return pd.DataFrame(columns=[sutun, "Alt Sınır", "Üst Sınır", "Aykırı"])
+    return pd.concat(aykirilar, ignore_index=True)
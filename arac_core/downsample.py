@@ -0,0 +1,127 @@
+"""Grafikler için zaman serisi seyreltme (LTTB ve min/max kovalama) ve grafik verileri.
+
+Bir grafikte piksel sütunundan fazla nokta göstermek görüntüyü değiştirmez, sadece
+tarayıcıya gönderilen veriyi büyütür. Seriler grafiğin genişliği kadar noktaya
+indirilir; tarih aralığı daraltıldığında aralık yine o kadar noktayla, yani daha
+ayrıntılı çizilir. Böylece gönderilen nokta sayısı verinin büyüklüğünden bağımsızdır.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Genişlik bilinmiyorsa grafiğin piksel genişliği (ve en fazla nokta sayısı)
+VARSAYILAN_GENISLIK = 800
+
+YONTEMLER = ["lttb", "minmax"]
+
+
+def _as_float(x):
+    """Zaman eksenini float'a çevirir (tarihler saniye olarak)."""
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype(np.int64) / 1e9
+    return x.astype(float)
+
+
+def lttb(x, y, hedef):
+    """Largest-Triangle-Three-Buckets: seçilen noktaların konumları (hedef kadar).
+
+    İlk ve son nokta her zaman seçilir; aradaki noktalar hedef - 2 eşit kovaya bölünür ve
+    her kovadan, bir önceki seçilen nokta ile sonraki kovanın ortalamasıyla en büyük
+    üçgeni oluşturan nokta alınır. Kova sayısı kadar adım vardır; her adım vektöreldir.
+    """
+    n = len(x)
+    if hedef >= n or hedef < 3:
+        return np.arange(n)
+
+    sinirlar = np.linspace(1, n - 1, hedef - 1).astype(np.int64)
+    # Her kovanın ortalama noktası; son kovadan sonrası son noktadır
+    adet = np.diff(sinirlar)
+    ort_x = np.r_[np.add.reduceat(x[:n - 1], sinirlar[:-1]) / adet, x[-1]]
+    ort_y = np.r_[np.add.reduceat(y[:n - 1], sinirlar[:-1]) / adet, y[-1]]
+
+    secilen = [0]
+    a = 0
+    # Döngüde numpy skalerleri yerine Python sayıları (adım başına sabit maliyet küçük kalsın)
+    for bas, bit, cx, cy in zip(sinirlar[:-1].tolist(), sinirlar[1:].tolist(), ort_x[1:].tolist(), ort_y[1:].tolist()):
+        ax, ay = x.item(a), y.item(a)
+        # Üçgen alanının iki katı; mutlak değer yerine kare de aynı noktayı seçer
+        alan = (ax - cx) * (y[bas:bit] - ay) - (ax - x[bas:bit]) * (cy - ay)
+        a = bas + int(np.argmax(alan * alan))
+        secilen.append(a)
+    secilen.append(n - 1)
+    return np.array(secilen)
+
+
+def minmax(x, y, hedef):
+    """Zaman ekseni hedef / 2 eşit kovaya bölünür; her kovanın en küçük ve en büyük noktası seçilir.
+
+    Tepeler ve çukurlar (örn. sıra dışı bir trip) hiçbir zaman kaybolmaz. İlk ve son nokta
+    her zaman seçilir. x sıralı olmalıdır.
+    """
+    n = len(x)
+    if hedef >= n or hedef < 4:
+        return np.arange(n)
+
+    kova_sayisi = hedef // 2
+    genislik = x[-1] - x[0]
+    kova = np.minimum(((x - x[0]) / genislik * kova_sayisi).astype(np.int64), kova_sayisi - 1) if genislik > 0 \
+        else np.zeros(n, dtype=np.int64)
+    baslar = np.flatnonzero(np.r_[True, kova[1:] != kova[:-1]])
+    satir_kovasi = np.repeat(np.arange(len(baslar)), np.diff(np.r_[baslar, n]))
+
+    secilen = [np.array([0, n - 1])]
+    for indirge in (np.minimum, np.maximum):
+        uc = indirge.reduceat(y, baslar)
+        adaylar = np.flatnonzero(y == uc[satir_kovasi])
+        # Aynı uç değer kovada birden fazla kez varsa ilki
+        _, ilk = np.unique(satir_kovasi[adaylar], return_index=True)
+        secilen.append(adaylar[ilk])
+    return np.unique(np.concatenate(secilen))
+
+
+def downsample(df, x, y, genislik=VARSAYILAN_GENISLIK, yontem="lttb", aralik=None, renk=None):
+    """df'nin [aralik] içindeki satırlarından, genislik kadar noktayla çizilecek olanları seçer.
+
+    y bir sütun adı veya listesidir; birden fazla sütunda her sütun için seçilen satırların
+    birleşimi alınır. renk verilirse (örn. kategori) her grup ayrı seyreltilir. aralik
+    (başlangıç, bitiş) tarih aralığıdır; x'e göre sıralı veride ikili aramayla bulunur.
+    """
+    if yontem not in YONTEMLER:
+        raise ValueError(f"Bilinmeyen yöntem: {yontem!r} ({', '.join(YONTEMLER)})")
+    y = [y] if isinstance(y, str) else list(y)
+    if not df[x].is_monotonic_increasing:
+        df = df.sort_values(x, kind="stable")
+    if aralik is not None:
+        zaman = df[x].to_numpy()
+        bas = np.searchsorted(zaman, np.datetime64(pd.Timestamp(aralik[0])), side="left")
+        bit = np.searchsorted(zaman, np.datetime64(pd.Timestamp(aralik[1])), side="right")
+        df = df.iloc[bas:bit]
+
+    secici = lttb if yontem == "lttb" else minmax
+    gruplar = [df] if renk is None else [grup for _, grup in df.groupby(renk, sort=False, observed=True)]
+    parcalar = []
+    for grup in gruplar:
+        zaman = _as_float(grup[x].to_numpy())
+        secilen = []
+        for sutun in y:
+            degerler = grup[sutun].to_numpy(dtype=float)
+            dolu = np.flatnonzero(~np.isnan(degerler))
+            secilen.append(dolu[secici(zaman[dolu], degerler[dolu], genislik)])
+        parcalar.append(grup.iloc[np.unique(np.concatenate(secilen))])
+    if not parcalar:
+        return df.iloc[:0]
+    return pd.concat(parcalar)
+
+
+#
+# --- GRAFİK VERİLERİ ---
+#
+def cumulative_spend(df):
+    """Her kategorinin tarih sırasıyla kümülatif harcaması: Tarih, Kategori, Kümülatif Harcama (TL)."""
+    tarihli = df[df["Tarih"].notna()].sort_values("Tarih", kind="stable")
+    kategori = tarihli["Masraf Türü"].astype(str)
+    return pd.DataFrame({
+        "Tarih": tarihli["Tarih"].to_numpy(),
+        "Kategori": kategori.to_numpy(),
+        "Kümülatif Harcama (TL)": tarihli["Tutar"].groupby(kategori.to_numpy()).cumsum().to_numpy(),
+    })
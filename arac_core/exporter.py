@@ -0,0 +1,91 @@
+"""Veri ve raporların CSV, Parquet ve Excel olarak parça parça (chunk) dışa aktarımı."""
+
+import codecs
+
+import numpy as np
+import pandas as pd
+
+BICIMLER = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet",
+            "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"}
+# Bir seferde dönüştürülüp yazılan satır sayısı
+VARSAYILAN_PARCA_BOYUTU = 50_000
+
+
+class ExportError(Exception):
+    """Dosya oluşturulamadığında kullanıcıya gösterilecek hatalar."""
+
+
+def iter_chunks(df, konumlar=None, parca_boyutu=VARSAYILAN_PARCA_BOYUTU):
+    """DataFrame'i (veya sadece verilen satır konumlarını) parça parça döndürür; bütün kopya oluşturulmaz."""
+    if konumlar is None:
+        for bas in range(0, len(df), parca_boyutu):
+            yield df.iloc[bas:bas + parca_boyutu]
+    else:
+        konumlar = np.asarray(konumlar)
+        for bas in range(0, len(konumlar), parca_boyutu):
+            yield df.iloc[konumlar[bas:bas + parca_boyutu]]
+
+
+def _write_csv(parcalar, hedef):
+    # İçe aktarma ve E-Tablo ile aynı biçim: ';' ayırıcı, ',' ondalık; BOM'lu UTF-8 (Excel için)
+    hedef.write(codecs.BOM_UTF8)
+    for i, parca in enumerate(parcalar):
+        metin = parca.to_csv(sep=";", decimal=",", index=False, header=(i == 0), date_format="%Y-%m-%d")
+        hedef.write(metin.encode("utf-8"))
+
+
+def _write_parquet(parcalar, hedef):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Parquet dosyası oluşturmak için 'pyarrow' paketi kurulu olmalı.")
+
+    yazici = None
+    try:
+        for parca in parcalar:
+            tablo = pa.Table.from_pandas(parca, preserve_index=False)
+            if yazici is None:
+                yazici = pq.ParquetWriter(hedef, tablo.schema)
+            yazici.write_table(tablo.cast(yazici.schema))
+    finally:
+        if yazici is not None:
+            yazici.close()
+
+
+def _write_xlsx(parcalar, hedef, sayfa_adi):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ExportError("Excel dosyası oluşturmak için 'openpyxl' paketi kurulu olmalı.")
+
+    # write_only: satırlar eklendikçe diske/akışa yazılır, hücre nesneleri hafızada tutulmaz
+    kitap = Workbook(write_only=True)
+    sayfa = kitap.create_sheet(sayfa_adi)
+    for i, parca in enumerate(parcalar):
+        if i == 0:
+            sayfa.append([str(s) for s in parca.columns])
+        for satir in parca.astype(object).itertuples(index=False, name=None):
+            sayfa.append([None if pd.isna(h) else h for h in satir])
+    kitap.save(hedef)
+
+
+def export_frame(df, bicim, hedef, konumlar=None, parca_boyutu=VARSAYILAN_PARCA_BOYUTU, sayfa_adi="Veriler"):
+    """df'i (veya konumlar'daki satırlarını) verilen biçimde ikili (binary) hedefe yazar.
+
+    hedef bir dosya yolu değil, yazılabilir ikili akıştır (açık dosya, BytesIO).
+    Satırlar parca_boyutu'luk parçalar halinde dönüştürülür; Parquet'te her parça ayrı
+    bir satır grubu olur. Index yazılmaz; raporların index'i önce sütuna çevrilmelidir.
+    """
+    if bicim not in BICIMLER:
+        raise ValueError(f"Bilinmeyen dışa aktarma biçimi: '{bicim}' (geçerli: {', '.join(BICIMLER)})")
+    parcalar = iter_chunks(df, konumlar, parca_boyutu)
+    if len(df) == 0 or (konumlar is not None and len(konumlar) == 0):
+        parcalar = iter([df.iloc[:0]])
+
+    if bicim == "csv":
+        _write_csv(parcalar, hedef)
+    elif bicim == "parquet":
+        _write_parquet(parcalar, hedef)
+    else:
+        _write_xlsx(parcalar, hedef, sayfa_adi)
@@ -0,0 +1,187 @@
+"""Filo modu: araç başına ayrı veri, eşzamanlı yükleme ve araçların paralel analizi."""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from .analysis import compute_trips, fuel_records, installments_due
+from .shared import SharedDataset
+
+# Aynı anda yapılacak en fazla yükleme (E-Tablo/SQLite okuması ağ ve disk bekler)
+VARSAYILAN_YUKLEME_ISCISI = 8
+# Hesaplanacak araçların toplam satırı bundan azsa süreç havuzu kullanılmaz: veriyi işçiye
+# göndermek (pickle), vektörel hesaptan uzun sürer
+VARSAYILAN_SUREC_ESIGI = 50_000
+
+FILO_SUTUNLARI = [
+    "Kayıt", "Son KM", "Gidilen KM", "Toplam Harcama (TL)", "Yakıt Harcaması (TL)",
+    "TL/km (Tüm Masraflar)", "L/100km (Ort.)", "TL/km (Yakıt)", "Bu Ayki Ödeme (TL)",
+    "Trip KM", "Trip Litre", "Trip Harcama (TL)",
+]
+
+
+def analyze_vehicle(df, ay):
+    """Bir aracın filo tablosundaki satırını hesaplar: trip, taksit ve km başı maliyet.
+
+    Süreç havuzunda çalışır; DataFrame işçiye gönderilir, geriye küçük bir sözlük döner.
+    Gidilen KM, aracın en küçük ve en büyük KM sayacı arasındaki farktır.
+    """
+    if df.empty:
+        return dict.fromkeys(FILO_SUTUNLARI, 0) | {
+            "TL/km (Tüm Masraflar)": np.nan, "L/100km (Ort.)": np.nan, "TL/km (Yakıt)": np.nan,
+        }
+
+    yakit_df = fuel_records(df)
+    tripler = compute_trips(yakit_df)
+    trip_km = float(tripler["Gidilen KM"].sum())
+    trip_litre = float(tripler["Tüketilen Litre"].sum())
+    trip_harcama = float(tripler["Harcanan Para (Trip)"].sum())
+
+    km = df["KM Sayacı"].to_numpy()
+    gidilen = int(km.max() - km.min())
+    toplam = float(df["Tutar"].sum())
+    return {
+        "Kayıt": len(df),
+        "Son KM": int(km.max()),
+        "Gidilen KM": gidilen,
+        "Toplam Harcama (TL)": toplam,
+        "Yakıt Harcaması (TL)": float(yakit_df["Tutar"].sum()),
+        "TL/km (Tüm Masraflar)": toplam / gidilen if gidilen > 0 else np.nan,
+        "L/100km (Ort.)": trip_litre / trip_km * 100 if trip_km > 0 else np.nan,
+        "TL/km (Yakıt)": trip_harcama / trip_km if trip_km > 0 else np.nan,
+        "Bu Ayki Ödeme (TL)": float(installments_due(df, ay).sum()),
+        "Trip KM": trip_km,
+        "Trip Litre": trip_litre,
+        "Trip Harcama (TL)": trip_harcama,
+    }
+
+
+def fleet_ranking(ozetler):
+    """Araç satırlarını filo tablosunda birleştirir; km başı maliyete göre sıralar.
+
+    Maliyet ve tüketim sıraları 1'den başlar (en ucuz / en az yakan 1); hesaplanamayan
+    araçların sırası boştur.
+    """
+    tablo = pd.DataFrame.from_dict(ozetler, orient="index", columns=FILO_SUTUNLARI).rename_axis("Araç")
+    tablo.insert(0, "Maliyet Sırası", tablo["TL/km (Tüm Masraflar)"].rank(method="min").astype("Int64"))
+    tablo.insert(1, "Tüketim Sırası", tablo["L/100km (Ort.)"].rank(method="min").astype("Int64"))
+    return tablo.sort_values(["Maliyet Sırası", "Toplam Harcama (TL)"], ascending=[True, False])
+
+
+def fleet_totals(ozetler):
+    """Filo geneli toplamlar; ortalamalar km ağırlıklıdır (araçların ortalamalarının ortalaması değil)."""
+    tablo = pd.DataFrame.from_dict(ozetler, orient="index", columns=FILO_SUTUNLARI)
+    gidilen = tablo["Gidilen KM"].sum()
+    trip_km = tablo["Trip KM"].sum()
+    return {
+        "arac": len(tablo),
+        "toplam": tablo["Toplam Harcama (TL)"].sum(),
+        "gidilen_km": gidilen,
+        "tl_km": tablo["Toplam Harcama (TL)"].sum() / gidilen if gidilen > 0 else 0,
+        "lt_100km": tablo["Trip Litre"].sum() / trip_km * 100 if trip_km > 0 else 0,
+        "bu_ay": tablo["Bu Ayki Ödeme (TL)"].sum(),
+    }
+
+
+class Fleet:
+    """Her aracın paylaşılan verisini (SharedDataset) ve filo analizinin işçi havuzlarını tutar.
+
+    Yükleme G/Ç beklediği için thread havuzunda, trip/taksit hesapları CPU'ya bağlı olduğu
+    için spawn ile açılan işçi süreçlerde paralel yapılır; süre araç sayısıyla değil
+    çekirdek sayısıyla ölçeklenir. İşçiler ilk analizde açılır ve süreç boyunca yaşar.
+    Streamlit betiği ana modül olduğu için betik, işçilerde yeniden çalışmasın diye
+    __spec__'ini '.__main__' ile biten bir adla tanımlar (bkz. arac_uygulamasi).
+    """
+
+    def __init__(self, storages, yukleme_iscisi=VARSAYILAN_YUKLEME_ISCISI, hesap_iscisi=None,
+                 surec_esigi=VARSAYILAN_SUREC_ESIGI):
+        self.datasets = {arac: SharedDataset(storage) for arac, storage in storages.items()}
+        self.yukleme_iscisi = yukleme_iscisi
+        self.hesap_iscisi = hesap_iscisi or os.cpu_count() or 1
+        self.surec_esigi = surec_esigi
+        self._surec_havuzu = None
+        self._kilit = threading.Lock()
+
+    @property
+    def vehicles(self):
+        return list(self.datasets)
+
+    def dataset(self, arac):
+        return self.datasets[arac]
+
+    def load_all(self):
+        """Bütün araçların son sürümünü eşzamanlı yükler: ({araç: DatasetState}, {araç: hata})."""
+        with ThreadPoolExecutor(max_workers=max(min(self.yukleme_iscisi, len(self.datasets)), 1)) as havuz:
+            isler = {arac: havuz.submit(ds.current) for arac, ds in self.datasets.items()}
+        durumlar, hatalar = {}, {}
+        for arac, is_ in isler.items():
+            try:
+                durumlar[arac] = is_.result()
+            except Exception as hata:
+                hatalar[arac] = hata
+        return durumlar, hatalar
+
+    def _process_pool(self):
+        with self._kilit:
+            if self._surec_havuzu is None:
+                self._surec_havuzu = ProcessPoolExecutor(
+                    max_workers=self.hesap_iscisi, mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._surec_havuzu
+
+    def analyze(self, durumlar, ay, cache=None):
+        """Araçların filo satırlarını hesaplar: ({araç: analyze_vehicle sonucu}, {araç: hata}).
+
+        cache (AnalyticsCache) verilirse verisi değişmeyen araçlar önbellekten gelir. Kalanlar
+        birden fazlaysa ve toplam satırları surec_esigi'ni geçiyorsa süreç havuzunda paralel,
+        değilse burada hesaplanır. Hesaplanamayan aracın hatası ötekileri durdurmaz.
+        """
+        anahtar = ("filo", pd.Timestamp(ay).strftime("%Y-%m"))
+        ozetler, hatalar, eksik = {}, {}, []
+        for arac, durum in durumlar.items():
+            sonuc = cache.get(durum.version, anahtar) if cache is not None else None
+            if sonuc is None:
+                eksik.append(arac)
+            else:
+                ozetler[arac] = sonuc
+
+        satir = sum(len(durumlar[arac].df) for arac in eksik)
+        if len(eksik) > 1 and self.hesap_iscisi > 1 and satir >= self.surec_esigi:
+            havuz = self._process_pool()
+            try:
+                isler = {arac: havuz.submit(analyze_vehicle, durumlar[arac].df, ay) for arac in eksik}
+                for arac, is_ in isler.items():
+                    try:
+                        ozetler[arac] = is_.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as hata:
+                        hatalar[arac] = hata
+            except BrokenProcessPool:
+                # Bir işçi öldüyse havuz bir sonraki analizde yeniden açılır; kalanlar burada hesaplanır
+                with self._kilit:
+                    if self._surec_havuzu is havuz:
+                        self._surec_havuzu = None
+                havuz.shutdown(wait=False, cancel_futures=True)
+        for arac in eksik:
+            if arac not in ozetler and arac not in hatalar:
+                try:
+                    ozetler[arac] = analyze_vehicle(durumlar[arac].df, ay)
+                except Exception as hata:
+                    hatalar[arac] = hata
+                    continue
+            if cache is not None and arac in ozetler:
+                cache.put(durumlar[arac].version, anahtar, ozetler[arac])
+        return {arac: ozetler[arac] for arac in durumlar if arac in ozetler}, hatalar
+
+    def shutdown(self):
+        """İşçi süreçleri kapatır."""
+        with self._kilit:
+            havuz, self._surec_havuzu = self._surec_havuzu, None
+        if havuz is not None:
+            havuz.shutdown()
@@ -0,0 +1,307 @@
+"""Geçmiş fiş ve masrafların CSV/Excel dosyalarından parça parça (chunk) toplu içe aktarımı."""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from .schema import (
+    DOLUM_TURLERI, KATEGORILER_TUMU, KM_GEREKEN_KATEGORILER, REQUIRED_COLUMNS, SIRALAMA_SUTUNLARI,
+    apply_schema, create_empty_dataframe, parse_tr_numbers,
+)
+from .write_behind import _is_transient
+
+# Dosyadan bir seferde okunan satır sayısı
+VARSAYILAN_PARCA_BOYUTU = 10_000
+# Depolamaya tek çağrıda yazılan satır sayısı ve çağrılar arası en kısa bekleme (saniye).
+# Google Sheets kullanıcı başına dakikada 60 yazma isteğine izin verir.
+VARSAYILAN_TOPLU_BOYUT = 5_000
+VARSAYILAN_YAZMA_ARALIGI = 1.0
+# Kota (429) veya sunucu hatasında bir toplu yazmanın en fazla deneme sayısı
+EN_FAZLA_DENEME = 5
+
+# Sırasıyla denenen tarih biçimleri
+TARIH_BICIMLERI = ["%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S"]
+
+# Dosyadaki başlık (büyük/küçük harf ve ı/i farkı gözetilmeden) -> REQUIRED_COLUMNS'daki sütun
+SUTUN_ESANLAMLILARI = {
+    "tarih": "Tarih", "date": "Tarih",
+    "km": "KM Sayacı", "km sayacı": "KM Sayacı", "kilometre": "KM Sayacı", "odometer": "KM Sayacı",
+    "masraf türü": "Masraf Türü", "masraf turu": "Masraf Türü", "kategori": "Masraf Türü", "tür": "Masraf Türü", "category": "Masraf Türü",
+    "tutar": "Tutar", "fiyat": "Tutar", "amount": "Tutar",
+    "açıklama": "Açıklama", "aciklama": "Açıklama", "not": "Açıklama", "description": "Açıklama",
+    "taksit": "Taksit Sayısı", "taksit sayısı": "Taksit Sayısı", "installments": "Taksit Sayısı",
+    "litre": "Litre", "lt": "Litre", "liters": "Litre",
+    "dolum türü": "Dolum Türü", "dolum turu": "Dolum Türü", "dolum": "Dolum Türü",
+}
+ZORUNLU_SUTUNLAR = ["Tarih", "Masraf Türü", "Tutar"]
+# Dosyada olmayan sütunların varsayılan değerleri
+VARSAYILAN_DEGERLER = {"KM Sayacı": "0", "Açıklama": "", "Taksit Sayısı": "1", "Litre": "0", "Dolum Türü": ""}
+
+
+# Türkçe büyük/küçük harf farkını yok sayar: 'YAKIT', 'Yakıt' ve 'yakit' aynı sayılır
+_TR_KATLAMA = str.maketrans({"ı": "i", "\u0307": None})
+
+
+def _fold(metin):
+    return str(metin).strip().casefold().translate(_TR_KATLAMA)
+
+
+class BulkImportError(Exception):
+    """Dosya bütünüyle okunamadığında kullanıcıya gösterilecek hatalar."""
+
+
+#
+# --- OKUMA ---
+#
+def _read_xlsx(kaynak, parca_boyutu):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise BulkImportError("Excel dosyalarını okumak için 'openpyxl' paketi kurulu olmalı.")
+
+    # read_only: satırlar diskten akış halinde okunur, bütün çalışma kitabı hafızaya alınmaz
+    kitap = load_workbook(kaynak, read_only=True, data_only=True)
+    try:
+        satirlar = kitap.worksheets[0].iter_rows(values_only=True)
+        basliklar = [str(h) if h is not None else "" for h in next(satirlar, [])]
+        parca = []
+        for satir in satirlar:
+            if all(h is None or h == "" for h in satir):
+                continue
+            # Tarih hücreleri metne, sayılar olduğu gibi kalır (bkz. _parse_numbers)
+            parca.append([
+                h.strftime("%Y-%m-%d") if hasattr(h, "strftime") else ("" if h is None else h)
+                for h in satir
+            ])
+            if len(parca) == parca_boyutu:
+                yield pd.DataFrame(parca, columns=basliklar, dtype=object)
+                parca = []
+        if parca:
+            yield pd.DataFrame(parca, columns=basliklar, dtype=object)
+    finally:
+        kitap.close()
+
+
+def read_chunks(kaynak, dosya_adi, parca_boyutu=VARSAYILAN_PARCA_BOYUTU):
+    """Dosyayı parça parça okur; her parça ham (metin) değerlerden oluşan bir DataFrame'dir.
+
+    kaynak bir dosya yolu veya dosya benzeri nesne (örn. st.file_uploader) olabilir;
+    türü dosya_adi'nin uzantısından anlaşılır. CSV'de ayırıcı (',' veya ';') otomatik bulunur.
+    """
+    uzanti = dosya_adi.rsplit(".", 1)[-1].lower()
+    if uzanti == "csv":
+        yield from pd.read_csv(
+            kaynak, sep=None, engine="python", dtype=str, keep_default_na=False,
+            chunksize=parca_boyutu, encoding="utf-8-sig",
+        )
+    elif uzanti in ("xlsx", "xlsm"):
+        yield from _read_xlsx(kaynak, parca_boyutu)
+    else:
+        raise BulkImportError(f"Desteklenmeyen dosya türü: .{uzanti} (CSV veya XLSX yükleyin)")
+
+
+def map_columns(basliklar, eslesme=None):
+    """Dosya başlıklarını REQUIRED_COLUMNS'a eşler: {dosya başlığı: sütun}.
+
+    eslesme verilirse önce o kullanılır; kalanlar adından (büyük/küçük harf duyarsız)
+    veya SUTUN_ESANLAMLILARI'ndan bulunur. Zorunlu sütunlardan biri yoksa hata verir.
+    """
+    eslesme = dict(eslesme or {})
+    bulunan = set(eslesme.values())
+    esanlamlilar = {_fold(k): v for k, v in SUTUN_ESANLAMLILARI.items()}
+    for baslik in basliklar:
+        if baslik in eslesme:
+            continue
+        anahtar = _fold(baslik)
+        sutun = next((s for s in REQUIRED_COLUMNS if _fold(s) == anahtar), None) or esanlamlilar.get(anahtar)
+        if sutun is not None and sutun not in bulunan:
+            eslesme[baslik] = sutun
+            bulunan.add(sutun)
+
+    eksik = [s for s in ZORUNLU_SUTUNLAR if s not in bulunan]
+    if eksik:
+        raise BulkImportError(f"Dosyada zorunlu sütunlar bulunamadı: {', '.join(eksik)}")
+    return eslesme
+
+
+#
+# --- DOĞRULAMA ---
+#
+def _parse_dates(seri):
+    metin = seri.astype(str).str.strip()
+    tarih = pd.Series(pd.NaT, index=seri.index, dtype="datetime64[ns]")
+    for bicim in TARIH_BICIMLERI:
+        eksik = tarih.isna()
+        if not eksik.any():
+            break
+        tarih[eksik] = pd.to_datetime(metin[eksik], format=bicim, errors="coerce")
+    return tarih
+
+
+def _parse_numbers(seri, ondalik):
+    """Sayı sütununu çevirir; (değerler, hatalı) döndürür. Excel'in sayı hücreleri olduğu gibi alınır."""
+    if seri.dtype == object:
+        sayi_hucresi = seri.map(lambda h: isinstance(h, (int, float)) and not isinstance(h, bool))
+    else:
+        sayi_hucresi = pd.Series(False, index=seri.index)
+
+    metin = seri.where(~sayi_hucresi, "").astype(str)
+    if ondalik == ",":
+        degerler, hatali = parse_tr_numbers(metin)
+    else:
+        temiz = metin.str.replace(",", "", regex=False).str.strip()
+        degerler = pd.to_numeric(temiz, errors="coerce")
+        hatali = degerler.isna() & (temiz != "")
+    if sayi_hucresi.any():
+        degerler[sayi_hucresi] = seri[sayi_hucresi].astype(float)
+    return degerler, hatali
+
+
+def validate_chunk(ham, eslesme, ilk_satir_no, ondalik=","):
+    """Ham bir parçayı tiplere çevirir ve doğrular; (geçerli_df, hatalar) döndürür.
+
+    hatalar: [(dosya satır no, sütun, değer, sebep)]. Hatası olan satırlar atılır.
+    Kurallar tek formdaki ile aynıdır: tutar > 0; Yakıt için KM ve litre > 0;
+    KM_GEREKEN_KATEGORILER için KM > 0. Yakıt satırlarında dolum türü boşsa
+    'Full Dolum' kabul edilir, diğer kategorilerde dolum türü ve litre silinir.
+    """
+    ham = ham.rename(columns=eslesme)[[s for s in REQUIRED_COLUMNS if s in eslesme.values()]]
+    for sutun, varsayilan in VARSAYILAN_DEGERLER.items():
+        if sutun not in ham:
+            ham[sutun] = varsayilan
+    # Dosya satır numarası (başlık 1. satır)
+    satir_no = np.arange(ilk_satir_no, ilk_satir_no + len(ham))
+    ham.index = satir_no
+
+    df = pd.DataFrame(index=ham.index)
+    hatalar = []
+    gecersiz = np.zeros(len(ham), dtype=bool)
+
+    def isaretle(maske, sutun, sebep):
+        maske = np.asarray(maske, dtype=bool)
+        for no in satir_no[maske & ~gecersiz]:
+            hatalar.append((int(no), sutun, ham.at[no, sutun], sebep))
+        gecersiz[:] |= maske
+
+    df["Tarih"] = _parse_dates(ham["Tarih"])
+    isaretle(df["Tarih"].isna(), "Tarih", "Tarih okunamadı")
+
+    for sutun in ["KM Sayacı", "Tutar", "Taksit Sayısı", "Litre"]:
+        degerler, hatali = _parse_numbers(ham[sutun], ondalik)
+        df[sutun] = degerler.fillna(0)
+        isaretle(hatali, sutun, "Sayı okunamadı")
+
+    # Kategori adları büyük/küçük harf duyarsız eşlenir
+    kanonik = {_fold(k): k for k in KATEGORILER_TUMU}
+    df["Masraf Türü"] = ham["Masraf Türü"].map(_fold).map(kanonik)
+    isaretle(df["Masraf Türü"].isna(), "Masraf Türü", "Bilinmeyen kategori")
+
+    yakit = (df["Masraf Türü"] == "Yakıt").to_numpy()
+    dolum_kanonik = {_fold(d): d for d in DOLUM_TURLERI}
+    dolum = ham["Dolum Türü"].map(_fold)
+    df["Dolum Türü"] = np.where(yakit, dolum.map(dolum_kanonik).where(dolum != "", "Full Dolum"), "")
+    isaretle(yakit & df["Dolum Türü"].isna().to_numpy(), "Dolum Türü", "Bilinmeyen dolum türü")
+    df.loc[~yakit, "Litre"] = 0.0
+
+    isaretle(df["Tutar"] <= 0, "Tutar", "Tutar 0'dan büyük olmalı")
+    km_gerekli = yakit | df["Masraf Türü"].isin(KM_GEREKEN_KATEGORILER).to_numpy()
+    isaretle(km_gerekli & (df["KM Sayacı"] <= 0).to_numpy(), "KM Sayacı", "Bu kategori için KM zorunlu")
+    isaretle(yakit & (df["Litre"] <= 0).to_numpy(), "Litre", "Yakıt için litre zorunlu")
+    isaretle(df["KM Sayacı"] < 0, "KM Sayacı", "KM negatif olamaz")
+
+    df["Açıklama"] = ham["Açıklama"].astype(str).str.strip()
+    df = df.loc[~gecersiz, REQUIRED_COLUMNS]
+    return apply_schema(df), hatalar
+
+
+def km_order_violations(df_yeni, df_mevcut):
+    """Tarihe göre KM'si geriye giden yeni satırların maskesini döndürür.
+
+    KM'si girilmiş (> 0) bütün satırlar (mevcut + yeni) tarihe göre sıralanır; bir satırın
+    KM'si, kendisinden önceki günlerdeki en yüksek KM'den düşükse hatalıdır.
+    """
+    tarih = np.concatenate([df_mevcut["Tarih"].to_numpy(dtype="datetime64[ns]"), df_yeni["Tarih"].to_numpy(dtype="datetime64[ns]")])
+    km = np.concatenate([df_mevcut["KM Sayacı"].to_numpy(dtype=np.int64), df_yeni["KM Sayacı"].to_numpy(dtype=np.int64)])
+    yeni_mi = np.r_[np.zeros(len(df_mevcut), dtype=bool), np.ones(len(df_yeni), dtype=bool)]
+
+    kmli = np.flatnonzero(km > 0)
+    sira = kmli[np.argsort(tarih[kmli], kind="stable")]
+    sirali_tarih, sirali_km = tarih[sira], km[sira]
+
+    # Her satır için: kendi gününden önceki satırların en yüksek KM'si
+    birikimli_en_yuksek = np.maximum.accumulate(sirali_km) if len(sirali_km) else sirali_km
+    gun_basi = np.searchsorted(sirali_tarih, sirali_tarih, side="left")
+    onceki_en_yuksek = np.where(gun_basi > 0, birikimli_en_yuksek[np.maximum(gun_basi - 1, 0)], 0)
+
+    hatali = np.zeros(len(km), dtype=bool)
+    hatali[sira] = sirali_km < onceki_en_yuksek
+    return hatali[yeni_mi]
+
+
+#
+# --- İÇE AKTARMA ---
+#
+def import_file(kaynak, dosya_adi, storage, df_mevcut, eslesme=None, ondalik=",", sadece_dogrula=False,
+                parca_boyutu=VARSAYILAN_PARCA_BOYUTU, toplu_boyut=VARSAYILAN_TOPLU_BOYUT,
+                yazma_araligi=VARSAYILAN_YAZMA_ARALIGI, ilerleme=None):
+    """Dosyayı okur, doğrular ve geçerli satırları depolamaya toplu olarak ekler.
+
+    Parçalar okunup tiplere çevrildikten sonra ham metinleri atılır; hafızada sadece
+    sıkı şemalı geçerli satırlar birikir. Satırlar (Tarih, KM) sırasıyla toplu_boyut'luk
+    parçalar halinde storage.append ile yazılır; yazmalar arasında en az yazma_araligi
+    saniye beklenir, kota/sunucu hatalarında üstel beklemeyle tekrar denenir.
+
+    ilerleme(asama, tamamlanan, toplam) çağrılır: asama "okuma" (toplam None) veya "yazma".
+    (df_guncel, eklenen_df, rapor) döndürür; rapor: okunan, gecerli, yazilan, hatalar.
+    """
+    ilerleme = ilerleme or (lambda *args: None)
+    hatalar = []
+    gecerli_parcalar = []
+    okunan = 0
+
+    for ham in read_chunks(kaynak, dosya_adi, parca_boyutu):
+        if eslesme is None or not set(eslesme) <= set(ham.columns):
+            eslesme = map_columns(ham.columns, eslesme)
+        # Dosya satır numarası: başlık 1. satır, veri 2. satırdan başlar
+        gecerli, parca_hatalari = validate_chunk(ham, eslesme, okunan + 2, ondalik)
+        okunan += len(ham)
+        del ham
+        gecerli_parcalar.append(gecerli)
+        hatalar.extend(parca_hatalari)
+        ilerleme("okuma", okunan, None)
+
+    eklenen = pd.concat(gecerli_parcalar) if gecerli_parcalar else create_empty_dataframe()
+    del gecerli_parcalar
+
+    geriye_giden = km_order_violations(eklenen, df_mevcut)
+    for no, km in zip(eklenen.index[geriye_giden], eklenen["KM Sayacı"].to_numpy()[geriye_giden]):
+        hatalar.append((int(no), "KM Sayacı", int(km), "KM, daha önceki bir kayıttan düşük"))
+    eklenen = apply_schema(eklenen.loc[~geriye_giden].sort_values(by=SIRALAMA_SUTUNLARI, kind="stable"))
+    hatalar.sort()
+
+    rapor = {"okunan": okunan, "gecerli": len(eklenen), "yazilan": 0, "hatalar": hatalar}
+    if sadece_dogrula or eklenen.empty:
+        return df_mevcut, eklenen, rapor
+
+    df = df_mevcut
+    son_yazma = 0.0
+    for bas in range(0, len(eklenen), toplu_boyut):
+        parca = eklenen.iloc[bas:bas + toplu_boyut].reset_index(drop=True)
+        for deneme in range(EN_FAZLA_DENEME):
+            bekleme = son_yazma + yazma_araligi - time.monotonic()
+            if bekleme > 0:
+                time.sleep(bekleme)
+            try:
+                son_yazma = time.monotonic()
+                df = storage.append(df, parca)
+                break
+            except Exception as hata:
+                if not _is_transient(hata) or deneme == EN_FAZLA_DENEME - 1:
+                    # O ana kadar yazılanlar kalıcıdır; rapor ve güncel veri yine döner
+                    rapor["hata"] = str(hata)
+                    return df, eklenen.iloc[:rapor["yazilan"]], rapor
+                time.sleep(2 ** deneme)
+        rapor["yazilan"] += len(parca)
+        ilerleme("yazma", rapor["yazilan"], len(eklenen))
+    return df, eklenen, rapor
@@ -0,0 +1,98 @@
+"""KM'ye ve süreye bağlı bakımların (periyodik bakım, lastik, muayene) tahmini."""
+
+import numpy as np
+import pandas as pd
+
+from .odometer import OdometerIndex
+
+# Kategori → (KM aralığı, gün aralığı); ikisi de verilmişse hangisi önce dolarsa
+VARSAYILAN_BAKIM_ARALIKLARI = {
+    "Periyodik Bakım": (15_000, 365),
+    "Lastik": (40_000, None),
+    "Muayene": (None, 730),
+}
+# Bu kadar gün kalmış bakımlar "Yaklaşıyor" sayılır
+VARSAYILAN_UYARI_GUNU = 30
+
+BAKIM_SUTUNLARI = ["Son Tarih", "Son KM", "Sonraki KM", "Tahmini Tarih", "Kalan KM", "Kalan Gün", "Durum"]
+
+
+def forecast_maintenance(df, bugun, araliklar=None, indeks=None, uyari_gunu=VARSAYILAN_UYARI_GUNU):
+    """Her bakım kategorisinin bir sonraki bakımının KM'sini ve tarihini tahmin eder.
+
+    Sonraki KM, kategorinin son kaydının KM'sine KM aralığı eklenerek bulunur ve odometre
+    indeksiyle (günlük KM hızıyla) tarihe çevrilir; gün aralığı da varsa son kayıttan o
+    kadar gün sonrasıyla karşılaştırılıp erken olan alınır. Bugünkü KM de indeksten
+    tahmin edilir. Bütün kategoriler tek seferde (dizi sorgularıyla) hesaplanır.
+
+    indeks (OdometerIndex) verilmezse df'den kurulur. Hiç kaydı olmayan kategorilerin
+    tahmini yapılamaz ("Kayıt Yok").
+    """
+    araliklar = VARSAYILAN_BAKIM_ARALIKLARI if araliklar is None else araliklar
+    if indeks is None:
+        indeks = OdometerIndex.from_frame(df)
+    bugun = pd.Timestamp(bugun).normalize()
+    kategoriler = list(araliklar)
+
+    bakimlar = df[df["Masraf Türü"].isin(kategoriler) & df["Tarih"].notna()]
+    sonlar = (
+        bakimlar.sort_values(["Tarih", "KM Sayacı"]).groupby("Masraf Türü", observed=True).tail(1)
+        .set_index("Masraf Türü").reindex(kategoriler)
+    )
+    son_tarih = pd.DatetimeIndex(sonlar["Tarih"])
+    son_km = sonlar["KM Sayacı"].to_numpy(dtype=float)
+    # KM'si girilmemiş (eski) kayıtlarda bakım günündeki KM indeksten bulunur
+    son_km = np.where(son_km > 0, son_km, indeks.km_at(son_tarih))
+
+    km_araligi = np.array([araliklar[k][0] or np.nan for k in kategoriler], dtype=float)
+    gun_araligi = np.array([araliklar[k][1] or np.nan for k in kategoriler], dtype=float)
+
+    sonraki_km = son_km + km_araligi
+    km_tarihi = indeks.date_at(sonraki_km)
+    sure_tarihi = son_tarih + pd.to_timedelta(gun_araligi, unit="D")
+    # İkisinden erken olan (biri bilinmiyorsa diğeri)
+    tahmini = pd.DatetimeIndex(np.where(
+        km_tarihi.isna() | (sure_tarihi < km_tarihi), sure_tarihi, km_tarihi,
+    )).normalize()
+
+    kalan_km = sonraki_km - indeks.km_at(bugun)
+    kalan_gun = np.asarray((tahmini - bugun).days, dtype=float)
+
+    durum = np.select(
+        [son_tarih.isna(), (kalan_gun < 0) | (kalan_km < 0), kalan_gun <= uyari_gunu, np.isnan(kalan_gun)],
+        ["Kayıt Yok", "Gecikti", "Yaklaşıyor", "Tahmin Yok"],
+        "Zamanı Var",
+    )
+    return pd.DataFrame({
+        "Son Tarih": son_tarih,
+        "Son KM": son_km,
+        "Sonraki KM": sonraki_km,
+        "Tahmini Tarih": tahmini,
+        "Kalan KM": kalan_km,
+        "Kalan Gün": kalan_gun,
+        "Durum": durum,
+    }, index=pd.Index(kategoriler, name="Kategori"))
+
+
+def forecast_fleet(durumlar, bugun, cache=None, araliklar=None):
+    """Filonun bütün araçlarının bakım tahminleri tek tabloda: (Araç, Kategori) indeksli.
+
+    cache (AnalyticsCache) verilirse tahminler veri sürümü ve gün başına saklanır; aracın
+    verisi değişmedikçe (veya gün dönmedikçe) yeniden hesaplanmaz. Odometre indeksi de
+    sürüm başına bir kez kurulur.
+    """
+    anahtar = ("bakim", pd.Timestamp(bugun).strftime("%Y-%m-%d"))
+    tablolar = {}
+    for arac, durum in durumlar.items():
+        if cache is None:
+            tablolar[arac] = forecast_maintenance(durum.df, bugun, araliklar)
+            continue
+        tablolar[arac] = cache.get(durum.version, anahtar) if araliklar is None else None
+        if tablolar[arac] is None:
+            indeks = cache.get_or_compute(durum.version, "odometre", OdometerIndex.from_frame, durum.df)
+            tablolar[arac] = forecast_maintenance(durum.df, bugun, araliklar, indeks)
+            if araliklar is None:
+                cache.put(durum.version, anahtar, tablolar[arac])
+    if not tablolar:
+        return pd.DataFrame(columns=BAKIM_SUTUNLARI)
+    return pd.concat(tablolar, names=["Araç"])
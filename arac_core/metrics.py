@@ -0,0 +1,179 @@
+"""Her yeniden çalıştırmanın (rerun) süre ölçümleri: izler (trace), aralıklar (span) ve dışa aktarım."""
+
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+# Prometheus histogram sınırları (saniye)
+VARSAYILAN_SURE_SINIRLARI = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_aktif = threading.local()
+
+
+class Trace:
+    """Bir yeniden çalıştırma boyunca açılan aralıkların kaydı.
+
+    Her aralık: ad, üst aralığın sırası (ebeveyn), başlangıç (izin başından itibaren),
+    süre ve özellikler (satır sayısı, bayt vb.).
+    """
+
+    def __init__(self, ad, **ozellikler):
+        self.ad = ad
+        self.ozellikler = dict(ozellikler)
+        self.zaman = time.time()
+        self.sure = None
+        self.spanlar = []
+        self._yigin = []
+        self._baslangic = time.perf_counter()
+
+    def to_dict(self):
+        return {
+            "ad": self.ad,
+            "zaman": self.zaman,
+            "sure": self.sure,
+            "ozellikler": self.ozellikler,
+            "spanlar": self.spanlar,
+        }
+
+
+def start_trace(ad, **ozellikler):
+    """Bu thread için yeni bir iz başlatır; önceki bitmemiş iz atılır."""
+    _aktif.trace = Trace(ad, **ozellikler)
+    return _aktif.trace
+
+
+def finish_trace():
+    """Bu thread'in izini bitirir ve döndürür (iz yoksa None)."""
+    trace = getattr(_aktif, "trace", None)
+    _aktif.trace = None
+    if trace is not None:
+        trace.sure = time.perf_counter() - trace._baslangic
+    return trace
+
+
+def active():
+    """Bu thread'de açık bir iz var mı (pahalı özellikleri sadece o zaman hesaplamak için)."""
+    return getattr(_aktif, "trace", None) is not None
+
+
+@contextlib.contextmanager
+def span(ad, **ozellikler):
+    """Bloğun süresini açık ize bir aralık olarak ekler; iz yoksa hiçbir şey yapmaz."""
+    trace = getattr(_aktif, "trace", None)
+    if trace is None:
+        yield
+        return
+
+    kayit = {
+        "ad": ad,
+        "ebeveyn": trace._yigin[-1] if trace._yigin else None,
+        "baslangic": time.perf_counter() - trace._baslangic,
+        "sure": None,
+        "ozellikler": dict(ozellikler),
+    }
+    trace.spanlar.append(kayit)
+    trace._yigin.append(len(trace.spanlar) - 1)
+    try:
+        yield
+    except BaseException as hata:
+        kayit["ozellikler"]["hata"] = type(hata).__name__
+        raise
+    finally:
+        kayit["sure"] = time.perf_counter() - trace._baslangic - kayit["baslangic"]
+        trace._yigin.pop()
+
+
+def set_attributes(**ozellikler):
+    """Açık olan en içteki aralığa (yoksa ize) özellik ekler: satır sayısı, bayt vb."""
+    trace = getattr(_aktif, "trace", None)
+    if trace is None:
+        return
+    hedef = trace.spanlar[trace._yigin[-1]]["ozellikler"] if trace._yigin else trace.ozellikler
+    hedef.update(ozellikler)
+
+
+def payload_size(deger):
+    """Bir isteğin JSON olarak yaklaşık boyutu (bayt); sadece iz açıkken hesaplanır."""
+    if not active():
+        return None
+    return len(json.dumps(deger, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+#
+# --- DIŞA AKTARIM ---
+#
+class JsonlSink:
+    """Her izi bir JSON satırı olarak dosyanın sonuna ekler."""
+
+    def __init__(self, path):
+        self.path = path
+        self._kilit = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def write(self, trace):
+        satir = json.dumps(trace.to_dict(), ensure_ascii=False, default=str)
+        with self._kilit, open(self.path, "a", encoding="utf-8") as f:
+            f.write(satir + "\n")
+
+
+class PrometheusSink:
+    """İz ve aralık sürelerini histogram olarak toplar ve Prometheus metin biçiminde yazar.
+
+    Dosya her izden sonra tek hamlede değiştirilir (node_exporter textfile collector
+    ile okunabilir). p50/p95 için: histogram_quantile(0.95, rate(arac_span_seconds_bucket[5m])).
+    """
+
+    def __init__(self, path, sinirlar=VARSAYILAN_SURE_SINIRLARI):
+        self.path = path
+        self.sinirlar = tuple(sinirlar)
+        self._kilit = threading.Lock()
+        # ad -> [kova sayıları..., toplam süre, adet]
+        self._histogramlar = defaultdict(lambda: [0] * len(self.sinirlar) + [0.0, 0])
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def _observe(self, ad, sure):
+        kayit = self._histogramlar[ad]
+        for i, sinir in enumerate(self.sinirlar):
+            if sure <= sinir:
+                kayit[i] += 1
+        kayit[-2] += sure
+        kayit[-1] += 1
+
+    def _render(self):
+        satirlar = [
+            "# HELP arac_span_seconds Yeniden çalıştırma ve aralık süreleri (saniye).",
+            "# TYPE arac_span_seconds histogram",
+        ]
+        for ad, kayit in sorted(self._histogramlar.items()):
+            etiket = ad.replace("\\", "\\\\").replace('"', '\\"')
+            for sinir, adet in zip(self.sinirlar, kayit):
+                satirlar.append(f'arac_span_seconds_bucket{{span="{etiket}",le="{sinir}"}} {adet}')
+            satirlar.append(f'arac_span_seconds_bucket{{span="{etiket}",le="+Inf"}} {kayit[-1]}')
+            satirlar.append(f'arac_span_seconds_sum{{span="{etiket}"}} {kayit[-2]}')
+            satirlar.append(f'arac_span_seconds_count{{span="{etiket}"}} {kayit[-1]}')
+        return "\n".join(satirlar) + "\n"
+
+    def write(self, trace):
+        with self._kilit:
+            self._observe(trace.ad, trace.sure)
+            for kayit in trace.spanlar:
+                if kayit["sure"] is not None:
+                    self._observe(kayit["ad"], kayit["sure"])
+            metin = self._render()
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(metin)
+            os.replace(self.path + ".tmp", self.path)
+
+
+def create_sink(tur, path):
+    """Ayardaki biçime göre ("jsonl" veya "prometheus") dışa aktarıcıyı oluşturur; boşsa None."""
+    if not tur:
+        return None
+    if tur == "jsonl":
+        return JsonlSink(path)
+    if tur == "prometheus":
+        return PrometheusSink(path)
+    raise ValueError(f"Bilinmeyen metrik biçimi: '{tur}' (geçerli: jsonl, prometheus)")
@@ -0,0 +1,125 @@
+"""Tarih ↔ KM sayacı indeksi: bir tarihteki KM'yi ve bir KM'ye varılan tarihi bulur."""
+
+import numpy as np
+import pandas as pd
+
+# Günlük KM hızı son bu kadar günün kayıtlarından hesaplanır
+VARSAYILAN_HIZ_PENCERESI = 365
+
+_GUN = np.timedelta64(1, "D")
+
+
+def _days(tarih):
+    """Tarih(ler)i 1970'ten bu yana gün sayısına (float) çevirir; NaT → NaN."""
+    tarih = pd.to_datetime(tarih)
+    if np.ndim(tarih) == 0:
+        return np.nan if pd.isna(tarih) else (tarih.to_datetime64() - np.datetime64(0, "D")) / _GUN
+    degerler = np.asarray(tarih, dtype="datetime64[ns]")
+    return np.where(np.isnat(degerler), np.nan, (degerler - np.datetime64(0, "D")) / _GUN)
+
+
+def _dates(gunler):
+    """_days'in tersi: gün sayısı (float) → Timestamp / DatetimeIndex (NaN → NaT)."""
+    if np.ndim(gunler) == 0:
+        return pd.NaT if np.isnan(gunler) else pd.Timestamp(0) + pd.Timedelta(days=float(gunler))
+    return pd.to_datetime(np.asarray(gunler, dtype=float) * 86400, unit="s")
+
+
+class OdometerIndex:
+    """KM'si olan bütün kayıtlardan kurulan, tarihe göre sıralı (gün, KM) dizileri.
+
+    Her güne o günün en büyük KM'si düşer; sayaç geri gitmediği için daha önce girilmiş
+    daha büyük bir değerin altında kalan (hatalı) KM'ler o değere çekilir. Böylece iki
+    dizi de sıralıdır ve km_at (tarih → KM) ile date_at (KM → tarih) ikili aramayla
+    (sorgu başına O(log n)) bulunur. Ara değerler iki kayıt arasında doğrusal enterpolasyonla,
+    son kayıttan sonrası günlük KM hızıyla tahmin edilir. İlk kayıttan öncesi bilinmez (NaN/NaT).
+
+    Sorgular tek değer veya dizi alır; dizilerle bütün sorgular tek seferde yapılır.
+    """
+
+    def __init__(self, gunler, kmler):
+        self.gunler = gunler
+        self.kmler = kmler
+
+    @classmethod
+    def from_frame(cls, df):
+        km = df["KM Sayacı"].to_numpy(dtype=float)
+        gun = _days(df["Tarih"].to_numpy())
+        gecerli = (km > 0) & ~np.isnan(gun)
+        km, gun = km[gecerli], np.floor(gun[gecerli])
+        if len(km) == 0:
+            return cls(np.empty(0), np.empty(0))
+
+        # Gün ve KM'ye göre sırala, her günün son (en büyük) KM'sini al
+        sira = np.lexsort((km, gun))
+        gun, km = gun[sira], km[sira]
+        gunun_sonu = np.r_[gun[1:] != gun[:-1], True]
+        return cls(gun[gunun_sonu], np.maximum.accumulate(km[gunun_sonu]))
+
+    def __len__(self):
+        return len(self.gunler)
+
+    @property
+    def empty(self):
+        return len(self.gunler) == 0
+
+    def last(self):
+        """Son kaydın (tarih, KM) çifti; indeks boşsa (NaT, NaN)."""
+        if self.empty:
+            return pd.NaT, np.nan
+        return _dates(self.gunler[-1]), float(self.kmler[-1])
+
+    def daily_rate(self, pencere=VARSAYILAN_HIZ_PENCERESI):
+        """Son kayda kadarki son pencere günde gidilen ortalama günlük KM.
+
+        Kayıtlar pencereden kısa bir süreyi kapsıyorsa hepsi kullanılır. Hesaplanamazsa
+        (tek günlük kayıt) NaN.
+        """
+        if len(self.gunler) < 2:
+            return np.nan
+        bas = max(self.gunler[0], self.gunler[-1] - pencere)
+        gun = self.gunler[-1] - bas
+        return (self.kmler[-1] - self._interpolate_km(np.asarray([bas]))[0]) / gun
+
+    def _interpolate_km(self, gun):
+        # Sağdaki kayıt: gunler[i-1] <= gun < gunler[i]
+        i = np.clip(np.searchsorted(self.gunler, gun, side="right"), 1, len(self.gunler) - 1)
+        g0, g1 = self.gunler[i - 1], self.gunler[i]
+        k0, k1 = self.kmler[i - 1], self.kmler[i]
+        return k0 + (k1 - k0) * (gun - g0) / (g1 - g0)
+
+    def km_at(self, tarih):
+        """Tarih(ler)deki tahmini KM sayacı."""
+        gun = _days(tarih)
+        tekil = np.ndim(gun) == 0
+        gun = np.atleast_1d(gun)
+        sonuc = np.full(len(gun), np.nan)
+        if len(self.gunler) == 1:
+            sonuc[gun == self.gunler[0]] = self.kmler[0]
+        elif len(self.gunler) > 1:
+            ic = (gun >= self.gunler[0]) & (gun <= self.gunler[-1])
+            sonuc[ic] = self._interpolate_km(gun[ic])
+            sonra = gun > self.gunler[-1]
+            sonuc[sonra] = self.kmler[-1] + self.daily_rate() * (gun[sonra] - self.gunler[-1])
+        return sonuc[0] if tekil else sonuc
+
+    def date_at(self, km):
+        """KM sayacının verilen değer(ler)e ulaştığı (veya ulaşacağı) tahmini tarih."""
+        tekil = np.ndim(km) == 0
+        km = np.atleast_1d(np.asarray(km, dtype=float))
+        sonuc = np.full(len(km), np.nan)
+        if len(self.gunler) > 1:
+            ic = (km >= self.kmler[0]) & (km <= self.kmler[-1])
+            # İlk kez km'ye ulaşılan kayıt: kmler[i-1] < km <= kmler[i] (eşit KM'ler arasında ilki)
+            i = np.clip(np.searchsorted(self.kmler, km[ic], side="left"), 1, len(self.kmler) - 1)
+            g0, g1 = self.gunler[i - 1], self.gunler[i]
+            k0, k1 = self.kmler[i - 1], self.kmler[i]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                sonuc[ic] = np.where(k1 > k0, g0 + (g1 - g0) * (km[ic] - k0) / (k1 - k0), g0)
+            sonra = km > self.kmler[-1]
+            hiz = self.daily_rate()
+            if hiz > 0:
+                sonuc[sonra] = self.gunler[-1] + (km[sonra] - self.kmler[-1]) / hiz
+        elif len(self.gunler) == 1:
+            sonuc[km == self.kmler[0]] = self.gunler[0]
+        return _dates(sonuc[0]) if tekil else _dates(sonuc)
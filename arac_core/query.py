@@ -0,0 +1,103 @@
+"""Veri Yönetimi filtreleri için önceden kurulan indeksler (tarih, açıklama, kategori)."""
+
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+# Açıklama araması bu uzunluktaki parçalar (n-gram) üzerinden yapılır
+NGRAM_UZUNLUGU = 3
+
+
+def _ngrams(metin):
+    return {metin[i:i + NGRAM_UZUNLUGU] for i in range(len(metin) - NGRAM_UZUNLUGU + 1)}
+
+
+class ExpenseIndex:
+    """Bir DataFrame sürümü için kurulan, değiştirilmeyen sorgu indeksi.
+
+    - Tarih: satır konumları tarihe göre sıralı tutulur; aralık filtresi iki ikili
+      aramayla (searchsorted) bulunur.
+    - Açıklama: aynı açıklamalar bir kez saklanır; her benzersiz açıklamanın 3'lü
+      harf parçaları (trigram) ters indekse yazılır. Arama, parçaların kesişimindeki
+      adaylarda doğrulanır (büyük/küçük harf duyarsız, düz metin).
+    - Kategori: her kategori için satırların bit maskesi (bool dizi).
+
+    Filtreler satır konumlarını (df sırasıyla) döndürür; böylece sadece gösterilecek
+    sayfa df.iloc ile kopyalanır. Veri değişince yeni indeks kurulur (bkz. cache).
+    """
+
+    def __init__(self, df):
+        self.satir_sayisi = len(df)
+
+        tarih = df["Tarih"].to_numpy(dtype="datetime64[ns]")
+        gecerli = np.flatnonzero(~np.isnat(tarih))
+        sira = np.argsort(tarih[gecerli], kind="stable")
+        self._tarih_konumlari = gecerli[sira]
+        self._sirali_tarih = tarih[self._tarih_konumlari]
+
+        kategori = df["Masraf Türü"].astype(object).to_numpy()
+        self._kategori_maskeleri = {k: kategori == k for k in pd.unique(kategori)}
+
+        self._aciklama_kodlari, benzersiz = pd.factorize(df["Açıklama"].astype(object).fillna(""))
+        self._aciklamalar = [str(a).casefold() for a in benzersiz]
+        ters_indeks = defaultdict(list)
+        for kod, metin in enumerate(self._aciklamalar):
+            for parca in _ngrams(metin):
+                ters_indeks[parca].append(kod)
+        self._ngram_indeksi = {parca: np.array(kodlar) for parca, kodlar in ters_indeks.items()}
+
+    @property
+    def categories(self):
+        """Veride bulunan kategoriler."""
+        return list(self._kategori_maskeleri)
+
+    def date_bounds(self):
+        """En eski ve en yeni kayıt tarihi (Timestamp); tarihli kayıt yoksa (None, None)."""
+        if not len(self._sirali_tarih):
+            return None, None
+        return pd.Timestamp(self._sirali_tarih[0]), pd.Timestamp(self._sirali_tarih[-1])
+
+    def _date_mask(self, baslangic, bitis):
+        """baslangic ve bitis günleri dahil, tarih aralığındaki satırların maskesi."""
+        alt = np.datetime64(pd.Timestamp(baslangic).normalize(), "ns")
+        ust = np.datetime64(pd.Timestamp(bitis).normalize() + pd.Timedelta(days=1), "ns")
+        bas, son = np.searchsorted(self._sirali_tarih, [alt, ust], side="left")
+        maske = np.zeros(self.satir_sayisi, dtype=bool)
+        maske[self._tarih_konumlari[bas:son]] = True
+        return maske
+
+    def _text_mask(self, aranan):
+        aranan = aranan.casefold()
+        parcalar = _ngrams(aranan)
+        if parcalar:
+            adaylar = None
+            for parca in parcalar:
+                kodlar = self._ngram_indeksi.get(parca)
+                if kodlar is None:
+                    return np.zeros(self.satir_sayisi, dtype=bool)
+                adaylar = kodlar if adaylar is None else np.intersect1d(adaylar, kodlar, assume_unique=True)
+        else:
+            # Kısa aramalar: bütün benzersiz açıklamalara bakılır (satırlara değil)
+            adaylar = range(len(self._aciklamalar))
+        eslesen = [kod for kod in adaylar if aranan in self._aciklamalar[kod]]
+        return np.isin(self._aciklama_kodlari, eslesen)
+
+    def filter(self, kategoriler=None, tarih_araligi=None, aranan=None):
+        """Filtrelere uyan satırların konumlarını (df sırasıyla) döndürür.
+
+        kategoriler: seçili kategoriler (boşsa hepsi), tarih_araligi: (başlangıç, bitiş)
+        günleri dahil, aranan: açıklamada geçen metin.
+        """
+        maske = np.ones(self.satir_sayisi, dtype=bool)
+        if kategoriler:
+            kategori_maskesi = np.zeros(self.satir_sayisi, dtype=bool)
+            for kategori in kategoriler:
+                if kategori in self._kategori_maskeleri:
+                    kategori_maskesi |= self._kategori_maskeleri[kategori]
+            maske &= kategori_maskesi
+        if tarih_araligi is not None and len(tarih_araligi) == 2:
+            maske &= self._date_mask(*tarih_araligi)
+        if aranan:
+            maske &= self._text_mask(aranan)
+        return np.flatnonzero(maske)
@@ -0,0 +1,119 @@
+"""Ay × kategori ve kategori toplamlarının artımlı olarak güncellenen özet tabloları."""
+
+import pandas as pd
+
+from .analysis import format_monthly_summary
+from .schema import normalize_types
+from .storage import edited_rows
+
+
+class Rollups:
+    """Masrafların (ay, kategori) ve kategori bazında tutar, litre ve kayıt sayısı toplamları.
+
+    Yüklemede bir kez from_frame ile kurulur; sonra her eklenen, düzenlenen veya silinen
+    satır için sözlükteki tek bir kaydı günceller (satır başına O(1)). Özet metrikler
+    ham satırlar tekrar taranmadan buradan okunur. Tarihi olmayan satırlar sadece
+    kategori toplamlarına girer.
+    """
+
+    def __init__(self):
+        # (yıl, ay, kategori) -> [tutar, litre, adet]
+        self.aylik = {}
+        # kategori -> [tutar, litre, adet]
+        self.kategoriler = {}
+
+    @classmethod
+    def from_frame(cls, df):
+        """Özetleri tek bir groupby geçişiyle kurar."""
+        rollups = cls()
+        if df.empty:
+            return rollups
+
+        kategori = df["Masraf Türü"].astype(object)
+        for anahtar, (tutar, litre, adet) in (
+            df.groupby(kategori, sort=False)[["Tutar", "Litre"]].agg(["sum", "count"]).iloc[:, [0, 2, 1]].iterrows()
+        ):
+            rollups.kategoriler[anahtar] = [float(tutar), float(litre), int(adet)]
+
+        aylik = df.groupby([df["Tarih"].dt.year, df["Tarih"].dt.month, kategori], sort=False)
+        for (yil, ay, kat), (tutar, litre, adet) in (
+            aylik[["Tutar", "Litre"]].agg(["sum", "count"]).iloc[:, [0, 2, 1]].iterrows()
+        ):
+            rollups.aylik[(int(yil), int(ay), kat)] = [float(tutar), float(litre), int(adet)]
+        return rollups
+
+    def copy(self):
+        """Bağımsız bir kopya; paylaşılan (yayınlanmış) özetler yerinde değiştirilmez."""
+        kopya = Rollups()
+        kopya.aylik = {anahtar: list(kayit) for anahtar, kayit in self.aylik.items()}
+        kopya.kategoriler = {anahtar: list(kayit) for anahtar, kayit in self.kategoriler.items()}
+        return kopya
+
+    @staticmethod
+    def _add(sozluk, anahtar, tutar, litre, isaret):
+        kayit = sozluk.setdefault(anahtar, [0.0, 0.0, 0])
+        kayit[0] += isaret * tutar
+        kayit[1] += isaret * litre
+        kayit[2] += isaret
+        # Boşalan kayıtlar atılır (kayan nokta artıkları birikmesin)
+        if kayit[2] <= 0:
+            del sozluk[anahtar]
+
+    def _update_rows(self, df, isaret):
+        for tarih, kategori, tutar, litre in zip(df["Tarih"], df["Masraf Türü"], df["Tutar"], df["Litre"]):
+            tutar, litre = float(tutar), float(litre)
+            self._add(self.kategoriler, kategori, tutar, litre, isaret)
+            if not pd.isna(tarih):
+                self._add(self.aylik, (tarih.year, tarih.month, kategori), tutar, litre, isaret)
+
+    def add_rows(self, df):
+        """Yeni satırları özetlere ekler."""
+        self._update_rows(df, +1)
+
+    def remove_rows(self, df):
+        """Silinen satırları özetlerden çıkarır."""
+        self._update_rows(df, -1)
+
+    def apply_changeset(self, df_mevcut, changeset):
+        """Değişiklik setini (bkz. storage) özetlere uygular; df_mevcut, kaydetmeden önceki veridir."""
+        silinen = [e for e in changeset["silinen"] if e in df_mevcut.index]
+        duzenlenen = {e: d for e, d in changeset["duzenlenen"].items() if e not in silinen}
+
+        self.remove_rows(df_mevcut.loc[silinen + [e for e in duzenlenen if e in df_mevcut.index]])
+        if duzenlenen:
+            self.add_rows(edited_rows(df_mevcut, duzenlenen))
+        if not changeset["eklenen"].empty:
+            self.add_rows(normalize_types(changeset["eklenen"]))
+
+    # --- Okuma ---
+
+    def total(self, kategori=None):
+        """Bütün masrafların (veya bir kategorinin) toplam tutarı."""
+        if kategori is not None:
+            return self.kategoriler.get(kategori, [0.0, 0.0, 0])[0]
+        return sum(kayit[0] for kayit in self.kategoriler.values())
+
+    def count(self, kategori):
+        """Kategorideki kayıt sayısı."""
+        return self.kategoriler.get(kategori, [0.0, 0.0, 0])[2]
+
+    def monthly_totals(self):
+        """Her ayın kategori toplamları, uzun biçimde (grafikler için): Ay, Kategori, Tutar."""
+        satirlar = [
+            (pd.Timestamp(year=yil, month=ay, day=1), str(kat), tutar)
+            for (yil, ay, kat), (tutar, _, _) in self.aylik.items()
+        ]
+        return pd.DataFrame(satirlar, columns=["Ay", "Kategori", "Tutar"]).sort_values(["Ay", "Kategori"], ignore_index=True)
+
+    def monthly_summary(self, kategori):
+        """Kategorinin aylık tutar/litre özeti (analysis.monthly_fuel_summary ile aynı biçimde)."""
+        satirlar = {
+            pd.Timestamp(year=yil, month=ay, day=1) + pd.offsets.MonthEnd(0): (tutar, litre)
+            for (yil, ay, kat), (tutar, litre, _) in self.aylik.items()
+            if kat == kategori
+        }
+        aylik_ozet = pd.DataFrame.from_dict(
+            satirlar, orient="index", columns=["Toplam_Harcanan_Para_TL", "Toplam_Alınan_Litre"]
+        )
+        aylik_ozet.index = pd.DatetimeIndex(aylik_ozet.index, name="Tarih")
+        return format_monthly_summary(aylik_ozet.round(6))
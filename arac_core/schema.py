@@ -0,0 +1,179 @@
+"""Masraf verisinin sütunları, kategorileri ve tip dönüşümleri."""
+
+import numpy as np
+import pandas as pd
+
+# Masraf kategorilerimiz
+KATEGORILER_TUMU = [
+    'Yakıt', 'Köprü Otoyol', 'Trafik Cezaları', 'Tamir-Servis', 
+    'Periyodik Bakım', 'Muayene', 'Lastik', 'Aksesuar', 
+    'Vergiler', 'Otopark', 'Araç Yıkama', 'Sigorta-Kasko'
+]
+KATEGORILER_DIGER = [k for k in KATEGORILER_TUMU if k != 'Yakıt']
+KM_GEREKEN_KATEGORILER = ['Periyodik Bakım', 'Tamir-Servis', 'Lastik', 'Muayene']
+DOLUM_TURLERI = ['Full Dolum', 'Kısmi Dolum']
+
+# Gerekli sütunlar (E-Tablonuzdaki ile aynı olmalı)
+REQUIRED_COLUMNS = [
+    "Tarih", "KM Sayacı", "Masraf Türü", "Tutar", "Açıklama", 
+    "Taksit Sayısı", "Litre", "Dolum Türü"
+]
+NUMERIC_COLUMNS = ['KM Sayacı', 'Tutar', 'Taksit Sayısı', 'Litre']
+
+# Kayıtların E-Tabloda ve hafızada tutulduğu sıra
+SIRALAMA_SUTUNLARI = ["Tarih", "KM Sayacı"]
+
+
+# Hafızadaki sıkı (compact) şema: sabit değerli metinler kategori, KM tam sayı
+KM_DTYPE = 'int64'
+TAKSIT_DTYPE = 'int32'
+TUTAR_DTYPE = 'float64'
+
+# '.' binlik ayırıcısını siler, ',' ondalık ayırıcısını '.' yapar
+_TR_SAYI_CEVIRI = str.maketrans({'.': None, ',': '.'})
+
+
+def _as_category(seri, sabit_degerler):
+    """Seriyi, sabit değerler ve verideki diğer değerlerden oluşan bir kategoriye çevirir.
+
+    Zaten kategori olan seriler olduğu gibi döner (pd.concat farklı kategorileri object'e düşürür).
+    """
+    if isinstance(seri.dtype, pd.CategoricalDtype):
+        return seri
+    diger = sorted(set(seri.dropna().unique()) - set(sabit_degerler))
+    return seri.astype(pd.CategoricalDtype(sabit_degerler + diger))
+
+
+def apply_schema(df):
+    """Sütunları sıkı tiplere çevirir: kategori, tam sayı KM/taksit ve float tutar/litre."""
+    df['Masraf Türü'] = _as_category(df['Masraf Türü'], KATEGORILER_TUMU)
+    df['Dolum Türü'] = _as_category(df['Dolum Türü'], [''] + DOLUM_TURLERI)
+    df['KM Sayacı'] = df['KM Sayacı'].round().astype(KM_DTYPE)
+    df['Tutar'] = df['Tutar'].astype(TUTAR_DTYPE)
+    df['Litre'] = df['Litre'].astype(TUTAR_DTYPE)
+    taksit = df['Taksit Sayısı'].to_numpy(dtype=float)
+    df['Taksit Sayısı'] = np.where(taksit < 1, 1, np.trunc(taksit)).astype(TAKSIT_DTYPE)
+    return df
+
+
+def create_empty_dataframe():
+    """Gerekli sütunlara sahip boş bir DataFrame oluşturur."""
+    df = pd.DataFrame(columns=REQUIRED_COLUMNS)
+    df['Tarih'] = pd.to_datetime(df['Tarih'])
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col])
+    return apply_schema(df)
+
+
+def pad_row(satir):
+    """E-Tablonun sondaki boş hücreleri kırptığı satırı gerekli sütun sayısına tamamlar."""
+    return (list(satir) + [''] * len(REQUIRED_COLUMNS))[:len(REQUIRED_COLUMNS)]
+
+
+def parse_tr_numbers(seri):
+    """Türkçe biçimli sayı metinlerini ('1.234,56') tek geçişte float'a çevirir.
+
+    (değerler, hatalı) döndürür: boş hücreler NaN'dır ama hatalı sayılmaz; hatalı,
+    boş olmayıp sayıya çevrilemeyen hücrelerin maskesidir.
+    """
+    metin = seri.astype(str).str.translate(_TR_SAYI_CEVIRI)
+    degerler = pd.to_numeric(metin, errors='coerce')
+
+    hatali = pd.Series(False, index=seri.index)
+    bos_olmayan = degerler.isna()
+    if bos_olmayan.any():
+        hatali[bos_olmayan] = metin[bos_olmayan].str.strip() != ''
+    return degerler, hatali
+
+
+def parse_sheet_values(satirlar, ilk_etiket=0, hatalar=None):
+    """E-Tablodan metin olarak gelen veri satırlarını (başlık hariç) sayısal DataFrame'e çevirir.
+
+    Index etiketleri satırların E-Tablodaki sırasını (başlık hariç, ilk_etiket'ten başlayarak)
+    gösterir; tarihi okunamayan satırlar atılır ama etiketler kaydırılmaz. hatalar bir liste
+    olarak verilirse, okunamayan her hücre için (etiket, sütun, değer) eklenir.
+    """
+    df = pd.DataFrame(satirlar, columns=REQUIRED_COLUMNS, index=range(ilk_etiket, ilk_etiket + len(satirlar)))
+    
+    # --- BURASI SAYISALA (NUMERIC) ÇEVİRME YERİ ---
+    ham_tarih = df['Tarih']
+    df['Tarih'] = pd.to_datetime(ham_tarih, errors='coerce')
+    if hatalar is not None:
+        for etiket in df.index[df['Tarih'].isna()]:
+            hatalar.append((int(etiket), 'Tarih', ham_tarih[etiket]))
+    
+    for col in NUMERIC_COLUMNS:
+        degerler, hatali = parse_tr_numbers(df[col])
+        if hatalar is not None and hatali.any():
+            hatalar.extend((int(etiket), col, deger) for etiket, deger in df.loc[hatali, col].items())
+        df[col] = degerler.fillna(0)
+
+    return apply_schema(df.dropna(subset=['Tarih']))
+
+
+def normalize_types(df):
+    """Düzenleyiciden (data_editor) gelen değerlerin veri tiplerini tekrar doğrular."""
+    df = df.astype({'Masraf Türü': object, 'Dolum Türü': object})
+    df['Tarih'] = pd.to_datetime(df['Tarih'])
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    df = df.replace(r'^\s*$', pd.NA, regex=True)
+    return apply_schema(df)
+
+
+def _format_unique(degerler, bicimle):
+    """Her farklı değeri bir kez metne çevirip bütün diziye dağıtır (tekrarı çok olan sütunlar için)."""
+    tekil, konum = np.unique(degerler, return_inverse=True)
+    return np.array([bicimle(d) for d in tekil.tolist()], dtype=object)[konum.reshape(-1)]
+
+
+def format_tr_decimals(degerler):
+    """Sayıları iki ondalıklı Türkçe metne ('1234,56', '-0,50') çevirir.
+
+    f"{x:.2f}".replace('.', ',') ile aynı sonucu verir (yuvarlama dahil); NaN boş metin olur.
+    Her farklı değer np.unique ile bir kez biçimlenir (bkz. _format_unique).
+    """
+    x = np.asarray(degerler, dtype=float)
+    bos = ~np.isfinite(x)
+    # Tekilleştirme bit desenine göre yapılır: -0.0 ile 0.0 ayrı kalır ('-0,00' / '0,00')
+    tekil, konum = np.unique(np.where(bos, 0.0, x).view(np.int64), return_inverse=True)
+    metin = np.array([f"{v:.2f}".replace('.', ',') for v in tekil.view(np.float64).tolist()],
+                     dtype=object)[konum.reshape(-1)]
+    metin[bos] = ''
+    return metin
+
+
+def format_tr_dates(tarihler):
+    """Tarihleri 'YYYY-AA-GG' metnine çevirir; her farklı gün bir kez biçimlenir, NaT boş olur."""
+    gunler = np.asarray(tarihler, dtype='datetime64[ns]').astype('datetime64[D]')
+    bos = np.isnat(gunler)
+    metin = _format_unique(np.where(bos, np.datetime64(0, 'D'), gunler).view(np.int64),
+                           lambda g: str(np.datetime64(g, 'D')))
+    metin[bos] = ''
+    return metin
+
+
+def _format_text(seri):
+    """Metin veya kategori sütununu boşlar '' olacak şekilde metne çevirir."""
+    if isinstance(seri.dtype, pd.CategoricalDtype):
+        kodlar = seri.cat.codes.to_numpy()
+        kategoriler = np.array([str(k) for k in seri.cat.categories] + [''], dtype=object)
+        return kategoriler[kodlar]  # kod -1 (boş) son elemana, '' değerine düşer
+    return seri.astype(object).fillna('').astype(str).to_numpy(dtype=object)
+
+
+def format_for_sheets(df):
+    """Sayısal DataFrame'i Google Sheets'e yollanacak metin satırlarına (list of lists) çevirir.
+
+    Her sütun tek geçişte metne çevrilir (satır satır apply yok); satırlar en sonda bir kez kurulur.
+    """
+    sutunlar = {
+        'Tarih': format_tr_dates(df['Tarih']),
+        'KM Sayacı': df['KM Sayacı'].to_numpy().astype(str).astype(object),
+        'Taksit Sayısı': _format_unique(df['Taksit Sayısı'].to_numpy(), str),
+        'Tutar': format_tr_decimals(df['Tutar']),
+        'Litre': format_tr_decimals(df['Litre']),
+    }
+    for col in ['Masraf Türü', 'Açıklama', 'Dolum Türü']:
+        sutunlar[col] = _format_text(df[col])
+    return [list(satir) for satir in zip(*(sutunlar[col] for col in REQUIRED_COLUMNS))]
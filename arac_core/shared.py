@@ -0,0 +1,207 @@
+"""Bütün oturumların paylaştığı, sürüm damgalı tek veri kopyası ve iyimser eşzamanlı yazma."""
+
+import threading
+import uuid
+
+import pandas as pd
+
+from . import metrics
+from .cache import data_version
+from .consumption import RollingFuelMetrics
+from .rollups import Rollups
+from .schema import REQUIRED_COLUMNS
+from .storage import ConflictError, SheetDriftError
+
+
+class DatasetState:
+    """Verinin yayınlanmış bir sürümü: DataFrame, sürüm damgası, özet tablolar ve sıra numarası.
+
+    Yayınlandıktan sonra hiçbir parçası değiştirilmez; oturumlar aynı nesneyi kopyalamadan
+    okur. generation her yüklemede ve yazmada bir artar (iyimser eşzamanlılık için).
+    version analiz önbelleğinin anahtarıdır; verilmezse içerikten hesaplanır (O(n)).
+    Kayan yakıt metrikleri ilk istendiğinde kurulur; eklemelerde öncekinden uzatılır.
+    """
+
+    __slots__ = ("df", "version", "rollups", "generation", "yakit")
+
+    def __init__(self, df, rollups, generation, yakit=None, version=None):
+        self.df = df
+        if version is None:
+            with metrics.span("data_version", satir=len(df)):
+                version = data_version(df)
+        self.version = version
+        with metrics.span("rollups"):
+            self.rollups = rollups if rollups is not None else Rollups.from_frame(df)
+        self.generation = generation
+        self.yakit = yakit
+
+    def fuel_metrics(self):
+        """Varsayılan pencereli kayan yakıt metrikleri (bkz. consumption.RollingFuelMetrics)."""
+        if self.yakit is None:
+            # Aynı anda iki oturum kurarsa ikisi de aynı sonucu bulur; sonuncusu kalır
+            with metrics.span("fuel_metrics"):
+                self.yakit = RollingFuelMetrics.from_frame(self.df)
+        return self.yakit
+
+    def extended_fuel_metrics(self, df_yeni):
+        """Yeni satırlar eklenince geçerli olacak metrikler; kurulmamışsa veya artımlı eklenemiyorsa None."""
+        return self.yakit.extend(df_yeni) if self.yakit is not None else None
+
+
+def _row_hashes(df):
+    """Satırların içerik özetleri (index hariç); aynı içerikli satırlar aynı özeti alır."""
+    return pd.util.hash_pandas_object(df[REQUIRED_COLUMNS], index=False)
+
+
+def rebase_changeset(df_temel, df_guncel, changeset):
+    """Eski bir sürüme göre hazırlanmış değişiklik setinin etiketlerini güncel veriye taşır.
+
+    Düzenlenen ve silinen her satır, güncel veride içeriği aynı kalmış bir satırla eşlenir
+    (önce aynı etiket denenir; Sheets'te araya eklenen satırlar etiketleri kaydırır).
+    Eşlenemeyen satır başka bir oturumda düzenlenmiş veya silinmiştir: ConflictError.
+    Eklenen satırlar etikete bağlı olmadığı için olduğu gibi kalır.
+    """
+    etiketler = sorted(set(changeset["duzenlenen"]) | set(changeset["silinen"]))
+    if not etiketler:
+        return changeset
+
+    temel_ozet = _row_hashes(df_temel.loc[[e for e in etiketler if e in df_temel.index]])
+    guncel_ozet = _row_hashes(df_guncel)
+    adaylar = {}
+    for etiket, ozet in guncel_ozet[guncel_ozet.isin(temel_ozet.to_numpy())].items():
+        adaylar.setdefault(ozet, []).append(etiket)
+
+    esleme = {}
+    # Önce etiketi değişmemiş satırlar, sonra kaymış olanlar (aynı içerikli satırlar sırayla)
+    for etiket, ozet in temel_ozet.items():
+        if etiket in adaylar.get(ozet, ()):
+            esleme[etiket] = etiket
+            adaylar[ozet].remove(etiket)
+    for etiket, ozet in temel_ozet.items():
+        if etiket not in esleme and adaylar.get(ozet):
+            esleme[etiket] = adaylar[ozet].pop(0)
+
+    cakisan = [e for e in etiketler if e not in esleme]
+    if cakisan:
+        raise ConflictError(
+            f"{len(cakisan)} kayıt siz düzenlerken başka bir oturumda değiştirildi veya silindi; "
+            "güncel veriyi yükleyip değişikliklerinizi tekrar yapın."
+        )
+    return {
+        "duzenlenen": {esleme[e]: d for e, d in changeset["duzenlenen"].items()},
+        "eklenen": changeset["eklenen"],
+        "silinen": sorted(esleme[e] for e in changeset["silinen"]),
+    }
+
+
+class SharedDataset:
+    """Bir depolamanın verisini süreç boyunca tek kopya olarak tutar.
+
+    Okumalar kilitsizdir: current() yayınlanmış son DatasetState'i döndürür. Yazmalar bir
+    kilit altında sırayla, her zaman en son sürümün üzerine yapılır ve yeni bir sürüm
+    yayınlar; böylece oturumlar birbirinin eklediği satırları ezemez:
+
+    - append: yeni satırlar en son sürüme eklenir (birleştirme her zaman mümkündür).
+    - apply_changeset: set, oturumun aldığı sürüme göre hazırlanmıştır. Sürüm ilerlediyse
+      etiketler rebase_changeset ile taşınır; dokunulan satır değişmişse ConflictError.
+    - rewrite: en son sürümü sıralayıp baştan yazar.
+
+    E-Tablo süreç dışından (CLI, başka bir sunucu, elle) değiştirildiyse depolama yazmayı
+    göndermeden SheetDriftError verir; veri yeniden yüklenir ve yazma bir kez daha denenir.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._durum = None
+        self._yazma_kilidi = threading.RLock()
+        # Yazmalarla yayınlanan sürümlerin damgası bu kimlik ve sıra numarasıdır
+        self._kimlik = uuid.uuid4().hex[:12]
+
+    # --- Okuma ---
+
+    def current(self):
+        """Yayınlanmış son sürümü döndürür; ilk çağrıda veriyi depolamadan yükler."""
+        durum = self._durum
+        if durum is None:
+            with self._yazma_kilidi:
+                if self._durum is None:
+                    self._publish(self.storage.load())
+                durum = self._durum
+        return durum
+
+    def peek(self):
+        """Son sürümü yüklemeye çalışmadan döndürür (henüz yüklenmediyse None)."""
+        return self._durum
+
+    def reload(self):
+        """Veriyi depolamadan yeniden yükleyip yeni sürüm olarak yayınlar."""
+        with self._yazma_kilidi:
+            return self._publish(self.storage.load())
+
+    # --- Yazma ---
+
+    def _publish(self, df, rollups=None, yakit=None, yazma=False):
+        """Yeni sürümü yayınlar.
+
+        Yüklenen veri içerik damgasıyla sürümlenir: aynı içeriği yeniden yüklemek önbelleği
+        korur. Yazmalarda içerik tekrar özetlenmez (ekleme başına O(n) olurdu); sürüm,
+        bu veri kümesinin kimliği ve sıra numarasıdır.
+        """
+        onceki = self._durum
+        generation = 0 if onceki is None else onceki.generation + 1
+        surum = f"{self._kimlik}:{generation}" if yazma else None
+        self._durum = DatasetState(df, rollups, generation, yakit, surum)
+        return self._durum
+
+    def commit(self, yaz):
+        """yaz(en_son_durum) → (df, rollups[, yakit]) yazma kilidi altında çalıştırılır ve sonucu yayınlanır.
+
+        rollups None ise özetler yeni veriden kurulur; yakit (kayan yakıt metrikleri) None
+        ise ilk istendiğinde kurulur. yaz veriyi değiştirmediyse (aynı DataFrame'i
+        döndürdüyse) yeni sürüm yayınlanmaz. E-Tablo dışarıdan değiştirildiyse
+        (SheetDriftError) veri yeniden yüklenir ve yaz bir kez daha çağrılır.
+        """
+        with self._yazma_kilidi:
+            durum = self.current()
+            try:
+                df, rollups, *yakit = yaz(durum)
+            except SheetDriftError:
+                with metrics.span("reload.drift"):
+                    durum = self.reload()
+                df, rollups, *yakit = yaz(durum)
+            if df is durum.df:
+                return durum
+            return self._publish(df, rollups, *yakit, yazma=True)
+
+    def append(self, df_yeni, dogrula=None):
+        """Yeni satırları en son sürüme ekler.
+
+        dogrula(durum) verilirse yazmadan önce, yazma kilidi altında en son sürümle çağrılır;
+        hata verirse (örn. ConflictError) hiçbir şey yazılmaz. Oturumun gösterdiği eski
+        sürüme göre yapılan kontroller (son KM gibi) başka oturumların kayıtlarını görmez.
+        """
+        def yaz(durum):
+            if dogrula is not None:
+                dogrula(durum)
+            df = self.storage.append(durum.df, df_yeni)
+            rollups = durum.rollups.copy()
+            rollups.add_rows(df_yeni)
+            return df, rollups, durum.extended_fuel_metrics(df_yeni)
+        return self.commit(yaz)
+
+    def apply_changeset(self, changeset, temel):
+        """temel sürümüne göre hazırlanmış değişiklik setini en son sürüme uygular."""
+        def yaz(durum):
+            guncel_set = changeset
+            if durum.generation != temel.generation:
+                guncel_set = rebase_changeset(temel.df, durum.df, changeset)
+            df = self.storage.apply_changeset(durum.df, guncel_set)
+            rollups = durum.rollups.copy()
+            rollups.apply_changeset(durum.df, guncel_set)
+            return df, rollups
+        return self.commit(yaz)
+
+    def rewrite(self):
+        """En son sürümü sıralayıp baştan yazar."""
+        # Sıralama içeriği değiştirmez; özetler ve yakıt metrikleri aynen geçerlidir
+        return self.commit(lambda durum: (self.storage.rewrite(durum.df), durum.rollups, durum.yakit))
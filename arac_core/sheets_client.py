@@ -0,0 +1,100 @@
+"""Süreç boyunca yaşayan, paylaşılan Google Sheets istemcisi ve çalışma sayfası bağlantıları."""
+
+import threading
+from datetime import datetime, timedelta, timezone
+
+# Erişim jetonu bitmeden bu kadar önce yenilenir (istek sırasında yenileme beklenmesin)
+VARSAYILAN_YENILEME_PAYI = timedelta(minutes=5)
+# Aynı anda açık tutulacak en fazla HTTPS bağlantısı (oturumlar aynı havuzu kullanır)
+VARSAYILAN_BAGLANTI_SAYISI = 10
+
+# Bu durum kodları bağlantının gerçekten bozulduğunu gösterir; 429 ve 5xx geçicidir
+_YETKI_HATALARI = {401}
+_ERISIM_HATALARI = {403, 404}
+
+
+def _http_session(client):
+    """gspread istemcisinin kullandığı requests oturumunu (AuthorizedSession) bulur."""
+    http_client = getattr(client, "http_client", None)  # gspread >= 6
+    return getattr(http_client, "session", None) or getattr(client, "session", None)
+
+
+def _status_code(hata):
+    """gspread.exceptions.APIError ve benzerlerinden HTTP durum kodunu okur."""
+    return getattr(getattr(hata, "response", None), "status_code", None)
+
+
+class SheetsClientPool:
+    """Yetkili gspread istemcisini ve açılmış çalışma sayfalarını süreç boyunca saklar.
+
+    Kimlik doğrulama ve gc.open() sadece ilk kullanımda (veya gerçek bir hatadan sonra)
+    yapılır. Jeton, bitmesine yenileme_payi kalınca aynı HTTP oturumu üzerinden önceden
+    yenilenir. Bütün metotlar thread güvenlidir.
+    """
+
+    def __init__(self, credentials, yenileme_payi=VARSAYILAN_YENILEME_PAYI,
+                 baglanti_sayisi=VARSAYILAN_BAGLANTI_SAYISI):
+        self._creds = credentials
+        self._yenileme_payi = yenileme_payi
+        self._baglanti_sayisi = baglanti_sayisi
+        self._client = None
+        self._sayfalar = {}
+        self._kilit = threading.RLock()
+
+    def _authorize(self):
+        import gspread
+        from requests.adapters import HTTPAdapter
+
+        client = gspread.authorize(self._creds)
+        session = _http_session(client)
+        if session is not None:
+            adapter = HTTPAdapter(pool_connections=self._baglanti_sayisi, pool_maxsize=self._baglanti_sayisi)
+            session.mount("https://", adapter)
+        return client
+
+    def _refresh_if_needed(self):
+        """Jeton yoksa veya bitmek üzereyse yeniler."""
+        from google.auth.transport.requests import Request
+
+        bitis = getattr(self._creds, "expiry", None)  # google-auth: saat dilimsiz UTC
+        simdi = datetime.now(timezone.utc).replace(tzinfo=None)
+        if self._creds.token is None or bitis is None or bitis - simdi < self._yenileme_payi:
+            self._creds.refresh(Request(_http_session(self._client)))
+
+    def client(self):
+        """Yetkili gspread istemcisini döndürür."""
+        with self._kilit:
+            if self._client is None:
+                self._client = self._authorize()
+            self._refresh_if_needed()
+            return self._client
+
+    def worksheet(self, sheet_name, worksheet_name):
+        """Adıyla açılmış çalışma sayfasını döndürür; sadece ilk seferde E-Tablo açılır."""
+        with self._kilit:
+            client = self.client()
+            anahtar = (sheet_name, worksheet_name)
+            if anahtar not in self._sayfalar:
+                self._sayfalar[anahtar] = client.open(sheet_name).worksheet(worksheet_name)
+            return self._sayfalar[anahtar]
+
+    def handle_error(self, hata):
+        """Bir istek hatasından sonra sadece bozulan kısmı atar.
+
+        401: istemci ve sayfalar yeniden oluşturulur. 403/404: sayfalar yeniden açılır
+        (paylaşım veya ad değişmiş olabilir). Kota (429) ve sunucu (5xx) hataları geçicidir;
+        bağlantılar korunur.
+        """
+        durum = _status_code(hata)
+        with self._kilit:
+            if durum in _YETKI_HATALARI:
+                self._client = None
+                self._sayfalar.clear()
+            elif durum in _ERISIM_HATALARI:
+                self._sayfalar.clear()
+
+    def invalidate(self):
+        """Bütün bağlantıları atar; bir sonraki istek yeniden yetkilendirir."""
+        with self._kilit:
+            self._client = None
+            self._sayfalar.clear()
@@ -0,0 +1,146 @@
+"""Google Sheets verisinin yerel diskte tutulan (Parquet) anlık görüntüsü."""
+
+import atexit
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+# Anlık görüntünün biçimi değişirse artırın; eski dosyalar geçersiz sayılır
+SNAPSHOT_SEMA_SURUMU = 2
+
+DEFAULT_SNAPSHOT_DIR = ".arac_cache"
+# Bu süreden eski anlık görüntüler, tam indirme ile yenilenir (saniye)
+DEFAULT_SNAPSHOT_MAX_AGE = 24 * 60 * 60
+
+
+class SheetSnapshot:
+    """Tipli DataFrame'i Parquet dosyasına, üst bilgisini yanındaki JSON dosyasına yazar.
+
+    Üst bilgi: E-Tablodaki satır sayısı, E-Tablonun son değişiklik zamanı (biliniyorsa),
+    son tam indirmenin zamanı ve Parquet dosyasının özeti (sha256). Üst bilgi en son
+    yazılır; yarım kalmış bir yazmada özet tutmaz ve anlık görüntü okunmaz.
+
+    Kayıtlardan sonraki durumlar hemen yazılmaz (stage): diskteki eski anlık görüntü
+    geçersiz kılınır, yeni durum bir sonraki flush'ta (yüklemede veya yazıcı boşta
+    kaldığında, en geç süreç kapanırken) tek seferde yazılır. Anlık görüntü sadece hızlandırma içindir; okunamazsa
+    veya yazılamazsa (örn. pyarrow kurulu değilse) sessizce yok sayılır.
+    """
+
+    def __init__(self, path, max_age=DEFAULT_SNAPSHOT_MAX_AGE):
+        self.path = path
+        self.meta_path = path + ".json"
+        self.max_age = max_age
+        self._kilit = threading.Lock()
+        # Diske yazılmamış son durum: (df, satir_sayisi)
+        self._bekleyen = None
+        # Son tam indirmenin zamanı; üst bilgi silindikten sonra da korunur
+        self._tam_indirme = None
+        self._atexit_kayitli = False
+
+    def read(self):
+        """(df, meta) döndürür; dosya yoksa, bozuksa, yarım yazılmışsa veya çok eskiyse None döndürür."""
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("sema") != SNAPSHOT_SEMA_SURUMU:
+                return None
+            if time.time() - meta.get("tam_indirme", 0) > self.max_age:
+                return None
+            with open(self.path, "rb") as f:
+                veri = f.read()
+            if hashlib.sha256(veri).hexdigest() != meta.get("ozet"):
+                return None
+            self._tam_indirme = meta["tam_indirme"]
+            return pd.read_parquet(io.BytesIO(veri)), meta
+        except Exception:
+            return None
+
+    def write(self, df, satir_sayisi, surum=None, tam_indirme=None):
+        """Anlık görüntüyü hemen yazar; bekleyen (stage edilmiş) durum varsa onun yerini alır.
+
+        tam_indirme verilmezse önceki tam indirmenin zamanı korunur.
+        """
+        with self._kilit:
+            self._bekleyen = None
+            self._write(df, satir_sayisi, surum, tam_indirme)
+
+    def stage(self, df, satir_sayisi):
+        """E-Tabloya yazılmış yeni durumu diske yazmadan saklar (bkz. flush).
+
+        Diskteki anlık görüntü artık E-Tabloyla uyuşmaz; üst bilgisi silinir ki bu süreç
+        yazamadan kapanırsa bir sonraki açılış tam indirme yapsın.
+        """
+        with self._kilit:
+            if self._bekleyen is None:
+                if self._tam_indirme is None:
+                    self._tam_indirme = self._saved_full_download()
+                _remove(self.meta_path)
+                if not self._atexit_kayitli:
+                    # Süreç düzgün kapanırken bekleyen durum kaybolmasın
+                    atexit.register(self.flush)
+                    self._atexit_kayitli = True
+            self._bekleyen = (df, satir_sayisi)
+
+    def flush(self):
+        """Bekleyen durumu (varsa) diske yazar."""
+        with self._kilit:
+            if self._bekleyen is not None:
+                df, satir_sayisi = self._bekleyen
+                self._bekleyen = None
+                self._write(df, satir_sayisi)
+
+    def invalidate(self):
+        """Anlık görüntüyü siler; bir sonraki yükleme tam indirme yapar."""
+        with self._kilit:
+            self._bekleyen = None
+            for yol in (self.meta_path, self.path):
+                _remove(yol)
+
+    def _saved_full_download(self):
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                return json.load(f).get("tam_indirme", 0)
+        except Exception:
+            return 0
+
+    def _write(self, df, satir_sayisi, surum=None, tam_indirme=None):
+        """Önce Parquet, sonra özetiyle birlikte üst bilgi; ikisi de geçici dosyadan os.replace ile."""
+        if tam_indirme is None:
+            tam_indirme = self._tam_indirme if self._tam_indirme is not None else self._saved_full_download()
+        try:
+            tampon = io.BytesIO()
+            df.to_parquet(tampon)
+            veri = tampon.getvalue()
+            meta = {
+                "sema": SNAPSHOT_SEMA_SURUMU,
+                "satir_sayisi": int(satir_sayisi),
+                "surum": surum,
+                "tam_indirme": tam_indirme,
+                "ozet": hashlib.sha256(veri).hexdigest(),
+            }
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            _replace(self.path, veri)
+            _replace(self.meta_path, json.dumps(meta).encode("utf-8"))
+            self._tam_indirme = tam_indirme
+        except Exception:
+            for yol in (self.meta_path, self.path):
+                _remove(yol)
+
+
+def _replace(yol, veri):
+    """Dosyayı geçici dosyaya yazıp tek hamlede (os.replace) değiştirir."""
+    with open(yol + ".tmp", "wb") as f:
+        f.write(veri)
+    os.replace(yol + ".tmp", yol)
+
+
+def _remove(yol):
+    try:
+        os.remove(yol)
+    except OSError:
+        pass
@@ -0,0 +1,763 @@
+"""Masraf verisinin saklandığı yerler (Google Sheets, yerel SQLite) için ortak arayüz."""
+
+import abc
+import contextlib
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from .schema import (
+    REQUIRED_COLUMNS, SIRALAMA_SUTUNLARI,
+    apply_schema, create_empty_dataframe, format_for_sheets, normalize_types, pad_row, parse_sheet_values,
+)
+from . import metrics
+from .snapshot import SheetSnapshot
+
+DEFAULT_SQLITE_PATH = "arac_masraflari.db"
+DEFAULT_SQLITE_TABLE = "masraflar"
+# Baştan yazmada tek bir update isteğiyle gönderilecek en fazla satır (istek boyutu sınırı)
+VARSAYILAN_YUKLEME_PARCASI = 5000
+
+
+class StorageError(Exception):
+    """Depolama katmanından kullanıcıya gösterilecek hatalar."""
+
+
+class ConflictError(StorageError):
+    """Kaydedilmek istenen satırlar, veri okunduktan sonra başka bir yerde değiştirildi."""
+
+
+class SheetDriftError(ConflictError):
+    """E-Tablonun satırları, hafızadaki model okunduktan sonra başka bir yerden kaydırıldı veya değiştirildi.
+
+    Satır eşleşmesi geçersizdir; veri yeniden yüklendikten sonra yazma tekrar planlanabilir.
+    """
+
+
+#
+# --- DEĞİŞİKLİK SETİ (CHANGESET) ---
+#
+# Değişiklik seti bir sözlüktür:
+#   "duzenlenen": {etiket: {sütun: yeni_değer}}  (etiket = df_main index'i)
+#   "eklenen":    yeni satırların DataFrame'i
+#   "silinen":    silinecek etiketlerin listesi
+#
+def changeset_from_editor(editor_df, editor_state):
+    """st.data_editor'ün düzenleme durumunu (edited/added/deleted rows) değişiklik setine çevirir.
+
+    Düzenleyici satırları konuma göre verir; konumlar editor_df üzerinden df_main etiketlerine çevrilir.
+    """
+    etiketler = editor_df.index
+    duzenlenen = {
+        int(etiketler[int(konum)]): dict(degisiklikler)
+        for konum, degisiklikler in editor_state.get("edited_rows", {}).items()
+    }
+    silinen = sorted(int(etiketler[int(konum)]) for konum in editor_state.get("deleted_rows", []))
+    eklenen = pd.DataFrame(editor_state.get("added_rows", []), columns=REQUIRED_COLUMNS)
+    return {"duzenlenen": duzenlenen, "eklenen": eklenen, "silinen": silinen}
+
+
+def diff_frames(onceki_df, sonraki_df):
+    """İki DataFrame'i index etiketine göre karşılaştırıp değişiklik setini çıkarır.
+
+    Düzenleme durumu bulunamadığında (örn. eski bir Streamlit sürümü) yedek yol olarak kullanılır.
+    """
+    ortak = onceki_df.index.intersection(sonraki_df.index)
+    silinen = sorted(int(e) for e in onceki_df.index.difference(sonraki_df.index))
+    eklenen = sonraki_df.loc[sonraki_df.index.difference(onceki_df.index), REQUIRED_COLUMNS]
+
+    onceki_str = pd.DataFrame(format_for_sheets(normalize_types(onceki_df.loc[ortak])), index=ortak, columns=REQUIRED_COLUMNS)
+    sonraki_str = pd.DataFrame(format_for_sheets(normalize_types(sonraki_df.loc[ortak])), index=ortak, columns=REQUIRED_COLUMNS)
+    farkli = onceki_str.ne(sonraki_str)
+
+    duzenlenen = {}
+    for etiket in farkli.index[farkli.any(axis=1)]:
+        sutunlar = farkli.columns[farkli.loc[etiket]]
+        duzenlenen[int(etiket)] = sonraki_df.loc[etiket, sutunlar].to_dict()
+    return {"duzenlenen": duzenlenen, "eklenen": eklenen, "silinen": silinen}
+
+
+def edited_rows(df_mevcut, duzenlenen):
+    """Sadece düzenlenen satırların yeni hallerini (tipleri doğrulanmış) döndürür."""
+    etiketler = sorted(e for e in duzenlenen if e in df_mevcut.index)
+    df_duzenlenen = df_mevcut.loc[etiketler].astype(object)
+    for etiket in etiketler:
+        for sutun, deger in duzenlenen[etiket].items():
+            df_duzenlenen.at[etiket, sutun] = deger
+    return normalize_types(df_duzenlenen)
+
+
+def _apply_edits(df_mevcut, duzenlenen):
+    """Düzenlemeleri hafızadaki DataFrame'e uygular; güncel DataFrame'i ve düzenlenen satırları döndürür."""
+    df_duzenlenen = edited_rows(df_mevcut, duzenlenen)
+    etiketler = df_duzenlenen.index
+    df_guncel = apply_schema(pd.concat([df_mevcut.drop(index=etiketler), df_duzenlenen]).sort_index())
+    return df_guncel, df_duzenlenen
+
+
+def _is_sorted(df):
+    """DataFrame'in (Tarih, KM Sayacı) sırasında olup olmadığını kontrol eder."""
+    tarih = df['Tarih'].values
+    km = df['KM Sayacı'].values
+    return bool(((tarih[1:] > tarih[:-1]) | ((tarih[1:] == tarih[:-1]) & (km[1:] >= km[:-1]))).all())
+
+
+def _insert_positions(df_mevcut, df_yeni):
+    """Yeni satırların, (Tarih, KM) sırasını bozmadan kaç mevcut satırın arkasına girdiğini hesaplar.
+
+    Mevcut satırlarla eşit anahtarlı yeni satırlar, mevcutların arkasına yerleşir.
+    Dönen konumlar, df_yeni'nin sıralı haliyle aynı sıradadır.
+    """
+    tarih = np.concatenate([df_mevcut['Tarih'].values, df_yeni['Tarih'].values])
+    km = np.concatenate([df_mevcut['KM Sayacı'].values, df_yeni['KM Sayacı'].values])
+    yeni_mi = np.r_[np.zeros(len(df_mevcut), dtype=bool), np.ones(len(df_yeni), dtype=bool)]
+
+    sira = np.lexsort((yeni_mi, km, tarih))
+    mevcut_once = np.cumsum(~yeni_mi[sira])
+    return mevcut_once[yeni_mi[sira]]
+
+
+def _contiguous_runs(degerler):
+    """Sıralı tam sayıları ardışık [başlangıç, bitiş] aralıklarına böler."""
+    araliklar = []
+    for d in degerler:
+        if araliklar and d == araliklar[-1][1] + 1:
+            araliklar[-1][1] = d
+        else:
+            araliklar.append([d, d])
+    return araliklar
+
+
+class Storage(abc.ABC):
+    """Bütün depolama motorlarının uyguladığı işlemler.
+
+    Yazma işlemleri hafızadaki güncel DataFrame'i alır ve yazılanlar uygulanmış yeni
+    DataFrame'i döndürür. Index etiketlerinin anlamı motora aittir (Sheets: satır sırası,
+    SQLite: rowid); çağıran taraf etiketleri olduğu gibi geri vermelidir. Bir işlemi
+    eksik olan motor oluşturulurken TypeError verir.
+    """
+
+    # Yazmaları plan_* / execute olarak ikiye ayırabilen motorlar True yapar
+    supports_planning = False
+
+    def __init__(self):
+        # Son yüklemede okunamayan hücreler: [(etiket, sütun, değer), ...]
+        self.parse_errors = []
+
+    @abc.abstractmethod
+    def load(self):
+        """Bütün kayıtları sayısal DataFrame olarak yükler."""
+
+    @abc.abstractmethod
+    def append(self, df_mevcut, df_yeni):
+        """Yeni satırları ekler."""
+
+    @abc.abstractmethod
+    def update(self, df_mevcut, duzenlenen):
+        """{etiket: {sütun: değer}} biçimindeki düzenlemeleri yazar."""
+
+    @abc.abstractmethod
+    def delete(self, df_mevcut, etiketler):
+        """Verilen etiketlerdeki satırları siler."""
+
+    @abc.abstractmethod
+    def rewrite(self, df):
+        """Bütün veriyi sıralayıp baştan yazar (sıkıştırma)."""
+
+    def apply_changeset(self, df_mevcut, changeset):
+        """Değişiklik setini düzenle → sil → ekle sırasıyla uygular."""
+        silinen = set(changeset["silinen"])
+        duzenlenen = {e: d for e, d in changeset["duzenlenen"].items() if e not in silinen}
+
+        df = df_mevcut
+        if duzenlenen:
+            df = self.update(df, duzenlenen)
+        if silinen:
+            df = self.delete(df, sorted(silinen))
+        if not changeset["eklenen"].empty:
+            df = self.append(df, normalize_types(changeset["eklenen"]))
+        return df
+
+
+#
+# --- GOOGLE SHEETS ---
+#
+class GoogleSheetsStorage(Storage):
+    """Veriyi tek bir Google Sheets çalışma sayfasında tutar.
+
+    Index etiketleri, satırların E-Tablodaki sırasıdır (başlık hariç, 0'dan). Yeni
+    satırlar (Tarih, KM) sırasındaki yerlerine eklenir; eklemeler, düzenlemeler ve
+    silmeler tek bir batch_update çağrısıyla sadece ilgili satırlara yazılır. Baştan
+    yazma, parca_boyutu satırlık aralıklar halinde gönderilir.
+    """
+
+    # Yazmalar plan_* / execute olarak ayrılabilir (bkz. write_behind)
+    supports_planning = True
+
+    def __init__(self, worksheet_provider, snapshot=None, parca_boyutu=VARSAYILAN_YUKLEME_PARCASI):
+        super().__init__()
+        self._worksheet_provider = worksheet_provider
+        # Yerel anlık görüntü (SheetSnapshot); verilirse soğuk açılışta tam indirme yerine kullanılır
+        self._snapshot = snapshot
+        self.parca_boyutu = parca_boyutu
+        # E-Tablodaki veri satırı sayısı (başlık hariç); yüklemeden önce bilinmez
+        self._satir_sayisi = None
+        # E-Tablo ızgarasının satır sayısı (başlık ve boş satırlar dahil); bilinmiyorsa Worksheet.row_count okunur
+        self._izgara = None
+        # Yarıda kesilmiş baştan yazma; bir sonraki yüklemeden önce kaldığı yerden tamamlanır
+        self._yarim_yazma = None
+
+    def _worksheet(self):
+        worksheet = self._worksheet_provider()
+        if worksheet is None:
+            raise StorageError("Kaydedilecek yer bulunamadı (Worksheet bağlantısı yok).")
+        return worksheet
+
+    @staticmethod
+    def _revision(worksheet):
+        """E-Tablonun son değişiklik zamanını ucuz bir üst bilgi çağrısıyla okur; okunamazsa None."""
+        try:
+            spreadsheet = worksheet.spreadsheet
+            if hasattr(spreadsheet, "get_lastUpdateTime"):
+                return spreadsheet.get_lastUpdateTime()
+            return spreadsheet.lastUpdateTime
+        except Exception:
+            return None
+
+    def _remember(self, df, surum=None, tam_indirme=None):
+        """Okunan son durumu yerel anlık görüntüye kaydeder."""
+        if self._snapshot is not None and self._satir_sayisi is not None:
+            self._snapshot.write(df, self._satir_sayisi, surum=surum, tam_indirme=tam_indirme)
+
+    def load(self):
+        with metrics.span("connect"):
+            worksheet = self._worksheet()
+        if self._yarim_yazma is not None:
+            with metrics.span("sheets.resume", satir=self._yarim_yazma.get("yazilan", 0)):
+                self.execute(self._yarim_yazma)
+            self._yarim_yazma = None
+        # Kayıtlardan sonra saklanan durum, okunmadan önce diske yazılır
+        self.flush_snapshot()
+        with metrics.span("sheets.revision"):
+            surum = self._revision(worksheet)
+
+        if self._snapshot is not None:
+            with metrics.span("snapshot.load"):
+                df = self._load_from_snapshot(worksheet, surum)
+            if df is not None:
+                return df
+
+        with metrics.span("sheets.get_all_values"):
+            data = worksheet.get_all_values()
+            metrics.set_attributes(satir=len(data))
+
+        if len(data) < 2:
+            self._satir_sayisi = 0 if data else None
+            return create_empty_dataframe()
+
+        headers = data[0]
+        if headers != REQUIRED_COLUMNS:
+            raise StorageError(f"E-Tablo başlıkları hatalı! Gerekli: {REQUIRED_COLUMNS}")
+
+        self._satir_sayisi = len(data) - 1
+        self.parse_errors = []
+        with metrics.span("parse", satir=len(data) - 1):
+            df = parse_sheet_values(data[1:], hatalar=self.parse_errors)
+        with metrics.span("snapshot.write"):
+            self._remember(df, surum=surum, tam_indirme=time.time())
+        return df
+
+    def _load_from_snapshot(self, worksheet, surum):
+        """Anlık görüntüyü, sadece sonradan eklenen satırları indirerek günceller.
+
+        E-Tablo anlık görüntüden beri değişmediyse hiç satır indirilmez. Değiştiyse
+        bilinen son satır ve arkasındaki yeni satırlar okunur; son satır anlık
+        görüntüdekiyle aynı değilse (silme, sıralama vb.) None döner ve tam indirme yapılır.
+        Aradaki satırlarda başka bir istemcinin yaptığı düzenlemeler, anlık görüntünün
+        azami yaşı dolduğunda yapılan tam indirmeyle alınır.
+        """
+        kayit = self._snapshot.read()
+        if kayit is None:
+            return None
+        metrics.set_attributes(snapshot_satir=kayit[1]["satir_sayisi"])
+        df, meta = kayit
+        satir_sayisi = meta["satir_sayisi"]
+
+        if surum is not None and surum == meta["surum"]:
+            self._satir_sayisi = satir_sayisi
+            return df
+
+        # E-Tablo satırı = etiket + 2; bilinen son satır doğrulama için tekrar okunur
+        with metrics.span("sheets.get_tail"):
+            kuyruk = [pad_row(satir) for satir in worksheet.get(f"A{satir_sayisi + 1}:H")]
+            metrics.set_attributes(satir=len(kuyruk))
+        if not kuyruk or not self._same_row(df, satir_sayisi - 1, kuyruk[0]):
+            return None
+
+        yeni_satirlar = kuyruk[1:]
+        if yeni_satirlar:
+            self.parse_errors = []
+            yeni_df = parse_sheet_values(yeni_satirlar, ilk_etiket=satir_sayisi, hatalar=self.parse_errors)
+            df = apply_schema(pd.concat([df, yeni_df]))
+        self._satir_sayisi = satir_sayisi + len(yeni_satirlar)
+        self._remember(df, surum=surum)
+        return df
+
+    @staticmethod
+    def _same_row(df, etiket, satir):
+        """E-Tablodan okunan metin satırının, hafızadaki etiketle aynı kayıt olup olmadığını kontrol eder."""
+        if etiket < 0:
+            return satir == REQUIRED_COLUMNS
+        if etiket not in df.index:
+            return False
+        okunan = parse_sheet_values([satir], ilk_etiket=etiket)
+        if okunan.empty:
+            return False
+        return format_for_sheets(okunan) == format_for_sheets(df.loc[[etiket]])
+
+    #
+    # Yazmalar iki adımdır: plan_* hafızadaki yeni DataFrame'i ve E-Tabloya gönderilecek
+    # JSON uyumlu işlemi hesaplar (ağ yok), execute işlemi gönderir. İşlemler planlandıkları
+    # sırayla gönderildiği sürece E-Tablo hafızadaki modelle aynı kalır; bu sayede
+    # yazmalar bir kuyrukta bekletilebilir (bkz. write_behind).
+    #
+
+    def row_count(self):
+        """E-Tablodaki veri satırı sayısını (başlık hariç) tek sütun okuyarak bulur."""
+        return max(len(self._worksheet().col_values(1)) - 1, 0)
+
+    def remember(self, df, satir_sayisi):
+        """E-Tabloya yazılmış bir durumu yerel anlık görüntü için saklar (diske flush_snapshot yazar)."""
+        if self._snapshot is not None:
+            self._snapshot.stage(df, satir_sayisi)
+
+    def flush_snapshot(self):
+        """Saklanan son durumu (varsa) yerel anlık görüntüye yazar."""
+        if self._snapshot is not None:
+            with metrics.span("snapshot.write"):
+                self._snapshot.flush()
+
+    def forget(self):
+        """Yerel anlık görüntüyü geçersiz kılar."""
+        if self._snapshot is not None:
+            self._snapshot.invalidate()
+
+    def plan_rewrite(self, df):
+        """Bütün veriyi sıralayıp baştan yazma işlemini planlar."""
+        # 1. Gelen SAYISAL (Numeric) veriyi sırala
+        df_sorted_numeric = apply_schema(df.sort_values(by=SIRALAMA_SUTUNLARI, ascending=True).reset_index(drop=True))
+
+        # 2. METNE (String) çevrilmiş AYRI BİR kopya oluştur
+        with metrics.span("serialize", satir=len(df_sorted_numeric)):
+            satirlar = format_for_sheets(df_sorted_numeric)
+
+        islem = {"tur": "rewrite", "satirlar": [REQUIRED_COLUMNS] + satirlar,
+                 "once": self._satir_sayisi, "sonra": len(df_sorted_numeric)}
+        if self._satir_sayisi is not None:
+            # Sadece satır sayısı: arada eklenmiş bir satır baştan yazmada kaybolmasın
+            islem["kontrol"] = self._expectation(df, [], self._satir_sayisi)
+        self._satir_sayisi = len(df_sorted_numeric)
+        # values.update ızgarayı gerektiği kadar büyütür, sondaki temizleme küçültmez
+        if self._izgara is not None:
+            self._izgara = max(self._izgara, len(islem["satirlar"]))
+        return df_sorted_numeric, islem
+
+    def plan_append(self, df_mevcut, df_yeni):
+        """Yeni satırların (Tarih, KM) sırasındaki yerlerine eklenmesini planlar."""
+        # Sayfa boşsa veya satır eşleşmesi bilinmiyorsa başlıkla birlikte baştan yaz
+        if df_mevcut.empty or self._satir_sayisi is None:
+            return self.plan_rewrite(pd.concat([df_mevcut, df_yeni], ignore_index=True))
+        return self.plan_changeset(df_mevcut, {"duzenlenen": {}, "eklenen": df_yeni, "silinen": []})
+
+    def plan_changeset(self, df_mevcut, changeset):
+        """Değişiklik setini tek bir batch_update işlemi olarak planlar."""
+        if self._satir_sayisi is None:
+            raise StorageError("E-Tablo satır eşleşmesi bilinmiyor, lütfen sayfayı yenileyin.")
+
+        once = self._satir_sayisi
+        worksheet = self._worksheet()
+        izgara = self._izgara if self._izgara is not None else getattr(worksheet, "row_count", None)
+        with metrics.span("serialize"):
+            istekler, df_guncel, sonra, self._izgara = self.build_batch_requests(
+                df_mevcut, changeset, worksheet.id, izgara=izgara
+            )
+            metrics.set_attributes(istek=len(istekler))
+        self._satir_sayisi = sonra
+        etiketler = list(changeset["duzenlenen"]) + list(changeset["silinen"])
+        return df_guncel, {"tur": "batch", "istekler": istekler, "once": once, "sonra": sonra,
+                           "kontrol": self._expectation(df_mevcut, etiketler, once)}
+
+    @staticmethod
+    def _expectation(df_mevcut, etiketler, satir_sayisi):
+        """Gönderimden önce E-Tabloda doğrulanacak durum (bkz. _verify), JSON uyumlu.
+
+        Satır sayısı ile verilen etiketlerin ve son satırın metni kaydedilir.
+        """
+        etiketler = sorted({int(e) for e in etiketler} | {satir_sayisi - 1})
+        etiketler = [e for e in etiketler if e in df_mevcut.index]
+        return {"satir_sayisi": satir_sayisi, "etiketler": etiketler,
+                "satirlar": format_for_sheets(df_mevcut.loc[etiketler]) if etiketler else []}
+
+    def _verify(self, worksheet, kontrol):
+        """E-Tablonun, işlem planlanırken bilinen durumda olduğunu kontrol eder; değilse SheetDriftError.
+
+        İstekler satırları konumlarıyla (etiket + 2) yazar; başka bir yerden (CLI, başka bir
+        sunucu, elle düzenleme) eklenen veya silinen bir satır yazmaları yanlış satırlara
+        kaydırırdı. Dokunulacak satırlar ve son satırla arkasındaki satır (satır sayısı) tek
+        bir batch_get ile okunup kaydedilen metinle karşılaştırılır.
+        """
+        satir_sayisi = kontrol["satir_sayisi"]
+        araliklar = _contiguous_runs(kontrol["etiketler"])
+        with metrics.span("sheets.verify", aralik=len(araliklar) + 1):
+            *parcalar, kuyruk = worksheet.batch_get(
+                [f"A{bas + 2}:H{bit + 2}" for bas, bit in araliklar] + [f"A{satir_sayisi + 1}:H{satir_sayisi + 2}"]
+            )
+
+        # E-Tablo sondaki boş satırları ve hücreleri göndermez
+        satirlar = []
+        for parca, (bas, bit) in zip(parcalar, araliklar):
+            parca = [pad_row(satir) for satir in parca]
+            satirlar += parca + [pad_row([])] * (bit - bas + 1 - len(parca))
+        okunan = parse_sheet_values(satirlar) if satirlar else create_empty_dataframe()
+        kuyruk = [pad_row(satir) for satir in kuyruk]
+
+        son_satir = kuyruk[0] if kuyruk else pad_row([])
+        uyusuyor = (
+            (son_satir == REQUIRED_COLUMNS if satir_sayisi == 0 else any(son_satir))
+            and (len(kuyruk) < 2 or not any(kuyruk[1]))
+            and len(okunan) == len(satirlar)
+            and format_for_sheets(okunan) == kontrol["satirlar"]
+        )
+        if not uyusuyor:
+            raise SheetDriftError(
+                "E-Tablo, veri okunduktan sonra başka bir yerden değiştirilmiş; "
+                "satırlar kaymış olabileceği için yazma gönderilmedi. Lütfen veriyi yeniden yükleyin."
+            )
+
+    def execute(self, islem, ilerleme=None):
+        """Planlanmış bir işlemi E-Tabloya gönderir.
+
+        Baştan yazmada her parçadan sonra ilerleme(gönderilen_satır) çağrılır (bkz. _upload_rows).
+        """
+        worksheet = self._worksheet()
+        if islem.get("kontrol") and not islem.get("yazilan") and (islem["tur"] == "rewrite" or islem["istekler"]):
+            self._verify(worksheet, islem["kontrol"])
+        if islem["tur"] == "rewrite":
+            # METİN veriyi Google'a yolla
+            self._upload_rows(worksheet, islem, ilerleme)
+        elif islem["istekler"]:
+            with metrics.span("sheets.batch_update", istek=len(islem["istekler"]), bayt=metrics.payload_size(islem["istekler"])):
+                worksheet.spreadsheet.batch_update({"requests": islem["istekler"]})
+
+    def _upload_rows(self, worksheet, islem, ilerleme=None):
+        """Baştan yazmayı A1:H5000, A5001:H10000, ... aralıkları halinde sırayla gönderir.
+
+        Sayfa önceden silinmez: parçalar eski satırların üzerine yazılır, en sonda yeni
+        verinin altında kalan eski satırlar temizlenir. Gönderilen satır sayısı
+        islem["yazilan"]'a işlenir; yarıda kesilen işlem tekrar gönderilince kaldığı
+        parçadan devam eder (parçaları tekrar göndermek zararsızdır).
+        """
+        satirlar = islem["satirlar"]
+        bas = islem.get("yazilan", 0)
+        while bas < len(satirlar):
+            parca = satirlar[bas:bas + self.parca_boyutu]
+            with metrics.span("sheets.update", satir=len(parca), bayt=metrics.payload_size(parca)):
+                worksheet.update(parca, range_name=f"A{bas + 1}", value_input_option='USER_ENTERED')
+            bas += len(parca)
+            islem["yazilan"] = bas
+            if ilerleme is not None:
+                ilerleme(bas)
+        with metrics.span("sheets.clear_tail"):
+            worksheet.batch_clear([f"A{len(satirlar) + 1}:H"])
+
+    def _run(self, df, islem):
+        """Planlanmış işlemi hemen gönderir; başarısız olursa satır sayısını geri alır.
+
+        Baştan yazma bazı parçalar gönderildikten sonra kesilirse E-Tablo yarım kalmıştır:
+        satır eşleşmesi bilinmez sayılır ve işlem bir sonraki yüklemede tamamlanır. E-Tablo
+        başka bir yerden değiştirildiyse (SheetDriftError) satır eşleşmesi de anlık görüntü
+        de geçersizdir; bir sonraki yükleme tam indirme yapar.
+        """
+        try:
+            self.execute(islem)
+        except Exception as hata:
+            # Izgaranın büyüyüp büyümediği bilinmez; bir sonraki planlamada tekrar okunur
+            self._izgara = None
+            if isinstance(hata, SheetDriftError):
+                self._satir_sayisi = None
+                self.forget()
+            elif islem["tur"] == "rewrite" and islem.get("yazilan"):
+                self._yarim_yazma = islem
+                self._satir_sayisi = None
+                self.forget()
+            else:
+                self._satir_sayisi = None if self._yarim_yazma is not None else islem["once"]
+            raise
+        if islem["tur"] == "rewrite":
+            self._yarim_yazma = None
+        self.remember(df, islem["sonra"])
+        return df
+
+    def rewrite(self, df):
+        return self._run(*self.plan_rewrite(df))
+
+    def append(self, df_mevcut, df_yeni):
+        # Sona düşen satırlar ızgaranın boş satırlarına (gerekirse appendDimension ile açılan),
+        # araya girenler (geriye tarihli) insertDimension ile açılan yere tek bir batch_update
+        # içinde yapıştırılır
+        return self._run(*self.plan_append(df_mevcut, df_yeni))
+
+    def update(self, df_mevcut, duzenlenen):
+        return self.apply_changeset(df_mevcut, {"duzenlenen": duzenlenen, "eklenen": pd.DataFrame(), "silinen": []})
+
+    def delete(self, df_mevcut, etiketler):
+        return self.apply_changeset(df_mevcut, {"duzenlenen": {}, "eklenen": pd.DataFrame(), "silinen": etiketler})
+
+    def apply_changeset(self, df_mevcut, changeset):
+        return self._run(*self.plan_changeset(df_mevcut, changeset))
+
+    def build_batch_requests(self, df_mevcut, changeset, sheet_id, izgara=None):
+        """Değişiklik setini tek bir batch_update için en küçük istek listesine çevirir.
+
+        Sıra önemlidir: önce düzenlemeler (eski satır numaralarıyla), sonra silmeler
+        (aşağıdan yukarıya), en son eklemeler (silme sonrası numaralarla, aşağıdan yukarıya).
+        izgara, E-Tablo ızgarasının satır sayısıdır (başlık dahil); sona eklenen satırlar
+        ızgaraya sığmıyorsa sadece eksik kadar satır appendDimension ile açılır (None ise
+        ızgaranın veriyle bittiği varsayılır). Yeni DataFrame'i, yeni satır sayısını ve
+        yeni ızgara satır sayısını da döndürür.
+        """
+        istekler = []
+        satir_sayisi = self._satir_sayisi
+        if izgara is None:
+            izgara = satir_sayisi + 1
+        silinen = sorted(set(changeset["silinen"]))
+        df_guncel = df_mevcut
+
+        # 1. Düzenlemeler: sadece gerçekten değişen hücreler
+        duzenlenen = {e: d for e, d in changeset["duzenlenen"].items() if e not in set(silinen)}
+        if duzenlenen:
+            df_guncel, df_duzenlenen = _apply_edits(df_mevcut, duzenlenen)
+            etiketler = df_duzenlenen.index.tolist()
+            eski_str = format_for_sheets(df_mevcut.loc[etiketler])
+            yeni_str = format_for_sheets(df_duzenlenen)
+
+            # Her satırdaki değişen sütunları ardışık aralıklara böl; alt alta aynı aralıkları birleştir
+            bloklar = []
+            for etiket, eski, yeni in zip(etiketler, eski_str, yeni_str):
+                sutunlar = [i for i, (a, b) in enumerate(zip(eski, yeni)) if a != b]
+                for bas, bit in _contiguous_runs(sutunlar):
+                    hucreler = yeni[bas:bit + 1]
+                    onceki = bloklar[-1] if bloklar else None
+                    if onceki and onceki["sutun"] == (bas, bit) and onceki["son"] == etiket - 1:
+                        onceki["satirlar"].append(hucreler)
+                        onceki["son"] = etiket
+                    else:
+                        bloklar.append({"ilk": etiket, "son": etiket, "sutun": (bas, bit), "satirlar": [hucreler]})
+            for blok in bloklar:
+                istekler.append(self._paste_request(sheet_id, blok["ilk"] + 1, blok["sutun"][0], blok["satirlar"]))
+
+        # 2. Silmeler: ardışık satırları tek aralıkta, aşağıdan yukarıya
+        for bas, bit in reversed(_contiguous_runs(silinen)):
+            istekler.append({"deleteDimension": {"range": {
+                "sheetId": sheet_id, "dimension": "ROWS", "startIndex": bas + 1, "endIndex": bit + 2,
+            }}})
+        if silinen:
+            df_guncel = df_guncel.drop(index=silinen, errors='ignore')
+            kayma = np.searchsorted(np.array(silinen), df_guncel.index.values, side='left')
+            df_guncel = df_guncel.set_axis(df_guncel.index.values - kayma)
+            satir_sayisi -= len(silinen)
+            izgara -= len(silinen)
+
+        # 3. Eklemeler: (Tarih, KM) sırasındaki yerlerine, aşağıdan yukarıya
+        eklenen = changeset["eklenen"]
+        if not eklenen.empty:
+            eklenen, hedefler = self._plan_inserts(df_guncel, normalize_types(eklenen), satir_sayisi)
+            gruplar = self._group_targets(hedefler, format_for_sheets(eklenen))
+            for hedef in sorted(gruplar, reverse=True):
+                adet = len(gruplar[hedef])
+                if hedef >= satir_sayisi:
+                    # Veri ızgaranın sonuna kadar gelmiyorsa boş satırlara yapıştırılır
+                    eksik = satir_sayisi + adet + 1 - izgara
+                    if eksik > 0:
+                        istekler.append({"appendDimension": {"sheetId": sheet_id, "dimension": "ROWS", "length": eksik}})
+                        izgara += eksik
+                else:
+                    izgara += adet
+
+                    istekler.append({"insertDimension": {
+                        "range": {"sheetId": sheet_id, "dimension": "ROWS", "startIndex": hedef + 1, "endIndex": hedef + 1 + adet},
+                        "inheritFromBefore": True,
+                    }})
+                istekler.append(self._paste_request(sheet_id, hedef + 1, 0, gruplar[hedef]))
+            df_guncel = self._relabel_after_insert(df_guncel, eklenen, hedefler)
+            satir_sayisi += len(eklenen)
+
+        return istekler, df_guncel, satir_sayisi, izgara
+
+    def _plan_inserts(self, df_mevcut, df_yeni, satir_sayisi=None):
+        """Yeni satırları sıralar ve her birinin E-Tabloda yazılacağı hedef etiketi (satır) döndürür."""
+        if satir_sayisi is None:
+            satir_sayisi = self._satir_sayisi
+        df_yeni = df_yeni[REQUIRED_COLUMNS].sort_values(by=SIRALAMA_SUTUNLARI, kind='stable')
+
+        if not df_mevcut.empty and _is_sorted(df_mevcut):
+            konumlar = _insert_positions(df_mevcut, df_yeni)
+            mevcut_etiketler = np.r_[df_mevcut.index.values, satir_sayisi]
+            hedefler = mevcut_etiketler[konumlar]
+        else:
+            # Sayfa elle bozulmuşsa sıralamayı zorlamadan sona ekle
+            hedefler = np.full(len(df_yeni), satir_sayisi)
+        return df_yeni, hedefler
+
+    @staticmethod
+    def _relabel_after_insert(df_mevcut, df_yeni, hedefler):
+        """Eklemeden sonra hafızadaki DataFrame'i E-Tablo ile aynı satır etiketlerine getirir.
+
+        Hedefin altındaki mevcut etiketler, önlerine eklenen satır sayısı kadar kayar.
+        """
+        kayma = np.searchsorted(hedefler, df_mevcut.index.values, side='right')
+        df_mevcut_kaymis = df_mevcut.set_axis(df_mevcut.index.values + kayma)
+        df_yeni = df_yeni.set_axis(hedefler + np.arange(len(df_yeni)))
+        return apply_schema(pd.concat([df_mevcut_kaymis, df_yeni]).sort_index())
+
+    @staticmethod
+    def _group_targets(hedefler, satirlar):
+        """Aynı hedef satıra yazılacak metin satırlarını gruplar."""
+        gruplar = {}
+        for hedef, satir in zip(hedefler.tolist(), satirlar):
+            gruplar.setdefault(hedef, []).append(satir)
+        return gruplar
+
+    @staticmethod
+    def _paste_request(sheet_id, satir, sutun, satirlar):
+        """Verilen hücreden başlayarak metin satırlarını USER_ENTERED gibi yapıştıran istek."""
+        temiz = lambda h: h.replace('\t', ' ').replace('\r', ' ').replace('\n', ' ')
+        return {"pasteData": {
+            "coordinate": {"sheetId": sheet_id, "rowIndex": satir, "columnIndex": sutun},
+            "data": '\n'.join('\t'.join(temiz(h) for h in satir) for satir in satirlar),
+            "type": "PASTE_VALUES",
+            "delimiter": "\t",
+        }}
+
+
+#
+# --- YEREL SQLITE ---
+#
+class SQLiteStorage(Storage):
+    """Veriyi yerel bir SQLite dosyasında, tipli sütunlarla tutar.
+
+    Index etiketleri SQLite rowid'leridir ve silme/eklemeyle kaymaz. (Tarih, KM)
+    üzerinde bir index vardır; yükleme bu sırayla yapılır.
+    """
+
+    SUTUN_TIPLERI = {
+        "Tarih": "TEXT", "KM Sayacı": "REAL", "Masraf Türü": "TEXT", "Tutar": "REAL",
+        "Açıklama": "TEXT", "Taksit Sayısı": "INTEGER", "Litre": "REAL", "Dolum Türü": "TEXT",
+    }
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH, table=DEFAULT_SQLITE_TABLE):
+        super().__init__()
+        self.path = path
+        self.table = table
+        self._sutunlar = ", ".join(f'"{c}"' for c in REQUIRED_COLUMNS)
+        with self._connect() as con:
+            tanimlar = ", ".join(f'"{c}" {self.SUTUN_TIPLERI[c]}' for c in REQUIRED_COLUMNS)
+            con.execute(f'CREATE TABLE IF NOT EXISTS "{table}" (id INTEGER PRIMARY KEY, {tanimlar})')
+            con.execute(f'CREATE INDEX IF NOT EXISTS "{table}_sira" ON "{table}" ("Tarih", "KM Sayacı")')
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """İşlem (transaction) içinde bir bağlantı açar; çıkışta kaydeder ve kapatır.
+
+        Streamlit her oturumu ayrı thread'de çalıştırdığı için bağlantılar paylaşılmaz.
+        """
+        con = sqlite3.connect(self.path)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    @staticmethod
+    def _records(df):
+        """DataFrame satırlarını SQLite'a yazılacak tuple'lara çevirir."""
+        df = df[REQUIRED_COLUMNS].copy()
+        df['Tarih'] = df['Tarih'].dt.strftime('%Y-%m-%d %H:%M:%S')
+        for col in ['Masraf Türü', 'Açıklama', 'Dolum Türü']:
+            df[col] = df[col].astype(object).fillna('').astype(str)
+        df = df.astype(object).where(df.notna(), None)
+        return list(df.itertuples(index=False, name=None))
+
+    def load(self):
+        with metrics.span("sqlite.select"), self._connect() as con:
+            df = pd.read_sql_query(
+                f'SELECT id, {self._sutunlar} FROM "{self.table}" ORDER BY "Tarih", "KM Sayacı", id',
+                con, index_col='id',
+            )
+            metrics.set_attributes(satir=len(df))
+        if df.empty:
+            return create_empty_dataframe()
+
+        df.index.name = None
+        with metrics.span("parse", satir=len(df)):
+            df['Tarih'] = pd.to_datetime(df['Tarih'])
+            return apply_schema(df)
+
+    def append(self, df_mevcut, df_yeni):
+        yer_tutucular = ", ".join("?" for _ in REQUIRED_COLUMNS)
+        idler = []
+        with self._connect() as con:
+            for kayit in self._records(df_yeni):
+                cur = con.execute(f'INSERT INTO "{self.table}" ({self._sutunlar}) VALUES ({yer_tutucular})', kayit)
+                idler.append(cur.lastrowid)
+
+        df_yeni = df_yeni[REQUIRED_COLUMNS].set_axis(idler)
+        return apply_schema(pd.concat([df_mevcut, df_yeni]).sort_values(by=SIRALAMA_SUTUNLARI, kind='stable'))
+
+    def update(self, df_mevcut, duzenlenen):
+        df_guncel, df_duzenlenen = _apply_edits(df_mevcut, duzenlenen)
+        atamalar = ", ".join(f'"{c}" = ?' for c in REQUIRED_COLUMNS)
+        with self._connect() as con:
+            con.executemany(
+                f'UPDATE "{self.table}" SET {atamalar} WHERE id = ?',
+                [kayit + (int(etiket),) for etiket, kayit in zip(df_duzenlenen.index, self._records(df_duzenlenen))],
+            )
+        return df_guncel.sort_values(by=SIRALAMA_SUTUNLARI, kind='stable')
+
+    def delete(self, df_mevcut, etiketler):
+        with self._connect() as con:
+            con.executemany(f'DELETE FROM "{self.table}" WHERE id = ?', [(int(e),) for e in etiketler])
+        return df_mevcut.drop(index=etiketler, errors='ignore')
+
+    def rewrite(self, df):
+        yer_tutucular = ", ".join("?" for _ in REQUIRED_COLUMNS)
+        df_sorted = df.sort_values(by=SIRALAMA_SUTUNLARI, ascending=True)
+        with self._connect() as con:
+            con.execute(f'DELETE FROM "{self.table}"')
+            con.executemany(
+                f'INSERT INTO "{self.table}" ({self._sutunlar}) VALUES ({yer_tutucular})',
+                self._records(df_sorted),
+            )
+        with self._connect() as con:
+            con.execute("VACUUM")
+        return self.load()
+
+
+def create_storage(backend, worksheet_provider=None, sqlite_path=DEFAULT_SQLITE_PATH, snapshot_path=None,
+                   sqlite_table=DEFAULT_SQLITE_TABLE):
+    """Ayarlardaki motor adına ("sheets" veya "sqlite") göre depolama nesnesini oluşturur.
+
+    snapshot_path verilirse Google Sheets verisi bu yolda yerel olarak önbelleğe alınır.
+    Filo modunda her araç ayrı bir çalışma sayfası veya SQLite tablosudur (bkz. config).
+    """
+    backend = (backend or "sheets").lower()
+    if backend == "sheets":
+        if worksheet_provider is None:
+            raise StorageError("Google Sheets motoru için bir çalışma sayfası bağlantısı gerekli.")
+        snapshot = SheetSnapshot(snapshot_path) if snapshot_path else None
+        return GoogleSheetsStorage(worksheet_provider, snapshot=snapshot)
+    if backend == "sqlite":
+        return SQLiteStorage(sqlite_path, table=sqlite_table)
+    raise StorageError(f"Bilinmeyen depolama motoru: '{backend}'. Seçenekler: sheets, sqlite")
@@ -0,0 +1,439 @@
+"""Yazmaları yerel bir günlüğe (journal) alıp arka planda toplu gönderen depolama sarmalayıcısı."""
+
+import atexit
+import contextlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+from .storage import SheetDriftError, Storage, StorageError
+
+DEFAULT_JOURNAL_PATH = os.path.join(".arac_cache", "yazma_gunlugu.jsonl")
+
+# Tek bir batch_update çağrısında birleştirilecek en fazla istek sayısı
+BIRLESTIRME_SINIRI = 500
+# Tekrar denemeler arasındaki bekleme: 1, 2, 4, ... en fazla 60 saniye (+ rastgele sapma)
+ILK_BEKLEME = 1.0
+EN_UZUN_BEKLEME = 60.0
+# Bu durum kodları geçicidir (kota, sunucu hatası); işlem günlükte kalır ve tekrar denenir
+_GECICI_HATALAR = {408, 429, 500, 502, 503, 504}
+
+
+try:
+    import fcntl
+except ImportError:  # Windows: süreçler arası dosya kilidi yok
+    fcntl = None
+
+
+def _is_transient(hata):
+    """Hatanın tekrar denemeyle geçebilecek (kota, ağ, sunucu) bir hata olup olmadığını söyler."""
+    durum = getattr(getattr(hata, "response", None), "status_code", None)
+    if durum is not None:
+        return durum in _GECICI_HATALAR
+    # requests'in bağlantı/zaman aşımı hataları OSError'dan türer
+    return isinstance(hata, OSError)
+
+
+class PendingWritesError(StorageError):
+    """Önceki oturumdan kalan yazmalar gönderilmeden veri yüklenemez."""
+
+
+def _read_entries(f):
+    """Günlük dosyasındaki tamamlanmamış işlemler, yazıldıkları sırayla: {id: islem}."""
+    bekleyen = {}
+    for satir in f:
+        try:
+            kayit = json.loads(satir)
+        except json.JSONDecodeError:
+            # Çökme sırasında yarım kalmış son satır
+            continue
+        if "tamamlandi" in kayit:
+            bekleyen.pop(kayit["tamamlandi"], None)
+        elif "ilerleme" in kayit:
+            if kayit["ilerleme"] in bekleyen:
+                bekleyen[kayit["ilerleme"]]["yazilan"] = kayit["yazilan"]
+        else:
+            bekleyen[kayit["id"]] = kayit["islem"]
+    return bekleyen
+
+
+class WriteJournal:
+    """Süreç başına bir, sadece sona eklenen (append-only) JSON satırları dosyası.
+
+    Her işlem {"id", "islem"} olarak, gönderilen işlemler {"tamamlandi": id} olarak, parça
+    parça gönderilen baştan yazmaların ilerlemesi {"ilerleme": id, "yazilan": n} olarak
+    yazılır ve her yazmadan sonra dosya diske zorlanır (fsync). Bekleyen işlem kalmayınca
+    dosya boşaltılır.
+
+    Her süreç (arayüz, komut satırı) kendi dosyasına yazar: path 'gunluk.jsonl' ise
+    'gunluk.3f9c2a1b.jsonl'. Dosya süreç yaşadığı sürece kilitli tutulur; açılışta kilidi
+    alınabilen, yani sahibi kapanmış günlüklerin tamamlanmamış işlemleri bu sürecin
+    günlüğüne devralınır ve eski dosya silinir. Çalışan bir sürecin işlemlerine dokunulmaz.
+    fcntl yoksa (Windows) başka süreçlerin günlükleri devralınmaz.
+    """
+
+    def __init__(self, path=DEFAULT_JOURNAL_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._kilit = threading.Lock()
+        self._onek = uuid.uuid4().hex[:8]
+        self._son_id = 0
+        self._bekleyen = {}
+
+        kok, uzanti = os.path.splitext(path)
+        self.own_path = f"{kok}.{self._onek}{uzanti}"
+        # Dosya, kilidi alındıktan sonra adına taşınır: başka bir süreç onu sahipsiz sanmasın
+        self._dosya = open(self.own_path + ".tmp", "a", encoding="utf-8")
+        if fcntl is not None:
+            fcntl.flock(self._dosya.fileno(), fcntl.LOCK_EX)
+        os.replace(self.own_path + ".tmp", self.own_path)
+        if fcntl is not None:
+            self._adopt()
+        atexit.register(self.close)
+
+    def _orphan_candidates(self):
+        """Bu dizindeki diğer günlük dosyaları (ve eski, paylaşılan günlük), eskiden yeniye."""
+        kok, uzanti = os.path.splitext(self.path)
+        desen = re.compile(re.escape(os.path.basename(kok)) + r"\.[0-9a-f]{8}" + re.escape(uzanti))
+        dizin = os.path.dirname(self.path) or "."
+        adaylar = [self.path] + [
+            os.path.join(dizin, ad) for ad in os.listdir(dizin)
+            if desen.fullmatch(ad) and os.path.join(dizin, ad) != self.own_path
+        ]
+        zamanlar = {}
+        for yol in adaylar:
+            try:
+                zamanlar[yol] = os.path.getmtime(yol)
+            except OSError:
+                pass
+        return sorted(zamanlar, key=zamanlar.get)
+
+    def _adopt(self):
+        """Sahibi kapanmış günlüklerin bekleyen işlemlerini bu günlüğe taşır."""
+        for yol in self._orphan_candidates():
+            try:
+                f = open(yol, encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            with f:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    # Sahibi çalışıyor
+                    continue
+                try:
+                    # Kilit alınana kadar başka bir süreç devralıp silmiş olabilir
+                    if not os.path.samestat(os.fstat(f.fileno()), os.stat(yol)):
+                        continue
+                except FileNotFoundError:
+                    continue
+                bekleyen = _read_entries(f)
+                self._write([{"id": i, "islem": islem} for i, islem in bekleyen.items()])
+                self._bekleyen.update(bekleyen)
+                os.remove(yol)
+
+    def _write(self, kayitlar, bosalt=False):
+        """Kayıtları dosyanın sonuna ekler; bosalt ise (bekleyen işlem kalmadıysa) dosyayı boşaltır."""
+        f = self._dosya
+        for kayit in kayitlar:
+            f.write(json.dumps(kayit, ensure_ascii=False, default=str) + "\n")
+        f.flush()
+        if bosalt:
+            f.truncate(0)
+        os.fsync(f.fileno())
+
+    def append(self, islem):
+        """İşlemi kalıcı olarak günlüğe yazar ve numarasını döndürür."""
+        with self._kilit:
+            self._son_id += 1
+            islem_id = f"{self._onek}-{self._son_id}"
+            self._write([{"id": islem_id, "islem": islem}])
+            self._bekleyen[islem_id] = islem
+            return islem_id
+
+    def checkpoint(self, islem_id, yazilan):
+        """Baştan yazmanın ilk yazilan satırının gönderildiğini kaydeder (yeniden başlatmada oradan devam edilir)."""
+        with self._kilit:
+            if islem_id in self._bekleyen:
+                self._write([{"ilerleme": islem_id, "yazilan": yazilan}])
+                self._bekleyen[islem_id]["yazilan"] = yazilan
+
+    def mark_done(self, idler):
+        """Gönderilen işlemleri tamamlandı olarak işaretler."""
+        with self._kilit:
+            for i in idler:
+                self._bekleyen.pop(i, None)
+            self._write([{"tamamlandi": i} for i in idler], bosalt=not self._bekleyen)
+
+    def pending(self):
+        """Tamamlanmamış işlemleri [(id, islem), ...] olarak yazıldıkları sırayla döndürür."""
+        with self._kilit:
+            return list(self._bekleyen.items())
+
+    def close(self):
+        """Dosyayı ve kilidini bırakır; bekleyen işlem varsa dosya bir sonraki açılışta devralınır."""
+        with self._kilit:
+            if self._dosya.closed:
+                return
+            if not self._bekleyen:
+                with contextlib.suppress(OSError):
+                    os.remove(self.own_path)
+            self._dosya.close()
+
+
+class WriteBehindStorage(Storage):
+    """Planlama destekleyen bir depolamayı (örn. GoogleSheetsStorage) arka plan yazıcısıyla sarar.
+
+    append/apply_changeset/rewrite hafızadaki yeni DataFrame'i hemen döndürür; E-Tabloya
+    gönderilecek işlem önce günlüğe yazılır, sonra arka plandaki thread tarafından
+    gönderilir. Arka arkaya bekleyen batch işlemleri tek bir çağrıda birleştirilir;
+    baştan yazma (rewrite) kendisinden önce bekleyen işlemleri gereksiz kılar. Geçici
+    hatalar (429, 5xx, ağ) üstel beklemeyle tekrar denenir.
+
+    Yeniden başlatmada devralınan işlemler (bkz. WriteJournal), veri yüklenmeden önce gönderilir. Bir
+    işlemin gönderilip işaretlenemeden çöktüğü durum satır sayısından anlaşılır ve işlem
+    tekrar gönderilmez (satır sayısını değiştirmeyen işlemler zaten tekrar gönderilebilir).
+    """
+
+    def __init__(self, storage, journal, on_error=None):
+        if not storage.supports_planning:
+            raise StorageError("Arka planda yazma için depolama motoru planlamayı desteklemeli.")
+        self.storage = storage
+        self.journal = journal
+        self._on_error = on_error
+        self._modeller = {}
+        self._kosul = threading.Condition()
+        self._plan_kilidi = threading.Lock()
+        self._hata_bekliyor = False
+        self._durdur = False
+
+        self.yazilan = 0
+        self.son_hata = None
+        self.son_yazma = None
+        self.durum = "bosta"
+
+        # Önceki çalışmadan kalan işlemler, yeni işlem planlanmadan önce gönderilmeli
+        self._replay_pending = bool(journal.pending())
+
+        self._thread = threading.Thread(target=self._worker, name="arac-write-behind", daemon=True)
+        self._thread.start()
+
+    # --- Storage arayüzü ---
+
+    def load(self):
+        """Kuyruk boşsa depolamadan okur; değilse beklemez.
+
+        Bu oturumun bekleyen işlemleri varsa E-Tablonun onlardan sonraki hali, yani son
+        işlemin hafızadaki modeli döndürülür. Önceki oturumdan kalan işlemler için model
+        yoktur: gönderilene kadar PendingWritesError (durum için bkz. status).
+        """
+        with self._plan_kilidi:
+            bekleyen = self.journal.pending()
+            if not bekleyen:
+                return self.storage.load()
+            model = self._modeller.get(bekleyen[-1][0])
+            if model is None:
+                raise PendingWritesError(
+                    f"Önceki oturumdan kalan {len(bekleyen)} yazma E-Tabloya gönderiliyor; "
+                    "veri gönderim bitince yüklenecek."
+                )
+            return model
+
+    @property
+    def parse_errors(self):
+        return self.storage.parse_errors
+
+    def _submit(self, planla, *args):
+        with self._plan_kilidi:
+            if self._replay_pending:
+                raise StorageError("Önceki oturumdan kalan yazmalar gönderilmeden yeni kayıt yapılamaz.")
+            df, islem = planla(*args)
+            islem_id = self.journal.append(islem)
+            self._modeller[islem_id] = df
+        with self._kosul:
+            self._kosul.notify_all()
+        return df
+
+    def append(self, df_mevcut, df_yeni):
+        return self._submit(self.storage.plan_append, df_mevcut, df_yeni)
+
+    def apply_changeset(self, df_mevcut, changeset):
+        return self._submit(self.storage.plan_changeset, df_mevcut, changeset)
+
+    def update(self, df_mevcut, duzenlenen):
+        return self.apply_changeset(df_mevcut, {"duzenlenen": duzenlenen, "eklenen": pd.DataFrame(), "silinen": []})
+
+    def delete(self, df_mevcut, etiketler):
+        return self.apply_changeset(df_mevcut, {"duzenlenen": {}, "eklenen": pd.DataFrame(), "silinen": etiketler})
+
+    def rewrite(self, df):
+        return self._submit(self.storage.plan_rewrite, df)
+
+    # --- Durum ve kontrol ---
+
+    def status(self):
+        """Arayüzde gösterilecek durum: bekleyen/gönderilen sayısı, son hata ve son yazma zamanı."""
+        return {
+            "durum": self.durum,
+            "bekleyen": len(self.journal.pending()),
+            "yazilan": self.yazilan,
+            "son_hata": self.son_hata,
+            "son_yazma": self.son_yazma,
+        }
+
+    def flush(self, timeout=None):
+        """Bekleyen işlemler gönderilene kadar (en fazla timeout saniye) bekler."""
+        bitis = None if timeout is None else time.monotonic() + timeout
+        with self._kosul:
+            while self.journal.pending():
+                kalan = None if bitis is None else bitis - time.monotonic()
+                if (kalan is not None and kalan <= 0) or self._hata_bekliyor:
+                    return False
+                self._kosul.wait(kalan)
+        return True
+
+    def retry(self):
+        """Kalıcı bir hatadan sonra göndermeyi yeniden başlatır."""
+        with self._kosul:
+            self._hata_bekliyor = False
+            self._kosul.notify_all()
+
+    def discard_pending(self):
+        """Gönderilemeyen bütün işlemleri atar ve yerel anlık görüntüyü geçersiz kılar."""
+        with self._kosul:
+            self.journal.mark_done([i for i, _ in self.journal.pending()])
+            self._modeller.clear()
+            self._hata_bekliyor = False
+            self._replay_pending = False
+            self.son_hata = None
+            self.storage.forget()
+            self._kosul.notify_all()
+
+    def stop(self):
+        """Arka plan thread'ini durdurur ve günlüğü kapatır (bekleyen işlemler günlükte kalır)."""
+        with self._kosul:
+            self._durdur = True
+            self._kosul.notify_all()
+        self._thread.join()
+        self.journal.close()
+
+    # --- Arka plan thread'i ---
+
+    def _next_batch(self):
+        """Sıradaki gönderimi seçer: [(id, islem)] ve gönderilecek birleşik işlem.
+
+        En sondaki rewrite'tan önceki işlemler atlanır; rewrite'ın beklentisi atlanan
+        işlemlerden sonraki duruma aittir, bu yüzden E-Tablonun hâlâ bulunduğu durumun, yani
+        ilk atlanan işlemin beklentisiyle değiştirilir. Ardışık batch işlemleri
+        BIRLESTIRME_SINIRI'na kadar tek işlemde birleştirilir. Önceki oturumdan kalan
+        işlemler birleştirilmez: hangisinin gönderildiği satır sayısından tek tek anlaşılır.
+        """
+        bekleyen = self.journal.pending()
+        son_rewrite = max((k for k, (_, islem) in enumerate(bekleyen) if islem["tur"] == "rewrite"), default=0)
+        atlanan, bekleyen = bekleyen[:son_rewrite], bekleyen[son_rewrite:]
+
+        ilk_id, ilk = bekleyen[0]
+        secilen = [(ilk_id, ilk)]
+        if ilk["tur"] == "batch" and not self._replay_pending:
+            istekler = list(ilk["istekler"])
+            for islem_id, islem in bekleyen[1:]:
+                if islem["tur"] != "batch" or len(istekler) + len(islem["istekler"]) > BIRLESTIRME_SINIRI:
+                    break
+                istekler.extend(islem["istekler"])
+                secilen.append((islem_id, islem))
+            birlesik = {"tur": "batch", "istekler": istekler, "once": ilk["once"], "sonra": secilen[-1][1]["sonra"]}
+            # Sonraki işlemlerin beklentileri ara durumlara aittir; gönderimden önce ilkininki geçerlidir
+            if "kontrol" in ilk:
+                birlesik["kontrol"] = ilk["kontrol"]
+        elif atlanan:
+            onceki = atlanan[0][1]
+            birlesik = {k: v for k, v in ilk.items() if k != "kontrol"}
+            birlesik["once"] = onceki["once"]
+            # Yarıda kalmış bir baştan yazmanın ardından E-Tablonun durumu bilinmez
+            if onceki.get("kontrol") and not onceki.get("yazilan"):
+                birlesik["kontrol"] = onceki["kontrol"]
+        else:
+            birlesik = ilk
+        return atlanan, secilen, birlesik
+
+    def _already_applied(self, islem):
+        """Yeniden başlatmadan sonra, işlemin çökmeden önce gönderilmiş olup olmadığını kontrol eder."""
+        if islem["tur"] == "rewrite" or islem["once"] == islem["sonra"]:
+            return False
+        satir_sayisi = self.storage.row_count()
+        if satir_sayisi == islem["sonra"]:
+            return True
+        if satir_sayisi != islem["once"]:
+            raise SheetDriftError(
+                f"E-Tablodaki satır sayısı ({satir_sayisi}) bekleyen yazmayla uyuşmuyor "
+                f"(beklenen {islem['once']}); başka bir yerden değiştirilmiş olabilir."
+            )
+        return False
+
+    def _worker(self):
+        bekleme = ILK_BEKLEME
+        while True:
+            with self._kosul:
+                while not self._durdur and (self._hata_bekliyor or not self.journal.pending()):
+                    self.durum = "hata" if self._hata_bekliyor else "bosta"
+                    self._kosul.wait()
+                if self._durdur:
+                    return
+                self.durum = "yaziyor"
+
+            try:
+                # Atlanan işlemler, yerlerini alan rewrite gönderilene kadar günlükte kalır:
+                # tekrar denemede rewrite'ın beklentisi yine onlardan çıkarılır
+                atlanan, secilen, birlesik = self._next_batch()
+
+                if self._replay_pending and self._already_applied(birlesik):
+                    pass
+                elif birlesik["tur"] == "rewrite":
+                    # Parça parça gönderilir; kesilirse (veya süreç çökerse) kalan parçadan devam edilir
+                    rewrite_id = secilen[0][0]
+                    self.storage.execute(birlesik, ilerleme=lambda n: self.journal.checkpoint(rewrite_id, n))
+                else:
+                    self.storage.execute(birlesik)
+
+                son_id = secilen[-1][0]
+                self.journal.mark_done([i for i, _ in atlanan + secilen])
+                model = self._modeller.pop(son_id, None)
+                for i, _ in atlanan + secilen[:-1]:
+                    self._modeller.pop(i, None)
+                if model is not None:
+                    self.storage.remember(model, birlesik["sonra"])
+                else:
+                    # Önceki çalışmadan kalan işlem: hafızadaki modeli yok
+                    self.storage.forget()
+
+                with self._kosul:
+                    self.yazilan += len(secilen)
+                    self.son_yazma = time.time()
+                    self.son_hata = None
+                    bos = not self.journal.pending()
+                    if bos:
+                        self._replay_pending = False
+                    self._kosul.notify_all()
+                if bos:
+                    # Kuyruk boşaldı: son durum yerel anlık görüntüye tek seferde yazılır
+                    self.storage.flush_snapshot()
+                bekleme = ILK_BEKLEME
+
+            except Exception as hata:
+                if self._on_error is not None:
+                    self._on_error(hata)
+                with self._kosul:
+                    self.son_hata = str(hata)
+                    if _is_transient(hata):
+                        self.durum = "bekliyor"
+                        self._kosul.wait(bekleme + random.uniform(0, bekleme / 2))
+                        bekleme = min(bekleme * 2, EN_UZUN_BEKLEME)
+                    else:
+                        self._hata_bekliyor = True
+                    self._kosul.notify_all()
@@ -1,40 +1,69 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
 import gspread
 from google.oauth2.service_account import Credentials
+import functools
+import importlib.machinery
+import io
 import os
-import json
-import re # Otomatik temizleme için
+
+from arac_core.schema import (
+    DOLUM_TURLERI, KATEGORILER_TUMU, KATEGORILER_DIGER, KM_GEREKEN_KATEGORILER,
+)
+from arac_core.analysis import (
+    compute_trips, fuel_records, installments_due, split_by_category, trip_averages,
+)
+from arac_core import metrics
+from arac_core.cache import AnalyticsCache
+from arac_core.consumption import VARSAYILAN_PENCERE, RollingFuelMetrics, outlier_rows
+from arac_core.config import (
+    GOOGLE_SHEET_NAME, LOCAL_CREDS_PATH, SCOPES, WORKSHEET_NAME, cache_dir, open_fleet, parse_flag,
+)
+from arac_core.downsample import VARSAYILAN_GENISLIK, cumulative_spend, downsample
+from arac_core.exporter import BICIMLER, export_frame
+from arac_core.fleet import Fleet, fleet_ranking, fleet_totals
+from arac_core.importer import VARSAYILAN_YAZMA_ARALIGI, BulkImportError, import_file
+from arac_core.maintenance import forecast_fleet, forecast_maintenance
+from arac_core.odometer import OdometerIndex
+from arac_core.query import ExpenseIndex
+from arac_core.shared import ConflictError
+from arac_core.sheets_client import SheetsClientPool
+from arac_core.storage import GoogleSheetsStorage, changeset_from_editor, diff_frames
+from arac_core.write_behind import PendingWritesError, WriteBehindStorage
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Streamlit bu betiği __main__ olarak çalıştırır; filo analizinin spawn ile açtığı işçi
+# süreçler __spec__'i olmayan __main__'i yeniden çalıştırırdı. '.__main__' ile biten bir
+# ad (python -m paket gibi), multiprocessing'e betiği işçilerde yüklememesini söyler.
+__spec__ = importlib.machinery.ModuleSpec("arac_uygulamasi.__main__", None)
 
 # --- 1. UYGULA AYARLARI VE GOOGLE SHEETS BAĞLANTISI ---
 
-# Masraf kategorilerimiz
-KATEGORILER_TUMU = [
-    'Yakıt', 'Köprü Otoyol', 'Trafik Cezaları', 'Tamir-Servis', 
-    'Periyodik Bakım', 'Muayene', 'Lastik', 'Aksesuar', 
-    'Vergiler', 'Otopark', 'Araç Yıkama', 'Sigorta-Kasko'
-]
-KATEGORILER_DIGER = [k for k in KATEGORILER_TUMU if k != 'Yakıt']
-KM_GEREKEN_KATEGORILER = ['Periyodik Bakım', 'Tamir-Servis', 'Lastik', 'Muayene']
-
-# Google Sheets'e bağlanmak için gerekli yetki kapsamları
-SCOPES = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive"
-]
-
-# Google E-Tablonuzun tam adı
-GOOGLE_SHEET_NAME = "Arac Masraflari"
-# E-Tablonuzdaki çalışma sayfasının adı
-WORKSHEET_NAME = "Veriler"
-
-# Gerekli sütunlar (E-Tablonuzdaki ile aynı olmalı)
-REQUIRED_COLUMNS = [
-    "Tarih", "KM Sayacı", "Masraf Türü", "Tutar", "Açıklama", 
-    "Taksit Sayısı", "Litre", "Dolum Türü"
-]
+# E-Tablo adı, yetki kapsamları ve depolama ayarları arac_core.config'tedir
+# (komut satırı da aynı ayarları kullanır).
+
+# Gezinme: "sayfa" sadece seçili sayfayı çizer, "sekme" bütün sekmeleri (st.tabs) çizer
+VARSAYILAN_GEZINME = "sayfa"
+
+# Süre ölçümlerinin yazılacağı biçim (METRICS_FORMAT): "" (kapalı), "jsonl" veya "prometheus".
+# Dosya yolu METRICS_PATH ile değiştirilebilir; kenar çubuğundaki panel DEBUG_PANEL=1 veya ?debug=1 ile açılır.
+VARSAYILAN_METRIK_BICIMI = ""
+
+# Veri Yönetimi'ndeki düzenleyicide bir sayfada gösterilecek satır sayısı
+EDITOR_SAYFA_BOYUTU = 200
+
+# Veri Yönetimi sayfasının adı: bu sayfadayken başka oturumların kayıtları kendiliğinden alınmaz
+DUZENLEME_SAYFASI = "✏️ Veri Yönetimi"
+
+# Başka bir oturumun kaydettiği değişikliklerin kontrol aralığı (saniye)
+VERI_KONTROL_ARALIGI = 10
+
+# Grafiklerin piksel genişliği (CHART_WIDTH): seriler en fazla bu kadar noktaya seyreltilir
+VARSAYILAN_GRAFIK_GENISLIGI = VARSAYILAN_GENISLIK
+
+# Analiz önbelleğinde (trip, aylık özet vb.) tutulacak en fazla sonuç sayısı
+ANALIZ_ONBELLEK_BOYUTU = 128
 
 # Sayfa ayarları
 st.set_page_config(
@@ -44,569 +73,1039 @@ st.set_page_config(
 )
 st.title("🚗 Araç Masraf Takip Uygulaması")
 
-#
-# --- BAĞLANTI KODU (DEĞİŞİKLİK YOK) ---
-#
-@st.cache_resource(ttl=60)
-def connect_to_sheet():
-    """Google Sheets'e bağlanır ve çalışma sayfasını döndürür."""
+# Bu çalıştırmanın süre ölçümü (bağlantı, yükleme, sayfa, kaydetme aralıkları) burada başlar
+metrics.start_trace("rerun")
+try:
+    #
+    # --- BAĞLANTI KODU (Süreç boyunca paylaşılan istemci havuzu) ---
+    #
+    @st.cache_resource
+    def get_sheets_pool():
+        """Google kimlik bilgilerini bir kez okur ve bütün oturumların paylaştığı istemci havuzunu döndürür."""
     
-    gc = None
+        creds = None
     
-    try:
-        # DENE: Streamlit Cloud (st.secrets) yolunu dene
-        if st.secrets.get("GOOGLE_SHEETS_CREDENTIALS"):
-            try:
-                creds_dict = st.secrets["GOOGLE_SHEETS_CREDENTIALS"]
-                creds = Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
-                gc = gspread.authorize(creds)
+        try:
+            # DENE: Streamlit Cloud (st.secrets) yolunu dene
+            if st.secrets.get("GOOGLE_SHEETS_CREDENTIALS"):
+                try:
+                    creds_dict = st.secrets["GOOGLE_SHEETS_CREDENTIALS"]
+                    creds = Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
                 
+                except Exception as e:
+                    st.error(f"Secrets ile kimlik doğrulama hatası: {e}")
+                    st.info("Secrets (TOML) formatını doğru girdiğinizden emin misiniz?")
+                    st.stop()
+            else:
+                raise st.errors.StreamlitSecretNotFoundError("Anahtar bulunamadı, yerel varsayılıyor.")
+
+        except st.errors.StreamlitSecretNotFoundError:
+            # HATA: Secrets dosyası bulunamadı (Yani YERELDE çalışıyoruz)
+            if not os.path.exists(LOCAL_CREDS_PATH):
+                st.error("Yerel 'google_credentials.json' dosyası bulunamadı.")
+                st.info(f"'{os.path.abspath(LOCAL_CREDS_PATH)}' konumuna dosyayı koyduğunuzdan emin olun.")
+                st.stop()
+        
+            try:
+                creds = Credentials.from_service_account_file(LOCAL_CREDS_PATH, scopes=SCOPES)
             except Exception as e:
-                st.error(f"Secrets ile kimlik doğrulama hatası: {e}")
-                st.info("Secrets (TOML) formatını doğru girdiğinizden emin misiniz?")
+                st.error(f"Yerel 'google_credentials.json' dosyası ile kimlik doğrulama hatası: {e}")
                 st.stop()
-        else:
-            raise st.errors.StreamlitSecretNotFoundError("Anahtar bulunamadı, yerel varsayılıyor.")
+        except Exception as e:
+            st.error(f"Kimlik doğrulama sırasında genel hata: {e}")
+            st.stop()
 
-    except st.errors.StreamlitSecretNotFoundError:
-        # HATA: Secrets dosyası bulunamadı (Yani YERELDE çalışıyoruz)
-        LOCAL_CREDS_PATH = "google_credentials.json"
-        
-        if not os.path.exists(LOCAL_CREDS_PATH):
-            st.error("Yerel 'google_credentials.json' dosyası bulunamadı.")
-            st.info(f"'{os.path.abspath(LOCAL_CREDS_PATH)}' konumuna dosyayı koyduğunuzdan emin olun.")
+        if creds is None:
+            st.error("Kimlik bilgileri (creds) oluşturulamadı.")
             st.stop()
+
+        return SheetsClientPool(creds)
+
+    def connect_to_sheet(sayfa=WORKSHEET_NAME):
+        """Paylaşılan havuzdan çalışma sayfasını döndürür (sadece ilk seferde yetkilendirip açar)."""
+        pool = get_sheets_pool()
         
         try:
-            creds = Credentials.from_service_account_file(LOCAL_CREDS_PATH, scopes=SCOPES)
-            gc = gspread.authorize(creds)
+            return pool.worksheet(GOOGLE_SHEET_NAME, sayfa)
+        except gspread.exceptions.SpreadsheetNotFound:
+            st.error(f"E-Tablo Bulunamadı: '{GOOGLE_SHEET_NAME}' adlı Google E-Tablosu bulunamadı.")
+            st.stop()
+        except gspread.exceptions.WorksheetNotFound:
+            st.error(f"Çalışma Sayfası Bulunamadı: '{sayfa}' adlı çalışma sayfası bulunamadı.")
+            st.stop()
+        except gspread.exceptions.APIError as e:
+            pool.handle_error(e)
+            st.error(f"Google API Hatası (Yetki Hatası): {e}")
+            st.info(f"'{GOOGLE_SHEET_NAME}' adlı E-Tabloyu, 'client_email' adresiyle 'Düzenleyici' olarak paylaştığınıza emin misiniz?")
+            st.stop()
         except Exception as e:
-            st.error(f"Yerel 'google_credentials.json' dosyası ile kimlik doğrulama hatası: {e}")
+            pool.invalidate()
+            st.error(f"E-Tabloya bağlanırken bilinmeyen bir hata oluştu: {e}")
             st.stop()
-    except Exception as e:
-        st.error(f"Kimlik doğrulama sırasında genel hata: {e}")
-        st.stop()
-
-    # Adım 2: E-Tabloya Bağlan
-    if gc is None:
-        st.error("Kimlik doğrulama istemcisi (gc) oluşturulamadı.")
-        st.stop()
-        
-    try:
-        sh = gc.open(GOOGLE_SHEET_NAME)
-        worksheet = sh.worksheet(WORKSHEET_NAME)
-        return worksheet
-    except gspread.exceptions.SpreadsheetNotFound:
-        st.error(f"E-Tablo Bulunamadı: '{GOOGLE_SHEET_NAME}' adlı Google E-Tablosu bulunamadı.")
-        st.stop()
-    except gspread.exceptions.WorksheetNotFound:
-        st.error(f"Çalışma Sayfası Bulunamadı: '{WORKSHEET_NAME}' adlı çalışma sayfası bulunamadı.")
-        st.stop()
-    except gspread.exceptions.APIError as e:
-        st.error(f"Google API Hatası (Yetki Hatası): {e}")
-        st.info(f"'{GOOGLE_SHEET_NAME}' adlı E-Tabloyu, 'client_email' adresiyle 'Düzenleyici' olarak paylaştığınıza emin misiniz?")
-        st.stop()
-    except Exception as e:
-        st.error(f"E-Tabloya bağlanırken bilinmeyen bir hata oluştu: {e}")
-        st.stop()
-
-def create_empty_dataframe():
-    """Gerekli sütunlara sahip boş bir DataFrame oluşturur."""
-    df = pd.DataFrame(columns=REQUIRED_COLUMNS)
-    df['Tarih'] = pd.to_datetime(df['Tarih'])
-    df['KM Sayacı'] = pd.to_numeric(df['KM Sayacı'])
-    df['Tutar'] = pd.to_numeric(df['Tutar'])
-    df['Taksit Sayısı'] = pd.to_numeric(df['Taksit Sayısı'])
-    df['Litre'] = pd.to_numeric(df['Litre'])
-    return df
-
-#
-# --- SESSION STATE (Önbellek) KODU ---
-#
-def load_data():
-    """Google Sheets'ten veriyi yükler ve DataFrame'e dönüştürür."""
-    
-    worksheet = connect_to_sheet() 
+
+    def _handle_sheets_error(e):
+        """Google API hatasında, sadece gerçekten bozulan bağlantıları havuzdan atar."""
+        if isinstance(e, gspread.exceptions.APIError):
+            get_sheets_pool().handle_error(e)
+
+    def _get_setting(anahtar, varsayilan=None):
+        """Ayarı önce st.secrets'tan, yoksa ortam değişkeninden okur."""
+        try:
+            if anahtar in st.secrets:
+                return st.secrets[anahtar]
+        except (st.errors.StreamlitSecretNotFoundError, FileNotFoundError):
+            pass
+        return os.environ.get(anahtar, varsayilan)
+
+    def _get_flag(anahtar, varsayilan):
+        """Evet/hayır ayarını okur ("1", "true", "evet" gibi metinleri de kabul eder)."""
+        return parse_flag(_get_setting(anahtar, varsayilan))
+
+    def _worksheet_provider(sayfa):
+        """Depolama motoruna (functools.partial ile sayfa adı bağlanarak) verilen bağlantı fonksiyonu.
+
+        Arka plan yazıcısının ve filo yüklemesinin thread'lerinde Streamlit mesajı gösterilemez;
+        orada çalışma sayfası doğrudan havuzdan alınır ve hata çağırana iletilir.
+        """
+        if get_script_run_ctx() is None:
+            return get_sheets_pool().worksheet(GOOGLE_SHEET_NAME, sayfa)
+        return connect_to_sheet(sayfa)
+
+    @st.cache_resource
+    def get_fleet():
+        """Her aracın depolamasını (STORAGE_BACKEND, ARACLAR) ve paylaşılan verisini tutan filo.
+
+        Tek araçlı kurulumda filonun tek aracı vardır ve verisi WORKSHEET_NAME sayfasındadır.
+        """
+        try:
+            # WRITE_BEHIND açıksa Sheets yazmaları günlüğe alınıp arka planda gönderilir
+            return Fleet(open_fleet(
+                _get_setting,
+                worksheet_provider_for=lambda sayfa: functools.partial(_worksheet_provider, sayfa),
+                on_error=_handle_sheets_error,
+            ))
+        except Exception as e:
+            st.error(f"Depolama motoru oluşturulamadı: {e}")
+            st.stop()
+
+    def aktif_arac():
+        """Kenar çubuğunda seçili araç (tek araçta o araç)."""
+        arac = st.session_state.get("aktif_arac")
+        return arac if arac in get_fleet().datasets else get_fleet().vehicles[0]
+
+    def get_dataset():
+        """Seçili aracın, bütün oturumların okuduğu tek, sürüm damgalı verisi (bkz. arac_core.shared)."""
+        return get_fleet().dataset(aktif_arac())
+
+    def get_storage():
+        """Seçili aracın depolama motoru."""
+        return get_dataset().storage
+
+    @st.cache_resource
+    def get_metrics_sink():
+        """Ölçümlerin yazılacağı dosya (METRICS_FORMAT kapalıysa None); bütün oturumlar paylaşır."""
+        bicim = _get_setting("METRICS_FORMAT", VARSAYILAN_METRIK_BICIMI)
+        uzanti = {"jsonl": "metrics.jsonl", "prometheus": "metrics.prom"}.get(bicim, "metrics")
+        varsayilan_yol = os.path.join(cache_dir(_get_setting), uzanti)
+        try:
+            return metrics.create_sink(bicim, _get_setting("METRICS_PATH", varsayilan_yol))
+        except (ValueError, OSError) as e:
+            st.warning(f"Ölçümler kaydedilemeyecek: {e}")
+            return None
+
+    def finish_rerun_trace():
+        """Bu çalıştırmanın ölçümünü bitirir, dosyaya yazar ve hata ayıklama paneli için saklar."""
+        trace = metrics.finish_trace()
+        if trace is None:
+            return
+        sink = get_metrics_sink()
+        if sink is not None:
+            try:
+                sink.write(trace)
+            except OSError:
+                pass
+        st.session_state.son_olcum = trace.to_dict()
+
+    def render_debug_panel():
+        """Kenar çubuğunda son çalıştırmanın aralıklarını (süre, satır, bayt) gösterir."""
+        olcum = st.session_state.get("son_olcum")
+        if olcum is None:
+            return
+        derinlik = []
+        satirlar = []
+        for aralik in olcum["spanlar"]:
+            seviye = 0 if aralik["ebeveyn"] is None else derinlik[aralik["ebeveyn"]] + 1
+            derinlik.append(seviye)
+            satirlar.append({
+                "Aralık": "  " * seviye + aralik["ad"],
+                "Süre (ms)": round((aralik["sure"] or 0) * 1000, 1),
+                "Özellikler": ", ".join(f"{k}={v}" for k, v in aralik["ozellikler"].items() if v is not None),
+            })
+        with st.sidebar.expander("⏱️ Süre Ölçümleri", expanded=True):
+            st.caption(f"Son çalıştırma: {olcum['sure'] * 1000:,.0f} ms · {olcum['ozellikler']}")
+            st.dataframe(pd.DataFrame(satirlar), hide_index=True, use_container_width=True)
+
+    @st.cache_resource
+    def get_analytics_cache():
+        """Bütün oturumların paylaştığı, veri sürümüne göre anahtarlanan analiz önbelleği."""
+        return AnalyticsCache(maxsize=ANALIZ_ONBELLEK_BOYUTU)
+
+    def cached(anahtar, fn, *args):
+        """df_main'den türetilen bir sonucu, veri sürümü değişmediyse önbellekten getirir."""
+        return get_analytics_cache().get_or_compute(st.session_state.veri.version, anahtar, fn, *args)
+
+    def render_time_chart(veri, x, y, anahtar, yontem="lttb", renk=None):
+        """Zaman serisini grafiğin genişliği kadar noktaya seyreltip çizer (bkz. arac_core.downsample).
+
+        Kaydırıcıyla daraltılan tarih aralığı yine aynı sayıda noktayla, yani daha ayrıntılı
+        çizilir; tarayıcıya gönderilen nokta sayısı veri büyüdükçe artmaz. Seyreltilmiş seri
+        veri sürümü, aralık ve genişlik başına bir kez hesaplanır.
+        """
+        if veri.empty:
+            return
+        bas, bit = veri[x].min().to_pydatetime(), veri[x].max().to_pydatetime()
+        aralik = (bas, bit)
+        if bas < bit:
+            aralik = st.slider("Tarih Aralığı", min_value=bas, max_value=bit, value=aralik, format="YYYY-MM-DD", key=f"{anahtar}_aralik")
+        genislik = int(_get_setting("CHART_WIDTH", VARSAYILAN_GRAFIK_GENISLIGI))
+        with metrics.span("chart", grafik=anahtar, satir=len(veri)):
+            seyrek = cached(("grafik", anahtar, aralik, genislik), downsample, veri, x, y, genislik, yontem, aralik, renk)
+            metrics.set_attributes(nokta=len(seyrek))
+        st.line_chart(seyrek, x=x, y=y, color=renk)
+
+    def set_main_frame(durum):
+        """Oturumun okuduğu veri sürümünü değiştirir.
+
+        Veri kopyalanmaz: session_state paylaşılan DatasetState'e (DataFrame, sürüm damgası,
+        özet tablolar) bağlanır; aynı sürümü okuyan oturumlar aynı nesneyi kullanır.
+        """
+        st.session_state.veri = durum
+        st.session_state.veri_arac = aktif_arac()
+
+    #
+    # --- SESSION STATE (Önbellek) KODU ---
+    #
+    def load_data(yeniden=False):
+        """Paylaşılan verinin son sürümünü döndürür; süreçteki ilk yüklemede (veya yeniden=True ise) depolamadan okur."""
+        storage = get_storage()
+        try:
+            with metrics.span("load"):
+                durum = get_dataset().reload() if yeniden else get_dataset().current()
+                metrics.set_attributes(satir=len(durum.df))
+        except PendingWritesError as e:
+            # Yükleme beklemez; gönderim durumu kenar çubuğunda görünür
+            st.info(str(e))
+            if st.button("Tekrar Yükle"):
+                st.rerun()
+            st.stop()
+        except Exception as e:
+            _handle_sheets_error(e)
+            st.error(f"Veri yüklenirken hata oluştu: {e}")
+            st.info("Sayfayı yenileyerek tekrar deneyebilirsiniz.")
+            st.stop()
+        if storage.parse_errors:
+            st.warning(f"E-Tablodaki {len(storage.parse_errors)} hücre okunamadı; bu değerler 0 kabul edildi (tarihi okunamayan satırlar atlandı).")
+            with st.expander("Okunamayan hücreler"):
+                st.dataframe(
+                    pd.DataFrame(
+                        [(etiket + 2, sutun, deger) for etiket, sutun, deger in storage.parse_errors],
+                        columns=["Satır", "Sütun", "Değer"],
+                    ),
+                    hide_index=True,
+                )
+        return durum
+
+    #
+    # --- BU FONKSİYON GÜNCELLENDİ (TypeError Hatası Düzeltildi) ---
+    #
+    def save_data():
+        """Paylaşılan verinin son sürümünü baştan yazar VE session_state'i günceller.
+
+        Tüm sayfayı silip baştan yazar; sadece açık sıkıştırma (sıralama) için kullanılır.
+        Yeni kayıtlar için append_data kullanın.
+        """
+        try:
+            with metrics.span("save.rewrite", satir=len(st.session_state.veri.df)):
+                set_main_frame(get_dataset().rewrite())
+        except Exception as e:
+            _handle_sheets_error(e)
+            st.error(f"Veri kaydedilirken hata oluştu: {e}")
+
+    #
+    # --- ARTIMLI EKLEME (Tüm sayfayı yeniden yazmadan) ---
+    #
+    def append_data(df_yeni, dogrula=None):
+        """Sadece yeni satırları kaydeder VE session_state'i günceller.
+
+        Satırlar, başka oturumların eklediği kayıtlar dahil en son sürüme eklenir; dogrula
+        o sürümle kontrol eder (bkz. SharedDataset.append). Kayıt başarılıysa True döndürür.
+        """
+        try:
+            with metrics.span("save.append", satir=len(df_yeni)):
+                set_main_frame(get_dataset().append(df_yeni, dogrula=dogrula))
+            return True
+        except ConflictError as e:
+            st.error(str(e))
+        except Exception as e:
+            _handle_sheets_error(e)
+            st.error(f"Veri kaydedilirken hata oluştu: {e}")
+        return False
+
+    def km_not_below_last(km):
+        """Kayıt anındaki en son veride, girilen KM'nin son kayıtlı KM'den düşük olmadığını kontrol eder.
+
+        Oturumun gösterdiği veri eski olabilir; kontrol append_data'nın yazma kilidi altında yapılır.
+        """
+        def dogrula(durum):
+            if not durum.df.empty and km < durum.df['KM Sayacı'].max():
+                raise ConflictError(f"Girdiğiniz KM ({km}), son kayıtlı KM'den ({int(durum.df['KM Sayacı'].max())}) düşük olamaz.")
+        return dogrula
+
+    def apply_changeset(changeset):
+        """Değişiklik setini (sadece değişen satırları) kaydeder VE session_state'i günceller.
+
+        Set, oturumun gösterdiği sürüme göre hazırlanmıştır; o sürümden sonra başka bir oturum
+        kaydettiyse satırlar en son sürüme taşınır, dokunulan satırlar değiştiyse kayıt reddedilir.
+        Kayıt başarılıysa True döndürür.
+        """
+        try:
+            with metrics.span("save.changeset", duzenlenen=len(changeset["duzenlenen"]),
+                              eklenen=len(changeset["eklenen"]), silinen=len(changeset["silinen"])):
+                set_main_frame(get_dataset().apply_changeset(changeset, st.session_state.veri))
+            return True
+        except ConflictError as e:
+            st.error(str(e))
+        except Exception as e:
+            _handle_sheets_error(e)
+            st.error(f"Veri kaydedilirken hata oluştu: {e}")
+        return False
+
+    #
+    # --- TOPLU İÇE AKTARMA (CSV / Excel) ---
+    #
+    def import_data(dosya, ondalik, sadece_dogrula):
+        """Dosyayı doğrulayıp geçerli satırları toplu olarak kaydeder VE session_state'i günceller.
+
+        İlerleme çubuğu gösterir; içe aktarma raporunu (bkz. importer.import_file) döndürür.
+        """
+        storage = get_storage()
+        cubuk = st.progress(0.0, text="Dosya okunuyor...")
+
+        def ilerleme(asama, tamamlanan, toplam):
+            if asama == "okuma":
+                cubuk.progress(0.0, text=f"{tamamlanan:,} satır okundu ve doğrulandı...")
+            else:
+                cubuk.progress(tamamlanan / toplam, text=f"{tamamlanan:,} / {toplam:,} satır kaydedildi...")
+
+        rapor = None
+
+        def yaz(durum):
+            # Satırlar en son sürüme eklenir; içe aktarma bitene kadar diğer yazmalar bekler
+            nonlocal rapor
+            df, eklenen, rapor = import_file(
+                dosya, dosya.name, storage, durum.df,
+                ondalik=ondalik, sadece_dogrula=sadece_dogrula, ilerleme=ilerleme,
+                # Senkron Sheets yazmalarında dakikadaki istek kotası aşılmasın
+                yazma_araligi=VARSAYILAN_YAZMA_ARALIGI if isinstance(storage, GoogleSheetsStorage) else 0,
+            )
+            if not rapor["yazilan"]:
+                return durum.df, None
+            rollups = durum.rollups.copy()
+            rollups.add_rows(eklenen)
+            return df, rollups, durum.extended_fuel_metrics(eklenen)
+
+        try:
+            with metrics.span("import", dosya=dosya.name):
+                durum = get_dataset().commit(yaz)
+                metrics.set_attributes(okunan=rapor["okunan"], yazilan=rapor["yazilan"])
+        except BulkImportError as e:
+            cubuk.empty()
+            st.error(str(e))
+            return None
+        except Exception as e:
+            cubuk.empty()
+            _handle_sheets_error(e)
+            st.error(f"Dosya içe aktarılırken hata oluştu: {e}")
+            return None
+
+        cubuk.empty()
+        set_main_frame(durum)
+        return rapor
+
+    #
+    # --- Ana Uygulama Akışı (SESSION STATE) ---
+    #
+    # Filoda her aracın verisi ayrıdır; KM kontrolleri ve analizler seçili araca göre yapılır
+    if len(get_fleet().vehicles) > 1:
+        st.sidebar.selectbox("🚗 Araç", get_fleet().vehicles, key="aktif_arac")
+
+    #
+    # --- ARKA PLAN YAZMA DURUMU (Kenar çubuğu) ---
+    #
+    # Veri yüklenmeden önce çizilir: önceki oturumdan kalan yazmalar gönderilirken veya
+    # gönderilemediği için yükleme durursa (load_data st.stop() çağırır) durum ve
+    # "Bekleyenleri At" yine de görünür.
+    storage = get_storage()
+    if isinstance(storage, WriteBehindStorage):
+        durum = storage.status()
+        with st.sidebar:
+            st.subheader("💾 Kayıt Durumu")
+            if durum["bekleyen"]:
+                st.info(f"{durum['bekleyen']} değişiklik E-Tabloya gönderilmeyi bekliyor.")
+            else:
+                st.caption("Bütün değişiklikler E-Tabloya kaydedildi.")
+            if durum["son_yazma"]:
+                st.caption(f"Son yazma: {datetime.fromtimestamp(durum['son_yazma']).strftime('%H:%M:%S')} · toplam {durum['yazilan']} işlem")
+            if durum["son_hata"]:
+                st.error(f"Son yazma hatası: {durum['son_hata']}")
+            if durum["durum"] == "hata" or (durum["bekleyen"] and durum["son_hata"]):
+                col_tekrar, col_at = st.columns(2)
+                if col_tekrar.button("Tekrar Dene"):
+                    storage.retry()
+                    st.rerun()
+                if col_at.button("Bekleyenleri At"):
+                    # E-Tablo ile hafızadaki veri artık farklı olabilir: baştan yükle
+                    storage.discard_pending()
+                    set_main_frame(load_data(yeniden=True))
+                    st.rerun()
+            elif durum["bekleyen"] and st.button("Durumu Yenile"):
+                st.rerun()
+
+    if "veri" not in st.session_state or st.session_state.get("veri_arac") != aktif_arac():
+        set_main_frame(load_data())
+    elif _get_setting("NAVIGATION", VARSAYILAN_GEZINME) != "sekme" and st.session_state.get("aktif_sayfa") != DUZENLEME_SAYFASI:
+        # Başka oturumların kayıtları, düzenleyici açık değilse kendiliğinden alınır. Düzenleyicinin
+        # durumu satır konumlarıyla tutulduğu için orada veri, kullanıcı isteyince değişir.
+        son_durum = get_dataset().peek()
+        if son_durum is not None:
+            set_main_frame(son_durum)
+
+    df_main = st.session_state.veri.df
+
+    #
+    # --- BAŞKA OTURUMLARIN DEĞİŞİKLİKLERİ (Kenar çubuğu) ---
+    #
+    def render_change_notice():
+        """Oturumun gösterdiği veri eskidiyse haber verir ve güncel sürüme geçirir."""
+        son_durum = get_dataset().peek()
+        if son_durum is None or son_durum.generation == st.session_state.veri.generation:
+            return
+        st.info("Veriler başka bir oturumda güncellendi.")
+        if st.button("Güncel Veriyi Yükle"):
+            set_main_frame(son_durum)
+            st.rerun()
+
+    if hasattr(st, "fragment"):
+        # Sadece bu kutu VERI_KONTROL_ARALIGI saniyede bir yeniden çalışır; sayfa çizilmez
+        render_change_notice = st.fragment(run_every=VERI_KONTROL_ARALIGI)(render_change_notice)
+
+    with st.sidebar:
+        render_change_notice()
+
+    # --- 2. SAYFALAR (5 SAYFALI YAPI) ---
+    # Her sekme bir render fonksiyonudur; sadece seçili sayfa çalıştırılıp tarayıcıya
+    # gönderilir (bkz. en alttaki SAYFA YÖNLENDİRME). NAVIGATION="sekme" ayarı eski
+    # st.tabs görünümünü (bütün sekmeler her seferinde çizilir) geri getirir.
+
+
+    #
+    # --- 3. SEKME 1: YAKIT MASRAFI GİRME (Sekme Atlama Hatası Düzeltildi) ---
+    #
+    def render_fuel_entry(df_main):
+        st.header("Yeni Yakıt Alımı Kaydı")
     
-    if worksheet is None:
-        return create_empty_dataframe()
-        
-    try:
-        data = worksheet.get_all_values()
+        with st.form("yakit_formu", clear_on_submit=True):
+            st.subheader("Yakıt Detayları")
+            col1, col2 = st.columns(2)
+            with col1:
+                tarih_input = st.date_input("Tarih", value=datetime.now())
+            with col2:
+                km_input = st.number_input("Aracın Güncel Kilometresi", min_value=0, step=1, value=int(df_main['KM Sayacı'].max()) if not df_main.empty else 0)
         
-        if len(data) < 2: 
-            return create_empty_dataframe()
+            col3, col4 = st.columns(2)
+            with col3:
+                yakit_tutar_input = st.number_input("Toplam Yakıt Tutarı (TL)", min_value=0.0, format="%.2f")
+            with col4:
+                yakit_litre_input = st.number_input("Alınan Yakıt (Litre)", min_value=0.0, format="%.2f")
         
-        headers = data[0]
-        if headers != REQUIRED_COLUMNS:
-            st.error(f"E-Tablo başlıkları hatalı! Gerekli: {REQUIRED_COLUMNS}")
-            return create_empty_dataframe()
-            
-        df = pd.DataFrame(data[1:], columns=headers)
-        
-        # --- BURASI SAYISALA (NUMERIC) ÇEVİRME YERİ ---
-        df['Tarih'] = pd.to_datetime(df['Tarih'], errors='coerce')
-        
-        numeric_cols = ['KM Sayacı', 'Tutar', 'Taksit Sayısı', 'Litre']
-        for col in numeric_cols:
-            df[col] = df[col].str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+            dolum_turu_input = st.radio("Depo Dolum Türü", DOLUM_TURLERI, index=0)
+            aciklama_input = st.text_input("Açıklama (Opsiyonel, Örn: Shell V-Power)", "Yakıt Alımı")
 
-        df['Taksit Sayısı'] = df['Taksit Sayısı'].apply(lambda x: 1 if x < 1 else int(x))
-        
-        df = df.dropna(subset=['Tarih'])
-        return df
+            submitted = st.form_submit_button("Yakıt Kaydını Ekle")
         
-    except Exception as e:
-        st.error(f"Veri yüklenirken hata oluştu: {e}")
-        return create_empty_dataframe()
-
-#
-# --- BU FONKSİYON GÜNCELLENDİ (TypeError Hatası Düzeltildi) ---
-#
-def save_data(df):
-    """DataFrame'i Google Sheets'e kaydeder VE session_state'i günceller."""
-    
-    worksheet = connect_to_sheet()
+            if submitted:
+                if km_input == 0 or yakit_tutar_input == 0 or yakit_litre_input == 0:
+                    st.error("Lütfen KM, Tutar ve Litre alanlarını doldurun.")
+                else:
+                    yeni_kayit = {
+                        "Tarih": pd.to_datetime(tarih_input),
+                        "KM Sayacı": km_input,
+                        "Masraf Türü": "Yakıt",
+                        "Tutar": yakit_tutar_input,
+                        "Açıklama": aciklama_input,
+                        "Taksit Sayısı": 1,
+                        "Litre": yakit_litre_input,
+                        "Dolum Türü": dolum_turu_input
+                    }
+                
+                    df_yeni = pd.DataFrame([yeni_kayit])
+                    if append_data(df_yeni, dogrula=km_not_below_last(km_input)):
+                        st.success("Yakıt masrafı başarıyla kaydedildi!")
+                    # st.rerun() KALDIRILDI!
+
+    #
+    # --- 4. SEKME 2: DİĞER MASRAFLARI GİRME (Çökme Hatası Düzeltildi) ---
+    #
+    def render_other_entry(df_main):
+        st.header("Yeni Masraf Kaydı (Yakıt Dışı)")
+
+        st.subheader("Masraf Detayları")
     
-    if worksheet is None:
-        st.error("Kaydedilecek yer bulunamadı (Worksheet bağlantısı yok).")
-        return
-        
-    try:
-        # 1. Gelen SAYISAL (Numeric) veriyi sırala ve hafıza için kopyala
-        df_sorted_numeric = df.sort_values(by=["Tarih", "KM Sayacı"], ascending=True).copy()
-        
-        # 2. Google Sheets'e yollamak için AYRI BİR kopya oluştur
-        df_for_sheets = df_sorted_numeric.copy()
-
-        # 3. Bu kopyayı METNE (String) çevir
-        df_for_sheets['Tarih'] = df_for_sheets['Tarih'].dt.strftime('%Y-%m-%d')
-        df_for_sheets['Tutar'] = df_for_sheets['Tutar'].apply(lambda x: f"{x:.2f}".replace('.', ','))
-        df_for_sheets['Litre'] = df_for_sheets['Litre'].apply(lambda x: f"{x:.2f}".replace('.', ','))
-        df_sorted_str = df_for_sheets.fillna('').astype(str)
-        
-        # 4. METİN veriyi Google'a yolla
-        worksheet.clear()
-        worksheet.update([REQUIRED_COLUMNS] + df_sorted_str.values.tolist(), value_input_option='USER_ENTERED')
-        
-        # 5. HAFIZAYA (session_state) ORİJİNAL, SAYISAL veriyi kaydet
-        st.session_state.df_main = df_sorted_numeric
-        
-        st.cache_resource.clear() 
-    except Exception as e:
-        st.error(f"Veri kaydedilirken hata oluştu: {e}")
-
-#
-# --- Ana Uygulama Akışı (SESSION STATE) ---
-#
-if "df_main" not in st.session_state:
-    st.session_state.df_main = load_data() 
-
-df_main = st.session_state.df_main
-
-# --- 2. SEKMELERİ OLUŞTURMA (5 SEKMELİ YAPI) ---
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
-    "⛽ Yakıt Masrafı Gir",
-    "🛒 Diğer Masrafları Gir", 
-    "📊 Yakıt Analizi", 
-    "💳 Genel Masraf Analizi", 
-    "✏️ Veri Yönetimi"
-])
-
-
-#
-# --- 3. SEKME 1: YAKIT MASRAFI GİRME (Sekme Atlama Hatası Düzeltildi) ---
-#
-with tab1:
-    st.header("Yeni Yakıt Alımı Kaydı")
+        tarih_input_d = st.date_input("Tarih", value=datetime.now(), key="diger_tarih")
+        masraf_turu_input_d = st.selectbox("Masraf Türünü Seçin", options=KATEGORILER_DIGER, key="diger_tur") 
+
+        km_input_d = None
+        if masraf_turu_input_d in KM_GEREKEN_KATEGORILER:
+            km_input_d = st.number_input(
+                "Aracın Güncel Kilometresi", 
+                min_value=0, 
+                step=1, 
+                value=int(df_main['KM Sayacı'].max()) if not df_main.empty else 0,
+                key="diger_km"
+            )
+            st.info(f"'{masraf_turu_input_d}' için KM girmek, bakım ve parça ömrü takibi için önemlidir.")
     
-    with st.form("yakit_formu", clear_on_submit=True):
-        st.subheader("Yakıt Detayları")
-        col1, col2 = st.columns(2)
-        with col1:
-            tarih_input = st.date_input("Tarih", value=datetime.now())
-        with col2:
-            km_input = st.number_input("Aracın Güncel Kilometresi", min_value=0, step=1, value=int(df_main['KM Sayacı'].max()) if not df_main.empty else 0)
-        
         col3, col4 = st.columns(2)
         with col3:
-            yakit_tutar_input = st.number_input("Toplam Yakıt Tutarı (TL)", min_value=0.0, format="%.2f")
+            diger_tutar_input = st.number_input("Toplam Masraf Tutarı (TL)", min_value=0.0, format="%.2f", key="diger_tutar")
         with col4:
-            yakit_litre_input = st.number_input("Alınan Yakıt (Litre)", min_value=0.0, format="%.2f")
-        
-        dolum_turu_input = st.radio("Depo Dolum Türü", ['Full Dolum', 'Kısmi Dolum'], index=0)
-        aciklama_input = st.text_input("Açıklama (Opsiyonel, Örn: Shell V-Power)", "Yakıt Alımı")
-
-        submitted = st.form_submit_button("Yakıt Kaydını Ekle")
-        
-        if submitted:
-            if km_input == 0 or yakit_tutar_input == 0 or yakit_litre_input == 0:
-                st.error("Lütfen KM, Tutar ve Litre alanlarını doldurun.")
-            elif not df_main.empty and km_input < df_main['KM Sayacı'].max():
-                 st.error(f"Girdiğiniz KM ({km_input}), son kayıtlı KM'den ({int(df_main['KM Sayacı'].max())}) düşük olamaz.")
-            else:
-                yeni_kayit = {
-                    "Tarih": pd.to_datetime(tarih_input),
-                    "KM Sayacı": km_input,
-                    "Masraf Türü": "Yakıt",
-                    "Tutar": yakit_tutar_input,
-                    "Açıklama": aciklama_input,
-                    "Taksit Sayısı": 1,
-                    "Litre": yakit_litre_input,
-                    "Dolum Türü": dolum_turu_input
-                }
-                
-                df_yeni = pd.DataFrame([yeni_kayit])
-                df_main_guncel = pd.concat([df_main, df_yeni], ignore_index=True)
-                save_data(df_main_guncel) 
-                st.success("Yakıt masrafı başarıyla kaydedildi!")
-                # st.rerun() KALDIRILDI!
-
-#
-# --- 4. SEKME 2: DİĞER MASRAFLARI GİRME (Çökme Hatası Düzeltildi) ---
-#
-with tab2:
-    st.header("Yeni Masraf Kaydı (Yakıt Dışı)")
-
-    st.subheader("Masraf Detayları")
-    
-    tarih_input_d = st.date_input("Tarih", value=datetime.now(), key="diger_tarih")
-    masraf_turu_input_d = st.selectbox("Masraf Türünü Seçin", options=KATEGORILER_DIGER, key="diger_tur") 
-
-    km_input_d = None
-    if masraf_turu_input_d in KM_GEREKEN_KATEGORILER:
-        km_input_d = st.number_input(
-            "Aracın Güncel Kilometresi", 
-            min_value=0, 
-            step=1, 
-            value=int(df_main['KM Sayacı'].max()) if not df_main.empty else 0,
-            key="diger_km"
-        )
-        st.info(f"'{masraf_turu_input_d}' için KM girmek, bakım ve parça ömrü takibi için önemlidir.")
-    
-    col3, col4 = st.columns(2)
-    with col3:
-        diger_tutar_input = st.number_input("Toplam Masraf Tutarı (TL)", min_value=0.0, format="%.2f", key="diger_tutar")
-    with col4:
-        taksit_input = st.number_input("Taksit Sayısı", min_value=1, value=1, step=1, key="diger_taksit")
+            taksit_input = st.number_input("Taksit Sayısı", min_value=1, value=1, step=1, key="diger_taksit")
     
-    aciklama_input_d = st.text_input("Masraf Açıklaması (Örn: 10.000km bakımı, İspark Otopark, Kasko Poliçesi)", key="diger_aciklama")
+        aciklama_input_d = st.text_input("Masraf Açıklaması (Örn: 10.000km bakımı, İspark Otopark, Kasko Poliçesi)", key="diger_aciklama")
 
-    submitted_d = st.button("Masrafı Kaydet")
+        submitted_d = st.button("Masrafı Kaydet")
     
-    if submitted_d:
-        # Girdileri kontrol et
-        is_km_required = masraf_turu_input_d in KM_GEREKEN_KATEGORILER
+        if submitted_d:
+            # Girdileri kontrol et
+            is_km_required = masraf_turu_input_d in KM_GEREKEN_KATEGORILER
         
-        # 'diger_km' key'i sadece görünürse state'de olur, o yüzden kontrol et
-        km_degeri = st.session_state.diger_km if is_km_required and "diger_km" in st.session_state else None
+            # 'diger_km' key'i sadece görünürse state'de olur, o yüzden kontrol et
+            km_degeri = st.session_state.diger_km if is_km_required and "diger_km" in st.session_state else None
         
-        if is_km_required and (km_degeri is None or km_degeri == 0):
-            st.error(f"'{masraf_turu_input_d}' için KM sayacı girmek zorunludur.")
-        elif st.session_state.diger_tutar == 0:
-             st.error("Lütfen masraf tutarını girin.")
-        elif not st.session_state.diger_aciklama:
-            st.error("Lütfen bir açıklama girin (Örn: Otopark, Bakım vb.)")
-        else:
-            # KM Gerekmiyorsa, son bilinen KM'yi otomatik ata
-            kaydedilecek_km = 0
-            if km_degeri is not None:
-                # KM girildiyse ve gerekliyse, KM'nin geriye gitmediğini kontrol et
-                if not df_main.empty and km_degeri < df_main['KM Sayacı'].max():
-                    st.error(f"Girdiğiniz KM ({km_degeri}), son kayıtlı KM'den ({int(df_main['KM Sayacı'].max())}) düşük olamaz.")
-                    st.stop() # Kaydı durdur
-                kaydedilecek_km = km_degeri
+            if is_km_required and (km_degeri is None or km_degeri == 0):
+                st.error(f"'{masraf_turu_input_d}' için KM sayacı girmek zorunludur.")
+            elif st.session_state.diger_tutar == 0:
+                 st.error("Lütfen masraf tutarını girin.")
+            elif not st.session_state.diger_aciklama:
+                st.error("Lütfen bir açıklama girin (Örn: Otopark, Bakım vb.)")
             else:
-                # KM girilmediyse (çünkü sorulmadı), son bilinen KM'yi al
-                kaydedilecek_km = int(df_main['KM Sayacı'].max()) if not df_main.empty else 0
+                # KM Gerekmiyorsa, son bilinen KM'yi otomatik ata
+                kaydedilecek_km = 0
+                dogrula = None
+                if km_degeri is not None:
+                    # KM girildiyse ve gerekliyse, KM'nin geriye gitmediği kayıt anında kontrol edilir
+                    dogrula = km_not_below_last(km_degeri)
+                    kaydedilecek_km = km_degeri
+                else:
+                    # KM girilmediyse (çünkü sorulmadı), son bilinen KM'yi al
+                    kaydedilecek_km = int(df_main['KM Sayacı'].max()) if not df_main.empty else 0
             
-            yeni_kayit = {
-                "Tarih": pd.to_datetime(st.session_state.diger_tarih),
-                "KM Sayacı": kaydedilecek_km,
-                "Masraf Türü": st.session_state.diger_tur,
-                "Tutar": st.session_state.diger_tutar,
-                "Açıklama": st.session_state.diger_aciklama,
-                "Taksit Sayısı": st.session_state.diger_taksit,
-                "Litre": 0,
-                "Dolum Türü": ""
-            }
+                yeni_kayit = {
+                    "Tarih": pd.to_datetime(st.session_state.diger_tarih),
+                    "KM Sayacı": kaydedilecek_km,
+                    "Masraf Türü": st.session_state.diger_tur,
+                    "Tutar": st.session_state.diger_tutar,
+                    "Açıklama": st.session_state.diger_aciklama,
+                    "Taksit Sayısı": st.session_state.diger_taksit,
+                    "Litre": 0,
+                    "Dolum Türü": ""
+                }
             
-            df_yeni = pd.DataFrame([yeni_kayit])
-            df_main_guncel = pd.concat([df_main, df_yeni], ignore_index=True)
-            save_data(df_main_guncel) 
-            st.success(f"'{st.session_state.diger_tur}' masrafı başarıyla kaydedildi!")
+                df_yeni = pd.DataFrame([yeni_kayit])
+                if append_data(df_yeni, dogrula=dogrula):
+                    st.success(f"'{st.session_state.diger_tur}' masrafı başarıyla kaydedildi!")
             
-            # st.rerun() yok, çökme yok, ama alanlar temizlenmez (Seçenek 3)
+                # st.rerun() yok, çökme yok, ama alanlar temizlenmez (Seçenek 3)
 
 
-#
-# --- 5. SEKME 3: YAKIT ANALİZİ (MANTIK HATASI DÜZELTİLDİ) ---
-#
-with tab3:
-    st.header("Yakıt Tüketim Analizi")
+    #
+    # --- 5. SEKME 3: YAKIT ANALİZİ (MANTIK HATASI DÜZELTİLDİ) ---
+    #
+    def render_fuel_analysis(df_main):
+        st.header("Yakıt Tüketim Analizi")
+        # Toplamlar, her kayıtta artımlı güncellenen özet tablolardan okunur
+        rollups = st.session_state.veri.rollups
     
-    yakit_df = df_main[df_main["Masraf Türü"] == 'Yakıt'].sort_values(by="KM Sayacı").reset_index(drop=True)
+        yakit_df = cached("yakit_kayitlari", fuel_records, df_main)
 
-    if len(yakit_df) < 2:
-        st.info("Yakıt tüketim analizi için en az 2 'Yakıt' kaydı gereklidir.")
-    else:
+        if len(yakit_df) < 2:
+            st.info("Yakıt tüketim analizi için en az 2 'Yakıt' kaydı gereklidir.")
+        else:
         
-        # --- "TRIP" (FULL-TO-FULL) HESAPLAMASI (Metrikler için Öne Alındı) ---
-        full_dolum_indeksleri = yakit_df[yakit_df["Dolum Türü"] == 'Full Dolum'].index.tolist()
-        trip_raporlari = []
+            # --- "TRIP" (FULL-TO-FULL) HESAPLAMASI (Metrikler için Öne Alındı) ---
+            trip_raporlari_df = cached("tripler", compute_trips, yakit_df)
 
-        genel_ortalama_lt_100km = 0
-        genel_ortalama_tl_km = 0
-        trip_raporlari_df = pd.DataFrame() # Boş DF
+            # --- YENİ "GENEL BAKIŞ" HESAPLAMASI (Sadece Trip'lere göre) ---
+            genel_ortalama_lt_100km, genel_ortalama_tl_km = trip_averages(trip_raporlari_df)
 
-        if len(full_dolum_indeksleri) < 2:
-            st.warning("Genel ortalamaların hesaplanması için en az 2 'Full Dolum' kaydı gereklidir.")
-        else:
-            for i in range(len(full_dolum_indeksleri) - 1):
-                start_index = full_dolum_indeksleri[i]
-                end_index = full_dolum_indeksleri[i+1]
-                
-                trip_df = yakit_df.iloc[start_index : end_index + 1]
-                
-                baslangic_km = trip_df["KM Sayacı"].iloc[0]
-                bitis_km = trip_df["KM Sayacı"].iloc[-1]
-                gidilen_km = bitis_km - baslangic_km
-                
-                tuketilen_litre = trip_df["Litre"].iloc[1:].sum()
-                harcanan_para = trip_df["Tutar"].iloc[1:].sum()
-                
-                if gidilen_km > 0:
-                    lt_100km = (tuketilen_litre / gidilen_km) * 100
-                    tl_km = harcanan_para / gidilen_km
-                    
-                    trip_raporlari.append({
-                        "Başlangıç KM": int(baslangic_km),
-                        "Bitiş KM": int(bitis_km),
-                        "Gidilen KM": int(gidilen_km),
-                        "Tüketilen Litre": float(tuketilen_litre),
-                        "Harcanan Para (Trip)": float(harcanan_para),
-                        "L/100km (Ort.)": float(lt_100km),
-                        "TL/km (Ort.)": float(tl_km)
-                    })
-            
-            if trip_raporlari:
-                trip_raporlari_df = pd.DataFrame(trip_raporlari)
-                
-                # --- YENİ "GENEL BAKIŞ" HESAPLAMASI (Sadece Trip'lere göre) ---
-                toplam_trip_km = trip_raporlari_df['Gidilen KM'].sum()
-                toplam_trip_litre = trip_raporlari_df['Tüketilen Litre'].sum()
-                toplam_trip_para = trip_raporlari_df['Harcanan Para (Trip)'].sum()
-                
-                if toplam_trip_km > 0:
-                    genel_ortalama_lt_100km = (toplam_trip_litre / toplam_trip_km) * 100
-                    genel_ortalama_tl_km = toplam_trip_para / toplam_trip_km
+            if (yakit_df["Dolum Türü"] == 'Full Dolum').sum() < 2:
+                st.warning("Genel ortalamaların hesaplanması için en az 2 'Full Dolum' kaydı gereklidir.")
 
-        # --- "GENEL BAKIŞ" (Tüm Zamanlar) - (DÜZENLENDİ) ---
-        st.subheader("Genel Bakış (Tamamlanmış 'Trip' Ortalamaları)")
-        st.info("Bu ortalamalar, sadece 'Full Dolum'dan 'Full Dolum'a tamamlanmış seyahatlerin verilerini yansıtır. 'Kısmi Dolum'lar bu ortalamayı anlık olarak etkilemez.")
+            # --- "GENEL BAKIŞ" (Tüm Zamanlar) - (DÜZENLENDİ) ---
+            st.subheader("Genel Bakış (Tamamlanmış 'Trip' Ortalamaları)")
+            st.info("Bu ortalamalar, sadece 'Full Dolum'dan 'Full Dolum'a tamamlanmış seyahatlerin verilerini yansıtır. 'Kısmi Dolum'lar bu ortalamayı anlık olarak etkilemez.")
         
-        col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Genel Ortalama (L/100km)", f"{genel_ortalama_lt_100km:.2f}")
-        col2.metric("Genel Ortalama (TL/km)", f"{genel_ortalama_tl_km:.2f}")
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Genel Ortalama (L/100km)", f"{genel_ortalama_lt_100km:.2f}")
+            col2.metric("Genel Ortalama (TL/km)", f"{genel_ortalama_tl_km:.2f}")
         
-        toplam_gidilen_km_tum_zamanlar = yakit_df["KM Sayacı"].iloc[-1] - yakit_df["KM Sayacı"].iloc[0]
-        col3.metric("Toplam Gidilen KM (Tüm Kayıtlar)", f"{toplam_gidilen_km_tum_zamanlar:,.0f}")
-        col4.metric("Toplam Yakıt Harcaması (Tüm Kayıtlar)", f"{yakit_df['Tutar'].sum():,.2f} TL")
+            toplam_gidilen_km_tum_zamanlar = yakit_df["KM Sayacı"].iloc[-1] - yakit_df["KM Sayacı"].iloc[0]
+            col3.metric("Toplam Gidilen KM (Tüm Kayıtlar)", f"{toplam_gidilen_km_tum_zamanlar:,.0f}")
+            col4.metric("Toplam Yakıt Harcaması (Tüm Kayıtlar)", f"{rollups.total('Yakıt'):,.2f} TL")
 
-        st.divider()
+            st.divider()
 
-        # --- "TRIP" (FULL-TO-FULL) TABLOSU ---
-        st.subheader("Dolum Periyotlarına Göre Tüketim Analizi (Full-to-Full)")
-        if not trip_raporlari_df.empty:
-            # Raporlama için formatlanmış DataFrame
-            trip_raporlari_display_df = trip_raporlari_df.copy()
-            trip_raporlari_display_df['Tüketilen Litre'] = trip_raporlari_display_df['Tüketilen Litre'].map('{:,.2f}'.format)
-            trip_raporlari_display_df['L/100km (Ort.)'] = trip_raporlari_display_df['L/100km (Ort.)'].map('{:,.2f}'.format)
-            trip_raporlari_display_df['TL/km (Ort.)'] = trip_raporlari_display_df['TL/km (Ort.)'].map('{:,.2f}'.format)
+            # --- "TRIP" (FULL-TO-FULL) TABLOSU ---
+            st.subheader("Dolum Periyotlarına Göre Tüketim Analizi (Full-to-Full)")
+            if not trip_raporlari_df.empty:
+                # Raporlama için formatlanmış DataFrame
+                trip_raporlari_display_df = trip_raporlari_df.copy()
+                trip_raporlari_display_df['Tüketilen Litre'] = trip_raporlari_display_df['Tüketilen Litre'].map('{:,.2f}'.format)
+                trip_raporlari_display_df['L/100km (Ort.)'] = trip_raporlari_display_df['L/100km (Ort.)'].map('{:,.2f}'.format)
+                trip_raporlari_display_df['TL/km (Ort.)'] = trip_raporlari_display_df['TL/km (Ort.)'].map('{:,.2f}'.format)
             
-            st.dataframe(
-                trip_raporlari_display_df.drop(columns=['Harcanan Para (Trip)']), # Ham para verisini gösterme
-                hide_index=True, 
-                use_container_width=True
-            )
-        else:
-            st.warning("Henüz tamamlanmış bir 'Full-to-Full' periyodu yok.")
+                st.dataframe(
+                    trip_raporlari_display_df.drop(columns=['Harcanan Para (Trip)']), # Ham para verisini gösterme
+                    hide_index=True, 
+                    use_container_width=True
+                )
+            else:
+                st.warning("Henüz tamamlanmış bir 'Full-to-Full' periyodu yok.")
 
 
-        st.divider()
-        
-        # --- AYLIK ÖZET TABLOSU (DÜZENLENDİ - Ortalamalar Kaldırıldı) ---
-        st.subheader("Aylık Yakıt Gider Özeti")
-        st.info("Bu tablo, her ay yakıta ne kadar para harcadığınızı ve toplam kaç litre yakıt aldığınızı gösterir.")
-        
-        if not yakit_df.empty:
-            yakit_aylik = yakit_df.set_index('Tarih').copy()
-            
-            aylik_ozet = yakit_aylik.resample('ME').agg(
-                Toplam_Harcanan_Para_TL=('Tutar', 'sum'),
-                Toplam_Alınan_Litre=('Litre', 'sum')
+            st.divider()
+
+            # --- KAYAN ORTALAMALAR ---
+            st.subheader("Kayan Ortalamalar")
+            col1, col2 = st.columns(2)
+            birim = col1.radio("Pencere", ["Son N trip", "Son N gün"], horizontal=True, key="kayan_birim")
+            boyut = col2.number_input(
+                "N", min_value=1, step=1, key=f"kayan_{birim}",
+                value=VARSAYILAN_PENCERE if birim == "Son N trip" else 90,
             )
-            
-            # Sadece harcama olan ayları göster
-            aylik_ozet = aylik_ozet[aylik_ozet['Toplam_Harcanan_Para_TL'] > 0]
-            
-            aylik_ozet = aylik_ozet.rename(columns={
-                'Toplam_Harcanan_Para_TL': 'Toplam Harcanan Para (TL)',
-                'Toplam_Alınan_Litre': 'Toplam Alınan Litre',
-            })
-            
-            aylik_ozet.index = aylik_ozet.index.strftime('%Y-%B')
-            st.dataframe(aylik_ozet.sort_index(ascending=False).style.format("{:,.2f}"), use_container_width=True)
+            if birim == "Son N trip" and boyut == VARSAYILAN_PENCERE:
+                # Varsayılan pencere veriyle birlikte tutulur; yeni yakıt kayıtlarında artımlı uzatılır
+                kayan = st.session_state.veri.fuel_metrics()
+            elif birim == "Son N trip":
+                kayan = cached(("kayan", boyut, None), RollingFuelMetrics.from_frame, df_main, boyut)
+            else:
+                kayan = cached(("kayan", VARSAYILAN_PENCERE, boyut), RollingFuelMetrics.from_frame, df_main, VARSAYILAN_PENCERE, boyut)
+            kayan_tripler = cached(("kayan_tripler", birim, boyut), kayan.trips)
+            kayan_dolumlar = cached(("kayan_dolumlar", birim, boyut), kayan.fills)
 
+            col1, col2, col3 = st.columns(3)
+            if not kayan_tripler.empty:
+                col1.metric(f"{birim} (L/100km)", f"{kayan_tripler['L/100km (Kayan)'].iloc[-1]:.2f}")
+                col2.metric(f"{birim} (TL/km)", f"{kayan_tripler['TL/km (Kayan)'].iloc[-1]:.2f}")
+            if not kayan_dolumlar.empty:
+                col3.metric(f"{birim} (TL/L)", f"{kayan_dolumlar['TL/L (Kayan)'].iloc[-1]:.2f}")
 
-# --- 6. SEKME 4: GENEL MASRAF ANALİZİ ---
-with tab4:
-    st.header("Genel Masraf Analizi")
+            # Trip ve dolum grafiklerinde tepeler kaybolmasın diye her zaman aralığının en küçük ve en büyük değeri çizilir
+            st.markdown("**Trip Başına Tüketim (L/100km)**")
+            render_time_chart(
+                kayan_tripler, "Bitiş Tarihi", ["L/100km", "L/100km (Kayan)"], f"tripler_{birim}_{boyut}", yontem="minmax",
+            )
+            st.markdown("**Litre Fiyatı (TL/L)**")
+            render_time_chart(kayan_dolumlar, "Tarih", ["TL/L", "TL/L (Kayan)"], f"dolumlar_{birim}_{boyut}", yontem="minmax")
 
-    if df_main.empty:
-        st.info("Analiz için henüz bir masraf kaydı girmediniz.")
-    else:
-        odeme_kayitlari = []
-        for _, row in df_main.iterrows():
-            if row['Taksit Sayısı'] == 0: continue 
-            taksit_tutari = row['Tutar'] / row['Taksit Sayısı']
-            for i in range(int(row['Taksit Sayısı'])):
-                odeme_tarihi = row['Tarih'] + relativedelta(months=i)
-                odeme_kayitlari.append({
-                    "Ödeme Tarihi": odeme_tarihi,
-                    "Kategori": row['Masraf Türü'],
-                    "Ödeme Tutarı": taksit_tutari
-                })
+            # --- AYKIRI TRİPLER VE DOLUMLAR ---
+            st.subheader("Sıra Dışı Tüketim ve Litre Fiyatları")
+            st.info("Her trip ve dolum kendinden önceki 30 kayıtla karşılaştırılır; çeyrekler açıklığının 1,5 katından fazla sapanlar listelenir. Sıra dışı yüksek tüketim eksik girilmiş bir dolumu, sıra dışı litre fiyatı hatalı bir fişi veya yakıt kartının başka bir araçta kullanıldığını gösterebilir.")
+            # Aykırı değerler pencereden bağımsızdır; veriyle tutulan metrikler parça parça taranır
+            yakit_metrikleri = st.session_state.veri.fuel_metrics()
+            aykiri_tripler = cached("aykiri_tripler", outlier_rows, yakit_metrikleri.iter_trips(), "L/100km")
+            aykiri_dolumlar = cached("aykiri_dolumlar", outlier_rows, yakit_metrikleri.iter_fills(), "TL/L")
+            if aykiri_tripler.empty and aykiri_dolumlar.empty:
+                st.success("Sıra dışı bir trip veya dolum bulunmadı.")
+            if not aykiri_tripler.empty:
+                st.dataframe(
+                    aykiri_tripler[["Bitiş Tarihi", "Başlangıç KM", "Bitiş KM", "Tüketilen Litre", "L/100km", "Alt Sınır", "Üst Sınır"]].iloc[::-1],
+                    hide_index=True,
+                    use_container_width=True,
+                    column_config={
+                        "Bitiş Tarihi": st.column_config.DateColumn("Bitiş Tarihi", format="YYYY-MM-DD"),
+                        "Tüketilen Litre": st.column_config.NumberColumn("Tüketilen Litre", format="%.2f"),
+                        "L/100km": st.column_config.NumberColumn("L/100km", format="%.2f"),
+                        "Alt Sınır": st.column_config.NumberColumn("Beklenen (Alt)", format="%.2f"),
+                        "Üst Sınır": st.column_config.NumberColumn("Beklenen (Üst)", format="%.2f"),
+                    },
+                )
+            if not aykiri_dolumlar.empty:
+                st.dataframe(
+                    aykiri_dolumlar[["Tarih", "KM Sayacı", "Litre", "Tutar", "TL/L", "Alt Sınır", "Üst Sınır"]].iloc[::-1],
+                    hide_index=True,
+                    use_container_width=True,
+                    column_config={
+                        "Tarih": st.column_config.DateColumn("Tarih", format="YYYY-MM-DD"),
+                        "KM Sayacı": st.column_config.NumberColumn("KM Sayacı", format="%d km"),
+                        "Tutar": st.column_config.NumberColumn("Tutar", format="%.2f TL"),
+                        "TL/L": st.column_config.NumberColumn("TL/L", format="%.2f"),
+                        "Alt Sınır": st.column_config.NumberColumn("Beklenen (Alt)", format="%.2f"),
+                        "Üst Sınır": st.column_config.NumberColumn("Beklenen (Üst)", format="%.2f"),
+                    },
+                )
+
+            st.divider()
         
-        odeme_df = pd.DataFrame(odeme_kayitlari)
+            # --- AYLIK ÖZET TABLOSU (DÜZENLENDİ - Ortalamalar Kaldırıldı) ---
+            st.subheader("Aylık Yakıt Gider Özeti")
+            st.info("Bu tablo, her ay yakıta ne kadar para harcadığınızı ve toplam kaç litre yakıt aldığınızı gösterir.")
         
-        bugun = datetime.now()
-        bu_ay_baslangic = bugun.replace(day=1, hour=0, minute=0, second=0)
+            if not yakit_df.empty:
+                aylik_ozet = rollups.monthly_summary('Yakıt')
+                st.dataframe(aylik_ozet.style.format("{:,.2f}"), use_container_width=True)
+
+
+    # --- 6. SEKME 4: GENEL MASRAF ANALİZİ ---
+    def render_expense_analysis(df_main):
+        st.header("Genel Masraf Analizi")
+        rollups = st.session_state.veri.rollups
+
+        if df_main.empty:
+            st.info("Analiz için henüz bir masraf kaydı girmediniz.")
+        else:
+            bugun = datetime.now()
         
-        bu_ayki_odemeler = pd.DataFrame()
-        if not odeme_df.empty: 
-            bu_ayki_odemeler = odeme_df[
-                (odeme_df['Ödeme Tarihi'] >= pd.to_datetime(bu_ay_baslangic)) &
-                (odeme_df['Ödeme Tarihi'] < pd.to_datetime(bu_ay_baslangic + relativedelta(months=1)))
-            ]
+            # Bu ay ödenecek taksitler, ödeme satırları tek tek oluşturulmadan kategori bazında toplanır
+            bu_ayki_odemeler = cached(("bu_ayki_odemeler", bugun.strftime('%Y-%m')), installments_due, df_main, bugun)
         
-        toplam_harcama = df_main['Tutar'].sum()
-        bu_ayki_toplam_odeme = bu_ayki_odemeler['Ödeme Tutarı'].sum() if not bu_ayki_odemeler.empty else 0
+            toplam_harcama = rollups.total()
+            bu_ayki_toplam_odeme = bu_ayki_odemeler.sum()
 
-        col1, col2 = st.columns(2)
-        col1.metric("Tüm Zamanlar Toplam Harcama", f"{toplam_harcama:,.2f} TL")
-        col2.metric(f"{bugun.strftime('%B %Y')} Ayı Toplam Ödeme", f"{bu_ayki_toplam_odeme:,.2f} TL")
+            col1, col2 = st.columns(2)
+            col1.metric("Tüm Zamanlar Toplam Harcama", f"{toplam_harcama:,.2f} TL")
+            col2.metric(f"{bugun.strftime('%B %Y')} Ayı Toplam Ödeme", f"{bu_ayki_toplam_odeme:,.2f} TL")
 
-        st.divider()
-        st.subheader("Kategori Bazlı Masraf Dökümü")
+            st.divider()
+            st.subheader("Yaklaşan Bakımlar")
+            # Odometre indeksi veri sürümü başına, tahminler veri sürümü ve gün başına bir kez hesaplanır
+            indeks = cached("odometre", OdometerIndex.from_frame, df_main)
+            bakimlar = cached(("bakim", bugun.strftime('%Y-%m-%d')), forecast_maintenance, df_main, bugun, None, indeks)
+            gunluk_km = indeks.daily_rate()
+            if pd.notna(gunluk_km):
+                st.caption(f"Tahminler son bir yılın ortalamasına göre yapılır: günde {gunluk_km:,.0f} km.")
+            render_maintenance_table(bakimlar.reset_index())
 
-        # KATEGORILER_TUMU (GÜNCELLENDİĞİ İÇİN 'Sigorta-Kasko' otomatik eklenecek)
-        for kategori in KATEGORILER_TUMU:
-            kategori_df = df_main[df_main["Masraf Türü"] == kategori]
-            
-            if not kategori_df.empty:
-                kategori_toplam_harcama = kategori_df['Tutar'].sum()
-                
-                kategori_bu_ayki_odeme = 0
-                if not bu_ayki_odemeler.empty: 
-                    kategori_bu_ayki_odeme = bu_ayki_odemeler[
-                        bu_ayki_odemeler['Kategori'] == kategori
-                    ]['Ödeme Tutarı'].sum()
+            st.divider()
+            st.subheader("Kategorilere Göre Kümülatif Harcama")
+            render_time_chart(
+                cached("kumulatif_harcama", cumulative_spend, df_main), "Tarih", "Kümülatif Harcama (TL)", "kumulatif",
+                renk="Kategori",
+            )
+
+            st.subheader("Aylık Toplam Harcama")
+            # Ay × kategori başına tek nokta vardır; toplamlar özet tablolardan okunur, seyreltmeye gerek yoktur
+            st.bar_chart(cached("aylik_toplamlar", rollups.monthly_totals), x="Ay", y="Tutar", color="Kategori")
+
+            st.divider()
+            st.subheader("Kategori Bazlı Masraf Dökümü")
+
+            # KATEGORILER_TUMU (GÜNCELLENDİĞİ İÇİN 'Sigorta-Kasko' otomatik eklenecek)
+            kategori_dfleri = cached("kategoriler", split_by_category, df_main)
+            for kategori in KATEGORILER_TUMU:
+                if rollups.count(kategori) > 0:
+                    kategori_df = kategori_dfleri[kategori]
+                    kategori_toplam_harcama = rollups.total(kategori)
                 
-                expander_title = (
-                    f"**{kategori}** | "
-                    f"Toplam Harcama: **{kategori_toplam_harcama:,.2f} TL** | "
-                    f"Bu Ayki Ödeme: **{kategori_bu_ayki_odeme:,.2f} TL**"
-                )
+                    kategori_bu_ayki_odeme = bu_ayki_odemeler.get(kategori, 0)
                 
-                with st.expander(expander_title):
-                    st.dataframe(
-                        kategori_df[["Tarih", "KM Sayacı", "Tutar", "Açıklama", "Taksit Sayısı"]].sort_values("Tarih", ascending=False),
-                        hide_index=True,
-                        use_container_width=True,
-                         column_config={
-                            "Tarih": st.column_config.DateColumn("Tarih", format="YYYY-MM-DD"),
-                            "Tutar": st.column_config.NumberColumn("Tutar", format="%.2f TL"),
-                            "KM Sayacı": st.column_config.NumberColumn("KM Sayacı", format="%d km"),
-                            "Taksit Sayısı": st.column_config.NumberColumn("Taksit Sayısı", format="%d"),
-                        }
+                    expander_title = (
+                        f"**{kategori}** | "
+                        f"Toplam Harcama: **{kategori_toplam_harcama:,.2f} TL** | "
+                        f"Bu Ayki Ödeme: **{kategori_bu_ayki_odeme:,.2f} TL**"
                     )
+                
+                    with st.expander(expander_title):
+                        st.dataframe(
+                            kategori_df[["Tarih", "KM Sayacı", "Tutar", "Açıklama", "Taksit Sayısı"]].sort_values("Tarih", ascending=False),
+                            hide_index=True,
+                            use_container_width=True,
+                             column_config={
+                                "Tarih": st.column_config.DateColumn("Tarih", format="YYYY-MM-DD"),
+                                "Tutar": st.column_config.NumberColumn("Tutar", format="%.2f TL"),
+                                "KM Sayacı": st.column_config.NumberColumn("KM Sayacı", format="%d km"),
+                                "Taksit Sayısı": st.column_config.NumberColumn("Taksit Sayısı", format="%d"),
+                            }
+                        )
+
+    def render_maintenance_table(bakimlar):
+        st.dataframe(
+            bakimlar,
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "Son Tarih": st.column_config.DateColumn("Son Bakım", format="YYYY-MM-DD"),
+                "Son KM": st.column_config.NumberColumn("Son Bakım KM", format="%d km"),
+                "Sonraki KM": st.column_config.NumberColumn("Sonraki Bakım KM", format="%d km"),
+                "Tahmini Tarih": st.column_config.DateColumn("Tahmini Tarih", format="YYYY-MM-DD"),
+                "Kalan KM": st.column_config.NumberColumn("Kalan KM", format="%d km"),
+                "Kalan Gün": st.column_config.NumberColumn("Kalan Gün", format="%d"),
+            },
+        )
 
-# --- 7. SEKME 5: VERİ YÖNETİMİ ---
-with tab5:
-    st.header("Veri Yönetimi ve Düzenleme")
+    # --- 7. SEKME 5: VERİ YÖNETİMİ ---
+    def render_data_management(df_main):
+        st.header("Veri Yönetimi ve Düzenleme")
     
-    if df_main.empty:
-        st.info("Görüntülenecek veya düzenlenecek bir veri yok.")
-    else:
-        st.subheader("Veri Filtreleme")
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            filt_turler = st.multiselect("Masraf Türüne Göre Filtrele", options=df_main['Masraf Türü'].unique())
-        with col2:
-            min_date = df_main['Tarih'].min().date()
-            max_date = df_main['Tarih'].max().date()
-            filt_tarih = st.date_input("Tarih Aralığı Seçin", value=(min_date, max_date), min_value=min_date, max_value=max_date)
-        with col3:
-            filt_aciklama = st.text_input("Açıklamada Ara")
+        if df_main.empty:
+            st.info("Görüntülenecek veya düzenlenecek bir veri yok.")
+        else:
+            # Tarih, açıklama ve kategori indeksleri veri sürümü başına bir kez kurulur
+            indeks = cached("sorgu_indeksi", ExpenseIndex, df_main)
+
+            st.subheader("Veri Filtreleme")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                filt_turler = st.multiselect("Masraf Türüne Göre Filtrele", options=indeks.categories)
+            with col2:
+                min_tarih, max_tarih = indeks.date_bounds()
+                min_date = min_tarih.date() if min_tarih is not None else datetime.now().date()
+                max_date = max_tarih.date() if max_tarih is not None else datetime.now().date()
+                filt_tarih = st.date_input("Tarih Aralığı Seçin", value=(min_date, max_date), min_value=min_date, max_value=max_date)
+            with col3:
+                filt_aciklama = st.text_input("Açıklamada Ara")
+
+            # Sadece eşleşen satırların konumları bulunur; veri kopyalanmaz
+            konumlar = indeks.filter(filt_turler, filt_tarih, filt_aciklama)
+
+            st.divider()
 
-        filtrelenmis_df = df_main.copy()
+            st.subheader("Kayıtları Düzenle veya Sil")
+            st.info("Bir hücreyi düzenlemek için üzerine çift tıklayın. Bir kaydı silmek için satırın başındaki kutucuğu seçip klavyenizdeki 'Delete' tuşuna basın.")
+
+            # --- SAYFALAMA (Düzenleyiciye sadece bir sayfa gönderilir) ---
+            sayfa_sayisi = max((len(konumlar) - 1) // EDITOR_SAYFA_BOYUTU + 1, 1)
+            col_sayfa, col_bilgi = st.columns([1, 3])
+            with col_sayfa:
+                sayfa = st.number_input("Sayfa", min_value=1, max_value=sayfa_sayisi, value=1, step=1)
+            with col_bilgi:
+                st.caption(
+                    f"{len(konumlar):,} kayıt bulundu · sayfa {sayfa}/{sayfa_sayisi} "
+                    f"(sayfa başına {EDITOR_SAYFA_BOYUTU}). Sayfa veya filtre değiştirmeden önce değişikliklerinizi kaydedin."
+                )
+
+            editor_df = df_main.iloc[konumlar[(sayfa - 1) * EDITOR_SAYFA_BOYUTU:sayfa * EDITOR_SAYFA_BOYUTU]]
+            # Düzenleyicinin durumu satır konumlarıyla tutulur; her pencere kendi anahtarını alır
+            editor_key = f"data_editor_{sayfa}_{hash((tuple(filt_turler), tuple(filt_tarih), filt_aciklama))}"
+        
+            edited_df = st.data_editor(
+                editor_df,
+                num_rows="dynamic",
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "Tarih": st.column_config.DateColumn("Tarih", format="YYYY-MM-DD", step=1),
+                    "Tutar": st.column_config.NumberColumn("Tutar", format="%.2f TL", step=0.01),
+                    "Litre": st.column_config.NumberColumn("Litre", format="%.2f L", step=0.01),
+                    "KM Sayacı": st.column_config.NumberColumn("KM Sayacı", format="%d km"),
+                    "Taksit Sayısı": st.column_config.NumberColumn("Taksit Sayısı", format="%d"),
+                },
+                key=editor_key
+            )
         
-        if filt_turler:
-            filtrelenmis_df = filtrelenmis_df[filtrelenmis_df['Masraf Türü'].isin(filt_turler)]
+            st.divider()
         
-        if len(filt_tarih) == 2:
-            filtrelenmis_df = filtrelenmis_df[
-                (filtrelenmis_df['Tarih'].dt.date >= filt_tarih[0]) &
-                (filtrelenmis_df['Tarih'].dt.date <= filt_tarih[1])
-            ]
+            if st.button("Tüm Değişiklikleri Kalıcı Olarak Kaydet"):
             
-        if filt_aciklama:
-            filtrelenmis_df = filtrelenmis_df[filtrelenmis_df['Açıklama'].str.contains(filt_aciklama, case=False, na=False)]
+                # Sadece değişen satırları gönder: önce düzenleyicinin kendi durumunu kullan,
+                # bulunamazsa filtrelenmiş tablo ile düzenlenmiş tabloyu karşılaştır.
+                editor_state = st.session_state.get(editor_key)
+                if editor_state is not None:
+                    changeset = changeset_from_editor(editor_df, editor_state)
+                else:
+                    changeset = diff_frames(editor_df, edited_df)
+
+                if apply_changeset(changeset):
+                    st.success("Veritabanı (Google Sheets) başarıyla güncellendi!")
+                    st.rerun()
+
+            st.divider()
+
+            # --- DIŞA AKTARMA (Dosya sadece istenince, parça parça oluşturulur) ---
+            st.subheader("Dışa Aktar")
+            col1, col2, col3 = st.columns([2, 1, 1])
+            with col1:
+                kapsam = st.selectbox("Ne aktarılsın?", list(DISA_AKTARMA_KAPSAMLARI))
+            with col2:
+                bicim = st.selectbox("Biçim", list(BICIMLER), format_func=str.upper)
+            with col3:
+                st.write("")
+                hazirla = st.button("Dosyayı Hazırla")
+
+            if hazirla:
+                with st.spinner("Dosya hazırlanıyor..."), metrics.span("export", kapsam=kapsam, bicim=bicim):
+                    veri, konum = DISA_AKTARMA_KAPSAMLARI[kapsam](df_main, konumlar)
+                    dosya = io.BytesIO()
+                    try:
+                        export_frame(veri, bicim, dosya, konumlar=konum)
+                    except Exception as e:
+                        st.error(f"Dosya oluşturulamadı: {e}")
+                    else:
+                        metrics.set_attributes(bayt=dosya.tell())
+                        st.download_button(
+                            f"{kapsam} ({bicim.upper()}, {dosya.tell() / 1024:,.0f} KB) İndir",
+                            data=dosya.getvalue(),
+                            file_name=f"arac_{DOSYA_ADLARI[kapsam]}_{datetime.now():%Y%m%d}.{bicim}",
+                            mime=BICIMLER[bicim],
+                        )
+
+            st.divider()
+
+            # --- SIKIŞTIRMA (Tüm sayfayı sıralayıp baştan yazar) ---
+            st.subheader("Sayfayı Sırala ve Sıkıştır")
+            st.info("Yeni kayıtlar E-Tabloya sadece eklenerek yazılır. Elle yapılan düzenlemelerden sonra sayfayı tarihe göre yeniden sıralamak ve hatalı satırları temizlemek için kullanın.")
+            if st.button("Sayfayı Baştan Yaz"):
+                save_data()
+                st.success("E-Tablo sıralanıp baştan yazıldı!")
+                st.rerun()
 
         st.divider()
 
-        st.subheader("Kayıtları Düzenle veya Sil")
-        st.info("Bir hücreyi düzenlemek için üzerine çift tıklayın. Bir kaydı silmek için satırın başındaki kutucuğu seçip klavyenizdeki 'Delete' tuşuna basın.")
-        
-        editor_df = filtrelenmis_df.copy()
-        
-        edited_df = st.data_editor(
-            editor_df,
-            num_rows="dynamic",
+        # --- TOPLU İÇE AKTARMA ---
+        st.subheader("Toplu İçe Aktar (CSV / Excel)")
+        st.info(
+            "Geçmiş fiş ve masraflarınızı tek seferde yükleyin. Gerekli sütunlar: Tarih, Masraf Türü, Tutar; "
+            "KM Sayacı, Açıklama, Taksit Sayısı, Litre ve Dolum Türü isteğe bağlıdır. "
+            "Hatalı satırlar atlanır ve aşağıda listelenir."
+        )
+        yuklenen_dosya = st.file_uploader("Dosya seçin", type=["csv", "xlsx"], key="ice_aktar_dosya")
+        col1, col2 = st.columns(2)
+        with col1:
+            ondalik = st.radio("Ondalık ayırıcı", [",", "."], horizontal=True, help="1.234,56 için ',' ; 1,234.56 için '.'")
+        with col2:
+            sadece_dogrula = st.checkbox("Sadece doğrula (kaydetme)")
+
+        if yuklenen_dosya is not None and st.button("İçe Aktar"):
+            rapor = import_data(yuklenen_dosya, ondalik, sadece_dogrula)
+            if rapor is not None:
+                if sadece_dogrula:
+                    st.success(f"{rapor['okunan']:,} satır okundu, {rapor['gecerli']:,} satır kaydedilmeye hazır.")
+                else:
+                    st.success(f"{rapor['okunan']:,} satır okundu, {rapor['yazilan']:,} satır kaydedildi.")
+                if "hata" in rapor:
+                    st.error(f"Kaydetme yarıda kaldı ({rapor['yazilan']:,} satır kaydedildi): {rapor['hata']}")
+                if rapor["hatalar"]:
+                    st.warning(f"{len(rapor['hatalar']):,} satır hatalı olduğu için atlandı.")
+                    st.dataframe(
+                        pd.DataFrame(rapor["hatalar"][:1000], columns=["Satır", "Sütun", "Değer", "Sebep"]).astype({"Değer": str}),
+                        hide_index=True,
+                        use_container_width=True,
+                    )
+
+
+    # --- 8. FİLO ÖZETİ (Sadece birden fazla araç varsa) ---
+    def render_fleet_dashboard(df_main):
+        st.header("Filo Özeti")
+        filo = get_fleet()
+
+        # Araçlar thread havuzunda eşzamanlı yüklenir, analizler süreç havuzunda paralel hesaplanır;
+        # verisi değişmeyen araçların sonucu önbellekten gelir
+        with st.spinner("Araçların verisi yükleniyor..."), metrics.span("filo.load", arac=len(filo.vehicles)):
+            durumlar, hatalar = filo.load_all()
+        for arac, hata in hatalar.items():
+            _handle_sheets_error(hata)
+            st.warning(f"'{arac}' aracının verisi yüklenemedi: {hata}")
+        if not durumlar:
+            return
+
+        bugun = datetime.now()
+        with metrics.span("filo.analyze", arac=len(durumlar)):
+            ozetler, hatalar = filo.analyze(durumlar, bugun, cache=get_analytics_cache())
+        for arac, hata in hatalar.items():
+            st.warning(f"'{arac}' aracının filo özeti hesaplanamadı: {hata}")
+        if not ozetler:
+            return
+        toplamlar = fleet_totals(ozetler)
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Araç Sayısı", f"{toplamlar['arac']}")
+        col2.metric("Filo Toplam Harcama", f"{toplamlar['toplam']:,.2f} TL")
+        col3.metric("Filo Maliyeti (TL/km)", f"{toplamlar['tl_km']:.2f}")
+        col4.metric("Filo Ortalaması (L/100km)", f"{toplamlar['lt_100km']:.2f}")
+        st.caption(f"{bugun.strftime('%B %Y')} ayı toplam ödeme: {toplamlar['bu_ay']:,.2f} TL · toplam {toplamlar['gidilen_km']:,.0f} km")
+
+        st.divider()
+        st.subheader("Maliyet ve Tüketim Sıralaması")
+        st.info("TL/km bütün masrafların aracın gittiği km'ye oranıdır; L/100km sadece 'Full-to-Full' triplerden hesaplanır. Sıra 1, en ucuz / en az yakan araçtır.")
+        st.dataframe(
+            fleet_ranking(ozetler).drop(columns=["Trip KM", "Trip Litre", "Trip Harcama (TL)"]),
             use_container_width=True,
-            hide_index=True,
             column_config={
-                "Tarih": st.column_config.DateColumn("Tarih", format="YYYY-MM-DD", step=1),
-                "Tutar": st.column_config.NumberColumn("Tutar", format="%.2f TL", step=0.01),
-                "Litre": st.column_config.NumberColumn("Litre", format="%.2f L", step=0.01),
-                "KM Sayacı": st.column_config.NumberColumn("KM Sayacı", format="%d km"),
-                "Taksit Sayısı": st.column_config.NumberColumn("Taksit Sayısı", format="%d"),
+                "Son KM": st.column_config.NumberColumn("Son KM", format="%d km"),
+                "Gidilen KM": st.column_config.NumberColumn("Gidilen KM", format="%d km"),
+                "Toplam Harcama (TL)": st.column_config.NumberColumn("Toplam Harcama", format="%.2f TL"),
+                "Yakıt Harcaması (TL)": st.column_config.NumberColumn("Yakıt Harcaması", format="%.2f TL"),
+                "TL/km (Tüm Masraflar)": st.column_config.NumberColumn("TL/km (Tüm Masraflar)", format="%.2f"),
+                "L/100km (Ort.)": st.column_config.NumberColumn("L/100km (Ort.)", format="%.2f"),
+                "TL/km (Yakıt)": st.column_config.NumberColumn("TL/km (Yakıt)", format="%.2f"),
+                "Bu Ayki Ödeme (TL)": st.column_config.NumberColumn("Bu Ayki Ödeme", format="%.2f TL"),
             },
-            key="data_editor_key"
         )
-        
+
         st.divider()
-        
-        if st.button("Tüm Değişiklikleri Kalıcı Olarak Kaydet"):
-            
-            # 1. Filtrelenmiş kayıtların index'lerini (yani güncellenecek/silinecek olanları) df_main'den sil.
-            index_to_drop = filtrelenmis_df.index
-            df_main_without_edited = df_main.drop(index=index_to_drop)
-            
-            # 2. Düzenlenmiş (veya silinmemiş) satırları al
-            df_guncel = pd.concat([df_main_without_edited, edited_df], ignore_index=True)
-            
-            # Veri tiplerini tekrar doğrula
-            df_guncel['Tarih'] = pd.to_datetime(df_guncel['Tarih'])
-            numeric_cols = ['KM Sayacı', 'Tutar', 'Taksit Sayısı', 'Litre']
-            for col in numeric_cols:
-                df_guncel[col] = pd.to_numeric(df_guncel[col], errors='coerce').fillna(0)
-            df_guncel['Taksit Sayısı'] = df_guncel['Taksit Sayısı'].apply(lambda x: 1 if x < 1 else int(x))
-            
-            df_guncel = df_guncel.replace(r'^\s*$', pd.NA, regex=True)
+        st.subheader("Bakım Takvimi")
+        with metrics.span("filo.bakim", arac=len(durumlar)):
+            bakimlar = forecast_fleet(durumlar, bugun, cache=get_analytics_cache())
+        render_maintenance_table(bakimlar.reset_index().sort_values("Tahmini Tarih", na_position="last"))
+
+
+    #
+    # --- DIŞA AKTARMA KAPSAMLARI ---
+    # Her kapsam (DataFrame, satır konumları) döndürür; konumlar None ise bütün satırlar yazılır
+    #
+    def _trip_report(df_main):
+        return cached("tripler", compute_trips, cached("yakit_kayitlari", fuel_records, df_main))
+
+    DISA_AKTARMA_KAPSAMLARI = {
+        "Filtrelenmiş kayıtlar": lambda df_main, konumlar: (df_main, konumlar),
+        "Tüm geçmiş": lambda df_main, konumlar: (df_main, None),
+        "Trip raporu": lambda df_main, konumlar: (_trip_report(df_main), None),
+        "Aylık yakıt özeti": lambda df_main, konumlar: (
+            st.session_state.veri.rollups.monthly_summary('Yakıt').rename_axis("Ay").reset_index(), None
+        ),
+    }
+    DOSYA_ADLARI = {
+        "Filtrelenmiş kayıtlar": "filtrelenmis", "Tüm geçmiş": "masraflar",
+        "Trip raporu": "tripler", "Aylık yakıt özeti": "aylik_yakit",
+    }
+
+    #
+    # --- 9. SAYFA YÖNLENDİRME ---
+    #
+    SAYFALAR = {
+        "⛽ Yakıt Masrafı Gir": render_fuel_entry,
+        "🛒 Diğer Masrafları Gir": render_other_entry,
+        "📊 Yakıt Analizi": render_fuel_analysis,
+        "💳 Genel Masraf Analizi": render_expense_analysis,
+        DUZENLEME_SAYFASI: render_data_management,
+    }
+    if len(get_fleet().vehicles) > 1:
+        SAYFALAR["🚚 Filo Özeti"] = render_fleet_dashboard
+
+    metrics.set_attributes(satir=len(df_main))
+    if _get_setting("NAVIGATION", VARSAYILAN_GEZINME) == "sekme":
+        for render, sekme in zip(SAYFALAR.values(), st.tabs(list(SAYFALAR))):
+            with sekme, metrics.span(f"sayfa.{render.__name__}"):
+                render(df_main)
+    else:
+        # Seçim session_state'te (aktif_sayfa) kalır; kayıttan sonra aynı sayfada kalınır
+        aktif_sayfa = st.radio("Sayfa", list(SAYFALAR), horizontal=True, key="aktif_sayfa", label_visibility="collapsed")
+        metrics.set_attributes(sayfa=SAYFALAR[aktif_sayfa].__name__)
+        with metrics.span(f"sayfa.{SAYFALAR[aktif_sayfa].__name__}"):
+            SAYFALAR[aktif_sayfa](df_main)
+finally:
+    # st.rerun() ve st.stop() (bağlantı ve yükleme hatalarında da) buradan geçer; ölçüm yine kaydedilir
+    finish_rerun_trace()
 
-            save_data(df_guncel) 
-            st.success("Veritabanı (Google Sheets) başarıyla güncellendi!")
-            st.rerun()
\ No newline at end of file
+if _get_flag("DEBUG_PANEL", False) or st.query_params.get("debug") == "1":
+    render_debug_panel()
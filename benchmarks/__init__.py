@@ -0,0 +1,4 @@
+"""Sıcak yolların (yükleme, kaydetme, trip, taksit, filtreleme) performans ölçümleri.
+
+Kullanım: python -m benchmarks.run --help
+"""
@@ -0,0 +1,135 @@
+"""gspread Worksheet yerine kullanılan, hafızada çalışan sahte çalışma sayfası."""
+
+import re
+import time
+from datetime import datetime, timezone
+
+# Sahte E-Tablonun sütun sayısı (A:H)
+SUTUN_SAYISI = 8
+
+
+class FakeSpreadsheet:
+    """Worksheet.spreadsheet'in batch_update ve lastUpdateTime kısmını taklit eder."""
+
+    def __init__(self, worksheet):
+        self._worksheet = worksheet
+        self.lastUpdateTime = datetime.now(timezone.utc).isoformat()
+
+    def touch(self):
+        self.lastUpdateTime = datetime.now(timezone.utc).isoformat()
+
+    def batch_update(self, body):
+        """pasteData, insertDimension, deleteDimension ve appendDimension isteklerini uygular."""
+        ws = self._worksheet
+        ws._wait("batch_update")
+        satirlar = ws.rows
+        for istek in body["requests"]:
+            tur, govde = next(iter(istek.items()))
+            if tur == "pasteData":
+                koordinat = govde["coordinate"]
+                metinler = govde["data"].split("\n")
+                if koordinat["rowIndex"] + len(metinler) > ws.row_count:
+                    raise ValueError(f"pasteData ızgaranın dışına taşıyor ({ws.row_count} satır)")
+                for i, metin in enumerate(metinler):
+                    satir_no = koordinat["rowIndex"] + i
+                    while len(satirlar) <= satir_no:
+                        satirlar.append([""] * SUTUN_SAYISI)
+                    hucreler = metin.split(govde.get("delimiter", "\t"))
+                    sutun = koordinat["columnIndex"]
+                    satirlar[satir_no][sutun:sutun + len(hucreler)] = hucreler
+            elif tur == "insertDimension":
+                bas, son = govde["range"]["startIndex"], govde["range"]["endIndex"]
+                satirlar[bas:bas] = [[""] * SUTUN_SAYISI for _ in range(son - bas)]
+                ws.row_count += son - bas
+            elif tur == "deleteDimension":
+                bas, son = govde["range"]["startIndex"], govde["range"]["endIndex"]
+                del satirlar[bas:son]
+                ws.row_count -= son - bas
+            elif tur == "appendDimension":
+                ws.row_count += govde["length"]
+            else:
+                raise ValueError(f"Desteklenmeyen istek: {tur}")
+        self.touch()
+        return {"replies": []}
+
+
+class FakeWorksheet:
+    """Satırları liste olarak tutan sahte Worksheet.
+
+    gecikme (saniye), her ağ çağrısına eklenen gidiş-dönüş süresini taklit eder.
+    cagrilar, yapılan çağrıların adlarını sırayla kaydeder. row_count ızgaranın satır
+    sayısıdır (varsayılan: veri kadar); pasteData ızgaranın dışına yazamaz, update büyütür.
+    """
+
+    id = 0
+
+    def __init__(self, satirlar=None, gecikme=0.0, izgara=None):
+        self.rows = [list(satir) for satir in (satirlar or [])]
+        self.row_count = len(self.rows) if izgara is None else izgara
+        self.gecikme = gecikme
+        self.cagrilar = []
+        self.spreadsheet = FakeSpreadsheet(self)
+
+    def _wait(self, ad=None):
+        if ad is not None:
+            self.cagrilar.append(ad)
+        if self.gecikme:
+            time.sleep(self.gecikme)
+
+    def get_all_values(self):
+        self._wait("get_all_values")
+        return [list(satir) for satir in self.rows]
+
+    def _range(self, aralik):
+        eslesme = re.fullmatch(r"A(\d+):H(\d*)", aralik)
+        bas = int(eslesme.group(1)) - 1
+        son = int(eslesme.group(2)) if eslesme.group(2) else len(self.rows)
+        return [list(satir) for satir in self.rows[bas:son]]
+
+    def get(self, aralik):
+        self._wait("get")
+        return self._range(aralik)
+
+    def batch_get(self, araliklar):
+        self._wait("batch_get")
+        return [self._range(aralik) for aralik in araliklar]
+
+    def col_values(self, sutun):
+        self._wait("col_values")
+        degerler = [satir[sutun - 1] if len(satir) >= sutun else "" for satir in self.rows]
+        while degerler and degerler[-1] == "":
+            degerler.pop()
+        return degerler
+
+    def clear(self):
+        self._wait("clear")
+        self.rows = []
+        self.spreadsheet.touch()
+
+    def update(self, degerler, range_name=None, **kwargs):
+        """range_name verilmezse bütün sayfayı, verilirse ('A5001') o satırdan başlayarak yazar."""
+        self._wait("update")
+        yeni = [[str(h) for h in satir] for satir in degerler]
+        if range_name is None:
+            self.rows = yeni
+        else:
+            bas = int(re.fullmatch(r"A(\d+)(?::H\d*)?", range_name).group(1)) - 1
+            while len(self.rows) < bas + len(yeni):
+                self.rows.append([""] * SUTUN_SAYISI)
+            self.rows[bas:bas + len(yeni)] = yeni
+        self.row_count = max(self.row_count, len(self.rows))
+        self.spreadsheet.touch()
+
+    def batch_clear(self, araliklar):
+        """'A5001:H' gibi açık uçlu aralıkları temizler (sondaki boş satırlar atılır)."""
+        self._wait("batch_clear")
+        for aralik in araliklar:
+            bas = int(re.fullmatch(r"A(\d+):H", aralik).group(1)) - 1
+            del self.rows[bas:]
+        self.spreadsheet.touch()
+
+    def append_rows(self, degerler, *args, **kwargs):
+        self._wait("append_rows")
+        self.rows.extend([str(h) for h in satir] for satir in degerler)
+        self.row_count = max(self.row_count, len(self.rows))
+        self.spreadsheet.touch()
@@ -0,0 +1,165 @@
+"""Benchmark'ları farklı veri boyutlarında çalıştırır ve sonuçları JSON olarak kaydeder.
+
+Örnekler:
+    python -m benchmarks.run --sizes 1000 10000 --out sonuc.json
+    python -m benchmarks.run --compare onceki.json --threshold 1.25
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from arac_core.analysis import compute_trips, expand_installments, fuel_records, installments_due
+from arac_core.downsample import cumulative_spend, downsample
+from arac_core.query import ExpenseIndex
+from arac_core.schema import REQUIRED_COLUMNS, format_for_sheets
+from arac_core.storage import GoogleSheetsStorage
+
+from .fake_worksheet import FakeWorksheet
+from .synthetic import generate_history
+
+VARSAYILAN_BOYUTLAR = [1_000, 10_000, 100_000, 1_000_000]
+SONUC_SEMA_SURUMU = 1
+
+
+def _measure(fn, tekrar):
+    """fn'i tekrar kez çalıştırır; süreleri (saniye) döndürür."""
+    sureler = []
+    for _ in range(tekrar):
+        baslangic = time.perf_counter()
+        fn()
+        sureler.append(time.perf_counter() - baslangic)
+    return sureler
+
+
+def benchmark_cases(df, gecikme):
+    """(ad, fonksiyon) çiftleri: her biri uygulamadaki bir sıcak yolu taklit eder."""
+    sayfa_satirlari = [REQUIRED_COLUMNS] + format_for_sheets(df)
+    yakit_df = fuel_records(df)
+    indeks = ExpenseIndex(df)
+    bu_ay = df["Tarih"].max()
+    orta = df["Tarih"].iloc[len(df) // 2].date()
+    kumulatif = cumulative_spend(df)
+
+    def load():
+        # load_data: E-Tablonun tamamını okuyup tipli DataFrame'e çevirme
+        worksheet = FakeWorksheet(sayfa_satirlari, gecikme=gecikme)
+        GoogleSheetsStorage(lambda: worksheet).load()
+
+    def save():
+        # save_data: sıralama + metne çevirme + clear/update
+        worksheet = FakeWorksheet([REQUIRED_COLUMNS], gecikme=gecikme)
+        storage = GoogleSheetsStorage(lambda: worksheet)
+        storage.load()
+        storage.rewrite(df)
+
+    def filtre():
+        # Veri Yönetimi: kategori + tarih aralığı + açıklama araması
+        indeks.filter(["Yakıt", "Lastik"], (date(orta.year, 1, 1), orta), "shell")
+
+    return [
+        ("load_data", load),
+        ("save_data", save),
+        ("trip", lambda: compute_trips(fuel_records(df))),
+        ("trip_hesaplama", lambda: compute_trips(yakit_df)),
+        ("taksit_acilimi", lambda: expand_installments(df)),
+        ("bu_ayki_taksitler", lambda: installments_due(df, bu_ay)),
+        ("filtre_indeksi", lambda: ExpenseIndex(df)),
+        ("filtre", filtre),
+        # Genel Masraf Analizi: kategori başına kümülatif harcama grafiği (800 px)
+        ("grafik_seyreltme", lambda: downsample(kumulatif, "Tarih", "Kümülatif Harcama (TL)", 800, renk="Kategori")),
+    ]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(boyutlar, tekrar=3, gecikme=0.0, secilen=None):
+    """Bütün benchmark'ları çalıştırır; sonuç sözlüğünü döndürür."""
+    sonuclar = []
+    for boyut in boyutlar:
+        df = generate_history(boyut)
+        for ad, fn in benchmark_cases(df, gecikme):
+            if secilen and ad not in secilen:
+                continue
+            sureler = _measure(fn, tekrar)
+            sonuclar.append({
+                "ad": ad,
+                "satir": boyut,
+                "medyan": statistics.median(sureler),
+                "en_kisa": min(sureler),
+                "tekrar": tekrar,
+            })
+            print(f"{ad:<20} {boyut:>10,} satır  medyan {sonuclar[-1]['medyan'] * 1000:10.2f} ms", flush=True)
+    return {
+        "sema": SONUC_SEMA_SURUMU,
+        "zaman": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "ortam": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "makine": platform.machine(),
+        },
+        "gecikme": gecikme,
+        "sonuclar": sonuclar,
+    }
+
+
+def compare(onceki, simdiki, esik):
+    """İki sonuç dosyasını (ad, satır) bazında karşılaştırır; yavaşlayanların listesini döndürür."""
+    eski = {(s["ad"], s["satir"]): s["medyan"] for s in onceki["sonuclar"]}
+    yavaslayanlar = []
+    for s in simdiki["sonuclar"]:
+        anahtar = (s["ad"], s["satir"])
+        if anahtar not in eski or not eski[anahtar]:
+            continue
+        oran = s["medyan"] / eski[anahtar]
+        isaret = "YAVAŞLADI" if oran > esik else ""
+        print(f"{s['ad']:<20} {s['satir']:>10,} satır  {oran:6.2f}x {isaret}")
+        if oran > esik:
+            yavaslayanlar.append((anahtar, oran))
+    return yavaslayanlar
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Araç masraf uygulaması performans ölçümleri")
+    parser.add_argument("--sizes", type=int, nargs="+", default=VARSAYILAN_BOYUTLAR, help="Satır sayıları")
+    parser.add_argument("--repeat", type=int, default=3, help="Her ölçümün tekrar sayısı")
+    parser.add_argument("--latency", type=float, default=0.0, help="Sahte E-Tablo çağrısı başına gecikme (saniye)")
+    parser.add_argument("--only", nargs="+", help="Sadece bu adlı benchmark'lar")
+    parser.add_argument("--out", help="Sonuçların yazılacağı JSON dosyası")
+    parser.add_argument("--compare", help="Karşılaştırılacak önceki sonuç dosyası")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Bu oranın üstündeki yavaşlamalar hata sayılır")
+    args = parser.parse_args(argv)
+
+    sonuc = run(args.sizes, tekrar=args.repeat, gecikme=args.latency, secilen=args.only)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(sonuc, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            onceki = json.load(f)
+        if compare(onceki, sonuc, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""Gerçekçi, sentetik yakıt ve masraf geçmişi üreticisi."""
+
+import numpy as np
+import pandas as pd
+
+from arac_core.schema import KATEGORILER_DIGER, KM_GEREKEN_KATEGORILER, REQUIRED_COLUMNS, apply_schema
+
+# Kayıtların yaklaşık bu kadarı yakıt alımıdır; kalanı diğer masraflar
+YAKIT_ORANI = 0.7
+# Yakıt kayıtlarının bu kadarı 'Full Dolum'dur
+FULL_DOLUM_ORANI = 0.8
+# Taksitle ödenebilen kategoriler (en fazla 12 taksit)
+TAKSITLI_KATEGORILER = ['Sigorta-Kasko', 'Tamir-Servis', 'Lastik', 'Aksesuar']
+# Büyük geçmişler bu süreye sıkıştırılır (aynı güne birden çok kayıt düşer, filo gibi)
+EN_UZUN_SURE_GUN = 30 * 365
+
+
+def generate_history(satir_sayisi, baslangic="2010-01-01", seed=0):
+    """(Tarih, KM) sırasında, satir_sayisi kayıtlık tipli bir masraf DataFrame'i üretir.
+
+    Araç her yakıt alımı arasında 300-700 km gider, 5-9 L/100km yakar; litre fiyatı
+    zamanla artar (bütün süre boyunca ~%50). Kısmi dolumlar depoyu yarı yarıya doldurur. Diğer masraflar
+    KATEGORILER_DIGER'den seçilir; taksitli kategoriler 1-12 taksit alır.
+    """
+    rng = np.random.default_rng(seed)
+    yakit_sayisi = int(satir_sayisi * YAKIT_ORANI)
+    diger_sayisi = satir_sayisi - yakit_sayisi
+
+    # --- Yakıt alımları ---
+    gidilen = rng.integers(300, 700, yakit_sayisi)
+    km = 10_000 + np.cumsum(gidilen)
+    gun = np.cumsum(rng.uniform(3, 12, yakit_sayisi))
+    if len(gun) and gun[-1] > EN_UZUN_SURE_GUN:
+        gun = gun * (EN_UZUN_SURE_GUN / gun[-1])
+    gun = np.floor(gun).astype(np.int64)
+    full_mu = rng.random(yakit_sayisi) < FULL_DOLUM_ORANI
+    tuketim = rng.uniform(5, 9, yakit_sayisi)
+    litre = np.round(gidilen * tuketim / 100 * np.where(full_mu, 1.0, 0.5), 2)
+    litre_fiyati = 30 + gun / max(gun[-1] if len(gun) else 1, 1) * 15 + rng.normal(0, 0.5, yakit_sayisi)
+    yakit = pd.DataFrame({
+        "Tarih": pd.Timestamp(baslangic) + pd.to_timedelta(gun, unit="D"),
+        "KM Sayacı": km,
+        "Masraf Türü": "Yakıt",
+        "Tutar": np.round(litre * litre_fiyati, 2),
+        "Açıklama": rng.choice(["Yakıt Alımı", "Shell V-Power", "Opet", "BP Ultimate", "Petrol Ofisi"], yakit_sayisi),
+        "Taksit Sayısı": 1,
+        "Litre": litre,
+        "Dolum Türü": np.where(full_mu, "Full Dolum", "Kısmi Dolum"),
+    })
+
+    # --- Diğer masraflar (yakıt alımları arasına serpiştirilir) ---
+    sira = np.sort(rng.integers(0, max(yakit_sayisi, 1), diger_sayisi))
+    kategori = rng.choice(KATEGORILER_DIGER, diger_sayisi)
+    taksitli = np.isin(kategori, TAKSITLI_KATEGORILER)
+    taksit = np.where(taksitli & (rng.random(diger_sayisi) < 0.5), rng.integers(2, 13, diger_sayisi), 1)
+    diger = pd.DataFrame({
+        "Tarih": yakit["Tarih"].to_numpy()[sira] if yakit_sayisi else pd.Timestamp(baslangic),
+        "KM Sayacı": np.where(np.isin(kategori, KM_GEREKEN_KATEGORILER), km[sira] if yakit_sayisi else 0, 0),
+        "Masraf Türü": kategori,
+        "Tutar": np.round(rng.lognormal(6, 1.2, diger_sayisi), 2),
+        "Açıklama": np.char.add(kategori.astype(str), np.char.add(" #", rng.integers(1, 1000, diger_sayisi).astype(str))),
+        "Taksit Sayısı": taksit,
+        "Litre": 0.0,
+        "Dolum Türü": "",
+    })
+
+    df = pd.concat([yakit, diger], ignore_index=True)[REQUIRED_COLUMNS]
+    df = df.sort_values(by=["Tarih", "KM Sayacı"], kind="stable").reset_index(drop=True)
+    return apply_schema(df)
@@ -0,0 +1,158 @@
+"""analysis motorlarının, yerlerini aldıkları satır satır döngülerle karşılaştırılması."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from dateutil.relativedelta import relativedelta
+
+from arac_core.analysis import TRIP_SUTUNLARI, compute_trips, expand_installments, fuel_records, installments_due
+from arac_core.schema import KATEGORILER_TUMU, REQUIRED_COLUMNS, apply_schema, create_empty_dataframe
+
+
+def _frame(satirlar):
+    return apply_schema(pd.DataFrame(satirlar, columns=REQUIRED_COLUMNS))
+
+
+def _random_history(rng, adet):
+    """Rastgele masraf geçmişi: aynı KM'de dolumlar, ay sonu tarihleri ve taksitli masraflar içerir."""
+    yakit_mu = rng.random(adet) < 0.6
+    return _frame({
+        "Tarih": pd.Timestamp("2023-01-28") + pd.to_timedelta(rng.integers(0, 800, adet), unit="D")
+        + pd.to_timedelta(rng.integers(0, 24, adet), unit="h"),
+        # Küçük adımlar sık sık sıfır KM'lik tripler üretir
+        "KM Sayacı": 10_000 + np.cumsum(rng.integers(0, 3, adet) * 150),
+        "Masraf Türü": np.where(yakit_mu, "Yakıt", rng.choice(KATEGORILER_TUMU[1:], adet)),
+        "Tutar": np.round(rng.uniform(0, 5000, adet), 2),
+        "Açıklama": "",
+        "Taksit Sayısı": np.where(yakit_mu, 1, rng.integers(0, 13, adet)),
+        "Litre": np.where(yakit_mu, np.round(rng.uniform(5, 60, adet), 2), 0),
+        "Dolum Türü": np.where(yakit_mu, rng.choice(["Full Dolum", "Kısmi Dolum"], adet, p=[0.7, 0.3]), ""),
+    })
+
+
+#
+# --- Eski döngüler ---
+#
+def _reference_trips(yakit_df):
+    full_dolum_indeksleri = yakit_df[yakit_df["Dolum Türü"] == 'Full Dolum'].index.tolist()
+    trip_raporlari = []
+    for i in range(len(full_dolum_indeksleri) - 1):
+        trip_df = yakit_df.iloc[full_dolum_indeksleri[i]:full_dolum_indeksleri[i + 1] + 1]
+        baslangic_km = trip_df["KM Sayacı"].iloc[0]
+        bitis_km = trip_df["KM Sayacı"].iloc[-1]
+        gidilen_km = bitis_km - baslangic_km
+        tuketilen_litre = trip_df["Litre"].iloc[1:].sum()
+        harcanan_para = trip_df["Tutar"].iloc[1:].sum()
+        if gidilen_km > 0:
+            trip_raporlari.append({
+                "Başlangıç KM": int(baslangic_km),
+                "Bitiş KM": int(bitis_km),
+                "Gidilen KM": int(gidilen_km),
+                "Tüketilen Litre": float(tuketilen_litre),
+                "Harcanan Para (Trip)": float(harcanan_para),
+                "L/100km (Ort.)": float(tuketilen_litre / gidilen_km * 100),
+                "TL/km (Ort.)": float(harcanan_para / gidilen_km),
+            })
+    return pd.DataFrame(trip_raporlari, columns=TRIP_SUTUNLARI)
+
+
+def _reference_installments(df):
+    odeme_kayitlari = []
+    for _, row in df.iterrows():
+        if row['Taksit Sayısı'] == 0:
+            continue
+        taksit_tutari = row['Tutar'] / row['Taksit Sayısı']
+        for i in range(int(row['Taksit Sayısı'])):
+            odeme_kayitlari.append({
+                "Ödeme Tarihi": row['Tarih'] + relativedelta(months=i),
+                "Kategori": row['Masraf Türü'],
+                "Ödeme Tutarı": taksit_tutari,
+            })
+    return pd.DataFrame(odeme_kayitlari, columns=["Ödeme Tarihi", "Kategori", "Ödeme Tutarı"])
+
+
+def _reference_due(df, ay):
+    odeme_df = _reference_installments(df)
+    bas = pd.Timestamp(ay).replace(day=1).normalize()
+    bu_ay = odeme_df[(odeme_df['Ödeme Tarihi'] >= bas) & (odeme_df['Ödeme Tarihi'] < bas + relativedelta(months=1))]
+    return bu_ay.groupby('Kategori', observed=True)['Ödeme Tutarı'].sum()
+
+
+#
+# --- Trip ---
+#
+def _assert_trips_match(df):
+    yakit_df = fuel_records(df)
+    beklenen = _reference_trips(yakit_df)
+    sonuc = compute_trips(yakit_df)
+    assert list(sonuc.columns) == TRIP_SUTUNLARI
+    assert len(sonuc) == len(beklenen)
+    if len(beklenen):
+        pd.testing.assert_frame_equal(sonuc.reset_index(drop=True), beklenen, check_dtype=False)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_compute_trips_matches_loop(seed):
+    rng = np.random.default_rng(seed)
+    _assert_trips_match(_random_history(rng, int(rng.integers(1, 300))))
+
+
+def _fuel(km, dolum, litre=10.0, tutar=100.0):
+    return ["2024-01-01", km, "Yakıt", tutar, "", 1, litre, dolum]
+
+
+@pytest.mark.parametrize("satirlar", [
+    [],
+    [_fuel(1000, "Full Dolum")],
+    [_fuel(1000, "Kısmi Dolum"), _fuel(1200, "Kısmi Dolum")],
+    # Sadece kısmi dolumlardan sonra tek bir full: trip yok
+    [_fuel(1000, "Kısmi Dolum"), _fuel(1200, "Full Dolum"), _fuel(1400, "Kısmi Dolum")],
+    # Baştaki ve sondaki kısmi dolumlar tripe girmez
+    [_fuel(900, "Kısmi Dolum"), _fuel(1000, "Full Dolum"), _fuel(1200, "Kısmi Dolum", 20, 300),
+     _fuel(1500, "Full Dolum", 30, 400), _fuel(1600, "Kısmi Dolum")],
+    # Aynı KM'de iki full: sıfır KM'lik trip atlanır
+    [_fuel(1000, "Full Dolum"), _fuel(1000, "Full Dolum"), _fuel(1300, "Full Dolum")],
+])
+def test_compute_trips_edge_cases(satirlar):
+    _assert_trips_match(_frame(satirlar) if satirlar else create_empty_dataframe())
+
+
+#
+# --- Taksit ---
+#
+@pytest.mark.parametrize("seed", range(20))
+def test_expand_installments_matches_loop(seed):
+    rng = np.random.default_rng(seed)
+    df = _random_history(rng, int(rng.integers(1, 200)))
+    beklenen = _reference_installments(df)
+    sonuc = expand_installments(df)
+    assert len(sonuc) == len(beklenen)
+    assert (sonuc["Ödeme Tarihi"].to_numpy() == beklenen["Ödeme Tarihi"].to_numpy(dtype="datetime64[ns]")).all()
+    assert sonuc["Kategori"].astype(str).tolist() == beklenen["Kategori"].astype(str).tolist()
+    np.testing.assert_allclose(sonuc["Ödeme Tutarı"].to_numpy(), beklenen["Ödeme Tutarı"].to_numpy(dtype=float))
+
+
+def test_expand_installments_empty():
+    assert expand_installments(create_empty_dataframe()).empty
+
+
+def test_expand_installments_clips_to_month_end():
+    df = _frame([["2024-01-31", 0, "Sigorta-Kasko", 300.0, "", 3, 0, ""]])
+    assert expand_installments(df)["Ödeme Tarihi"].dt.strftime("%Y-%m-%d").tolist() == \
+        ["2024-01-31", "2024-02-29", "2024-03-31"]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_installments_due_matches_loop(seed):
+    rng = np.random.default_rng(seed)
+    df = _random_history(rng, int(rng.integers(1, 200)))
+    for ay in pd.date_range("2022-12-01", "2026-06-01", freq="7MS"):
+        beklenen = _reference_due(df, ay)
+        sonuc = installments_due(df, ay)
+        assert sorted(map(str, sonuc.index)) == sorted(map(str, beklenen.index))
+        for kategori, tutar in beklenen.items():
+            assert sonuc[kategori] == pytest.approx(tutar)
+
+
+def test_installments_due_empty():
+    assert installments_due(create_empty_dataframe(), "2024-01-01").empty
@@ -0,0 +1,39 @@
+"""schema biçimlendiricilerinin basit (satır satır) karşılıklarıyla karşılaştırılması."""
+
+import numpy as np
+import pytest
+
+from arac_core.schema import format_tr_decimals
+
+
+def _reference(x):
+    """Eski satır satır biçimlendirici."""
+    return "" if not np.isfinite(x) else f"{x:.2f}".replace('.', ',')
+
+
+@pytest.mark.parametrize("deger, beklenen", [
+    (957.205, "957,21"),
+    (209.035, "209,03"),
+    (1234.5, "1234,50"),
+    (-0.5, "-0,50"),
+    (-0.004, "-0,00"),
+    (0.0, "0,00"),
+    (np.nan, ""),
+])
+def test_format_tr_decimals_known_values(deger, beklenen):
+    assert format_tr_decimals([deger]).tolist() == [beklenen]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_format_tr_decimals_matches_reference(seed):
+    rng = np.random.default_rng(seed)
+    # Üç ondalıklı değerler tam yarım kuruşları (x,xx5) sık üretir
+    degerler = np.round(rng.uniform(-5000, 5000, 5000), 3)
+    degerler[rng.integers(0, len(degerler), 50)] = np.nan
+    degerler = np.r_[degerler, degerler[:100]]  # tekrar eden değerler
+
+    assert format_tr_decimals(degerler).tolist() == [_reference(x) for x in degerler]
+
+
+def test_format_tr_decimals_empty():
+    assert format_tr_decimals([]).tolist() == []
@@ -0,0 +1,100 @@
+"""SharedDataset'in iyimser eşzamanlı yazmalarının sahte E-Tablo üzerinde denenmesi."""
+
+import pandas as pd
+import pytest
+
+from arac_core.schema import REQUIRED_COLUMNS, apply_schema, format_for_sheets
+from arac_core.shared import SharedDataset, rebase_changeset
+from arac_core.storage import ConflictError, GoogleSheetsStorage
+from benchmarks.fake_worksheet import FakeWorksheet
+from benchmarks.synthetic import generate_history
+
+
+def _frame(satirlar):
+    return apply_schema(pd.DataFrame(satirlar, columns=REQUIRED_COLUMNS))
+
+
+def _entry(tarih, km, tutar=100.0):
+    return {"Tarih": pd.Timestamp(tarih), "KM Sayacı": km, "Masraf Türü": "Yakıt", "Tutar": tutar,
+            "Açıklama": "test", "Taksit Sayısı": 1, "Litre": 10.0, "Dolum Türü": "Full Dolum"}
+
+
+def _changeset(duzenlenen=None, eklenen=None, silinen=None):
+    return {"duzenlenen": duzenlenen or {}, "eklenen": eklenen if eklenen is not None else pd.DataFrame(),
+            "silinen": silinen or []}
+
+
+def _assert_same(worksheet, durum):
+    assert worksheet.rows[1:] == format_for_sheets(durum.df)
+
+
+@pytest.fixture
+def sheet():
+    df = generate_history(40, seed=2)
+    worksheet = FakeWorksheet([REQUIRED_COLUMNS] + format_for_sheets(df))
+    return worksheet, SharedDataset(GoogleSheetsStorage(lambda: worksheet))
+
+
+#
+# --- rebase_changeset ---
+#
+def test_rebase_follows_shifted_rows():
+    df = generate_history(10, seed=0)
+    # Başka bir oturum başa bir satır ekledi: etiketler bir kaydı
+    guncel = pd.concat([df.iloc[[0]], df]).reset_index(drop=True)
+    guncel.loc[0, "Tutar"] = 1.0
+    yeni = rebase_changeset(df, guncel, _changeset({3: {"Tutar": 5.0}}, silinen=[7]))
+    assert yeni["duzenlenen"] == {4: {"Tutar": 5.0}}
+    assert yeni["silinen"] == [8]
+
+
+def test_rebase_rejects_rows_changed_elsewhere():
+    df = generate_history(10, seed=0)
+    guncel = df.copy()
+    guncel.loc[3, "Tutar"] = 1.0
+    with pytest.raises(ConflictError):
+        rebase_changeset(df, guncel, _changeset({3: {"Tutar": 5.0}}))
+    # Dokunulmayan satırlardaki değişiklik çakışma değildir
+    assert rebase_changeset(df, guncel, _changeset(silinen=[4]))["silinen"] == [4]
+
+
+#
+# --- SharedDataset ---
+#
+def test_stale_changeset_is_rebased_onto_latest(sheet):
+    worksheet, veri = sheet
+    temel = veri.current()
+    df = temel.df
+    # Başka bir oturum araya geriye tarihli bir kayıt ekledi
+    veri.append(_frame([_entry(df["Tarih"].iloc[0], df["KM Sayacı"].iloc[0])]))
+    durum = veri.apply_changeset(_changeset({10: {"Tutar": 5.0}}, silinen=[20]), temel)
+    _assert_same(worksheet, durum)
+    assert durum.df.loc[11, "Tutar"] == 5.0
+    assert len(durum.df) == len(df)
+
+
+def test_commit_reloads_and_retries_after_drift(sheet):
+    worksheet, veri = sheet
+    df = veri.current().df
+    # E-Tabloya süreç dışından bir satır eklendi
+    worksheet.rows += format_for_sheets(_frame([_entry(df["Tarih"].max(), df["KM Sayacı"].max() + 1)]))
+    durum = veri.append(_frame([_entry(df["Tarih"].max() + pd.Timedelta(days=1), df["KM Sayacı"].max() + 2)]))
+    _assert_same(worksheet, durum)
+    assert len(durum.df) == len(df) + 2
+
+
+def test_append_validates_against_latest_version(sheet):
+    worksheet, veri = sheet
+    eski = veri.current()
+    son_km = eski.df["KM Sayacı"].max()
+    veri.append(_frame([_entry(eski.df["Tarih"].max(), son_km + 500)]))
+
+    def dogrula(durum):
+        if son_km + 100 < durum.df["KM Sayacı"].max():
+            raise ConflictError("KM son kayıttan düşük")
+
+    kopya = [list(satir) for satir in worksheet.rows]
+    with pytest.raises(ConflictError):
+        veri.append(_frame([_entry(eski.df["Tarih"].max(), son_km + 100)]), dogrula=dogrula)
+    assert worksheet.rows == kopya
+    assert veri.current().generation == eski.generation + 1
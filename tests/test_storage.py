@@ -0,0 +1,271 @@
+"""GoogleSheetsStorage'ın konumsal yazmalarının sahte E-Tablo üzerinde, SQLiteStorage'ın dosya üzerinde denenmesi."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from arac_core.schema import REQUIRED_COLUMNS, apply_schema, format_for_sheets
+from arac_core.snapshot import SheetSnapshot
+from arac_core.storage import GoogleSheetsStorage, SheetDriftError, SQLiteStorage
+from benchmarks.fake_worksheet import FakeWorksheet
+from benchmarks.synthetic import generate_history
+
+
+def _frame(satirlar):
+    return apply_schema(pd.DataFrame(satirlar, columns=REQUIRED_COLUMNS))
+
+
+def _entry(tarih, km, tutar=100.0, tur="Yakıt"):
+    return {"Tarih": pd.Timestamp(tarih), "KM Sayacı": km, "Masraf Türü": tur, "Tutar": tutar,
+            "Açıklama": "test", "Taksit Sayısı": 1, "Litre": 10.0, "Dolum Türü": "Full Dolum"}
+
+
+def _sheet(df, izgara=None):
+    worksheet = FakeWorksheet([REQUIRED_COLUMNS] + format_for_sheets(df), izgara=izgara)
+    storage = GoogleSheetsStorage(lambda: worksheet)
+    return worksheet, storage, storage.load()
+
+
+def _assert_same(worksheet, df):
+    """E-Tablo, hafızadaki modelin satır etiketleriyle (etiket + 2 = satır) birebir aynı olmalı."""
+    assert df.index.tolist() == list(range(len(df)))
+    assert worksheet.rows[0] == REQUIRED_COLUMNS
+    assert worksheet.rows[1:] == format_for_sheets(df)
+
+
+@pytest.fixture
+def history():
+    return generate_history(60, seed=3)
+
+
+#
+# --- Konumsal yazmalar ---
+#
+def test_append_at_end_and_backdated(history):
+    worksheet, storage, df = _sheet(history)
+    orta = df["Tarih"].iloc[30]
+    yeni = _frame([
+        _entry(df["Tarih"].max() + pd.Timedelta(days=1), df["KM Sayacı"].max() + 500),
+        _entry(orta, df["KM Sayacı"].iloc[30]),
+        _entry(df["Tarih"].min() - pd.Timedelta(days=1), 0),
+    ])
+    df = storage.append(df, yeni)
+    _assert_same(worksheet, df)
+    assert len(df) == len(history) + 3
+
+
+def test_changeset_edits_deletes_and_inserts(history):
+    worksheet, storage, df = _sheet(history)
+    changeset = {
+        "duzenlenen": {3: {"Tutar": 1.5}, 4: {"Tutar": 2.5, "Açıklama": "x"}, 40: {"Litre": 33.0}, 10: {"Tutar": 9.0}},
+        "eklenen": _frame([_entry(df["Tarih"].iloc[20], df["KM Sayacı"].iloc[20]),
+                           _entry(df["Tarih"].max(), df["KM Sayacı"].max() + 1)]),
+        "silinen": [10, 11, 12, 50],
+    }
+    df = storage.apply_changeset(df, changeset)
+    _assert_same(worksheet, df)
+    assert len(df) == len(history) - 4 + 2
+
+    # İkinci değişiklik seti, ilkinden sonraki etiketlerle
+    df = storage.apply_changeset(df, {"duzenlenen": {0: {"Tutar": 7.0}}, "eklenen": pd.DataFrame(),
+                                      "silinen": [len(df) - 1]})
+    _assert_same(worksheet, df)
+
+
+def test_random_changesets_keep_sheet_in_sync(history):
+    worksheet, storage, df = _sheet(history)
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        silinen = sorted(rng.choice(df.index.values, 3, replace=False).tolist())
+        duzenlenen = {int(e): {"Tutar": float(rng.integers(1, 999))}
+                      for e in rng.choice(df.index.values, 3, replace=False)}
+        kaynak = rng.choice(df.index.values, 2, replace=False)
+        eklenen = _frame([_entry(df.at[e, "Tarih"], df.at[e, "KM Sayacı"], tutar=float(e)) for e in kaynak])
+        df = storage.apply_changeset(df, {"duzenlenen": duzenlenen, "eklenen": eklenen, "silinen": silinen})
+        _assert_same(worksheet, df)
+
+
+def test_plan_inserts_targets_and_relabel(history):
+    df = history.iloc[:5].reset_index(drop=True)
+    storage = GoogleSheetsStorage(lambda: None)
+    yeni = _frame([_entry(df["Tarih"].iloc[4] + pd.Timedelta(days=1), 10**7),
+                   _entry(df["Tarih"].iloc[2], df["KM Sayacı"].iloc[2])])
+
+    sirali, hedefler = storage._plan_inserts(df, yeni, satir_sayisi=5)
+    # Eşit anahtarlı satır mevcudun arkasına girer; sona düşen satırın hedefi satır sayısıdır
+    assert hedefler.tolist() == [3, 5]
+    assert sirali["KM Sayacı"].tolist() == [df["KM Sayacı"].iloc[2], 10**7]
+
+    df_yeni = storage._relabel_after_insert(df, sirali, hedefler)
+    assert df_yeni.index.tolist() == list(range(7))
+    assert df_yeni.loc[3, "KM Sayacı"] == df["KM Sayacı"].iloc[2]
+    assert df_yeni.loc[4].equals(df.loc[3])
+    assert df_yeni.loc[6, "KM Sayacı"] == 10**7
+
+
+def test_build_batch_requests_order_and_ranges(history):
+    df = history.iloc[:6].reset_index(drop=True)
+    storage = GoogleSheetsStorage(lambda: None)
+    storage._satir_sayisi = 6
+    changeset = {"duzenlenen": {1: {"Tutar": 5.0}}, "eklenen": _frame([_entry(df["Tarih"].iloc[0], 0)]),
+                 "silinen": [4, 5]}
+    istekler, df_guncel, satir_sayisi, izgara = storage.build_batch_requests(df, changeset, 7, izgara=7)
+
+    assert [next(iter(i)) for i in istekler] == ["pasteData", "deleteDimension", "insertDimension", "pasteData"]
+    # Düzenleme eski satır numarasıyla, sadece değişen sütun (Tutar = D)
+    assert istekler[0]["pasteData"]["coordinate"] == {"sheetId": 7, "rowIndex": 2, "columnIndex": 3}
+    assert istekler[1]["deleteDimension"]["range"]["startIndex"] == 5
+    assert istekler[1]["deleteDimension"]["range"]["endIndex"] == 7
+    assert satir_sayisi == 5 and izgara == 6
+    assert df_guncel.index.tolist() == list(range(5))
+
+
+#
+# --- Izgara büyümesi ---
+#
+def test_appends_do_not_grow_grid_beyond_data(history):
+    worksheet, storage, df = _sheet(history)
+    for _ in range(5):
+        yeni = _frame([_entry(df["Tarih"].max() + pd.Timedelta(days=1), df["KM Sayacı"].max() + 100)])
+        df = storage.append(df, yeni)
+        _assert_same(worksheet, df)
+        assert worksheet.row_count == len(df) + 1
+
+
+def test_appends_fill_empty_grid_rows_first(history):
+    worksheet, storage, df = _sheet(history, izgara=len(history) + 1 + 2)
+    for _ in range(3):
+        df = storage.append(df, _frame([_entry(df["Tarih"].max(), df["KM Sayacı"].max() + 1)]))
+    # İlk iki kayıt boş satırlara yazıldı, sadece üçüncüsü için ızgara bir satır büyütüldü
+    _assert_same(worksheet, df)
+    assert worksheet.row_count == len(df) + 1
+
+
+#
+# --- Kayma (drift) kontrolü ---
+#
+def test_verify_detects_row_added_elsewhere(history):
+    worksheet, storage, df = _sheet(history)
+    worksheet.rows.append(format_for_sheets(df.iloc[[0]])[0])
+    with pytest.raises(SheetDriftError):
+        storage.apply_changeset(df, {"duzenlenen": {5: {"Tutar": 1.0}}, "eklenen": pd.DataFrame(), "silinen": []})
+    # Satır sayısı bilinmez olur; yeniden yüklemeden sonra yazma yapılabilir
+    assert storage._satir_sayisi is None
+    df = storage.load()
+    df = storage.apply_changeset(df, {"duzenlenen": {5: {"Tutar": 1.0}}, "eklenen": pd.DataFrame(), "silinen": []})
+    _assert_same(worksheet, df)
+
+
+def test_verify_detects_edited_target_row(history):
+    worksheet, storage, df = _sheet(history)
+    worksheet.rows[6][3] = "1,00"  # etiket 5
+    kopya = [list(satir) for satir in worksheet.rows]
+    with pytest.raises(SheetDriftError):
+        storage.delete(df, [5])
+    assert worksheet.rows == kopya
+
+
+def test_verify_detects_removed_row(history):
+    worksheet, storage, df = _sheet(history)
+    del worksheet.rows[20]
+    with pytest.raises(SheetDriftError):
+        storage.append(df, _frame([_entry(df["Tarih"].max(), df["KM Sayacı"].max() + 1)]))
+
+
+#
+# --- Baştan yazma ---
+#
+def test_rewrite_in_chunks_clears_tail(history):
+    worksheet, storage, df = _sheet(history)
+    storage.parca_boyutu = 7
+    kisa = df.iloc[::2]
+    df = storage.rewrite(kisa)
+    _assert_same(worksheet, df)
+    assert worksheet.cagrilar.count("update") == -(-(len(kisa) + 1) // 7)
+
+
+#
+# --- Yerel anlık görüntü ---
+#
+@pytest.fixture
+def snapshot(tmp_path):
+    pytest.importorskip("pyarrow")
+    return SheetSnapshot(str(tmp_path / "sayfa.parquet"))
+
+
+def test_snapshot_roundtrip_and_torn_write(snapshot, history):
+    snapshot.write(history, len(history), surum="v1", tam_indirme=1e12)
+    df, meta = snapshot.read()
+    assert format_for_sheets(df) == format_for_sheets(history)
+    assert meta["satir_sayisi"] == len(history) and meta["surum"] == "v1"
+
+    # Parquet değişip üst bilgi yazılamadan kesilmiş yazma: özet tutmaz
+    history.iloc[:10].to_parquet(snapshot.path)
+    assert snapshot.read() is None
+
+
+def test_snapshot_stage_writes_only_on_flush(snapshot, history):
+    snapshot.write(history, len(history), tam_indirme=1e12)
+    snapshot.stage(history.iloc[:10], 10)
+    # Eski anlık görüntü artık geçersiz; yenisi henüz yazılmadı
+    assert snapshot.read() is None
+    snapshot.stage(history.iloc[:20], 20)
+    snapshot.flush()
+    df, meta = snapshot.read()
+    assert len(df) == 20 and meta["satir_sayisi"] == 20
+    # Tam indirmenin zamanı korunur
+    assert meta["tam_indirme"] == 1e12
+
+
+def test_load_from_snapshot_reads_only_new_rows(snapshot, history):
+    worksheet = FakeWorksheet([REQUIRED_COLUMNS] + format_for_sheets(history))
+    df = GoogleSheetsStorage(lambda: worksheet, snapshot=snapshot).load()
+
+    # Başka bir istemci sona iki satır ekledi
+    eklenen = _frame([_entry(df["Tarih"].max(), df["KM Sayacı"].max() + i) for i in (1, 2)])
+    worksheet.rows += format_for_sheets(eklenen)
+    worksheet.spreadsheet.touch()
+    worksheet.cagrilar.clear()
+    storage = GoogleSheetsStorage(lambda: worksheet, snapshot=snapshot)
+    df = storage.load()
+    assert "get_all_values" not in worksheet.cagrilar
+    _assert_same(worksheet, df)
+
+    # Kayıttan sonraki durum flush ile diske yazılır ve tekrar indirilmeden kullanılır
+    df = storage.append(df, _frame([_entry(df["Tarih"].max(), df["KM Sayacı"].max() + 5)]))
+    storage.flush_snapshot()
+    worksheet.cagrilar.clear()
+    df = GoogleSheetsStorage(lambda: worksheet, snapshot=snapshot).load()
+    assert "get_all_values" not in worksheet.cagrilar
+    _assert_same(worksheet, df)
+
+
+def test_load_from_snapshot_falls_back_when_rows_replaced(snapshot, history):
+    worksheet = FakeWorksheet([REQUIRED_COLUMNS] + format_for_sheets(history))
+    GoogleSheetsStorage(lambda: worksheet, snapshot=snapshot).load()
+
+    del worksheet.rows[-1]
+    worksheet.spreadsheet.touch()
+    worksheet.cagrilar.clear()
+    df = GoogleSheetsStorage(lambda: worksheet, snapshot=snapshot).load()
+    assert "get_all_values" in worksheet.cagrilar
+    _assert_same(worksheet, df)
+
+
+#
+# --- SQLite ---
+#
+def test_sqlite_roundtrip(tmp_path, history):
+    storage = SQLiteStorage(str(tmp_path / "test.db"))
+    df = storage.rewrite(history)
+    assert format_for_sheets(df) == format_for_sheets(history)
+
+    df = storage.append(df, _frame([_entry(df["Tarih"].min(), 0, tutar=1.0)]))
+    df = storage.update(df, {int(df.index[5]): {"Tutar": 2.0}})
+    silinen = df.index[-3:].tolist()
+    df = storage.delete(df, silinen)
+
+    yeniden = storage.load()
+    assert yeniden.index.tolist() == df.index.tolist()
+    assert format_for_sheets(yeniden) == format_for_sheets(df)
+    assert yeniden.iloc[0]["Tutar"] == 1.0
@@ -0,0 +1,210 @@
+"""WriteBehindStorage'ın kuyruğu ve günlüğünün sahte E-Tablo üzerinde denenmesi."""
+
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from arac_core.schema import REQUIRED_COLUMNS, apply_schema, format_for_sheets
+from arac_core.storage import GoogleSheetsStorage
+from arac_core.write_behind import PendingWritesError, WriteBehindStorage, WriteJournal
+from benchmarks.fake_worksheet import FakeWorksheet
+from benchmarks.synthetic import generate_history
+
+
+def _frame(satirlar):
+    return apply_schema(pd.DataFrame(satirlar, columns=REQUIRED_COLUMNS))
+
+
+def _entry(tarih, km, tutar=100.0):
+    return {"Tarih": pd.Timestamp(tarih), "KM Sayacı": km, "Masraf Türü": "Yakıt", "Tutar": tutar,
+            "Açıklama": "test", "Taksit Sayısı": 1, "Litre": 10.0, "Dolum Türü": "Full Dolum"}
+
+
+def _next_entry(df, tutar=100.0):
+    return _frame([_entry(df["Tarih"].max() + pd.Timedelta(days=1), df["KM Sayacı"].max() + 100, tutar)])
+
+
+def _assert_same(worksheet, df):
+    assert df.index.tolist() == list(range(len(df)))
+    assert worksheet.rows[1:] == format_for_sheets(df)
+
+
+class _Gate:
+    """storage.execute'u kapı açılana kadar bekletir; işlemler kuyrukta birikir."""
+
+    def __init__(self, storage):
+        self.kapi = threading.Event()
+        self._execute = storage.execute
+        storage.execute = self
+
+    def __call__(self, islem, ilerleme=None):
+        self.kapi.wait(5)
+        return self._execute(islem, ilerleme=ilerleme)
+
+
+@pytest.fixture
+def sheet():
+    df = generate_history(20, seed=1)
+    worksheet = FakeWorksheet([REQUIRED_COLUMNS] + format_for_sheets(df))
+    return worksheet, GoogleSheetsStorage(lambda: worksheet)
+
+
+@pytest.fixture
+def writer(sheet, tmp_path):
+    _, storage = sheet
+    yazici = WriteBehindStorage(storage, WriteJournal(str(tmp_path / "gunluk.jsonl")))
+    yield yazici
+    yazici.stop()
+
+
+def test_queued_batches_are_merged(sheet, writer):
+    worksheet, storage = sheet
+    kapi = _Gate(storage)
+    df = writer.load()
+    for i in range(5):
+        df = writer.append(df, _next_entry(df, tutar=i))
+    kapi.kapi.set()
+    assert writer.flush(timeout=5)
+    _assert_same(worksheet, df)
+    # İlk işlem kapıda bekledi, kalan dördü tek çağrıda birleşti
+    assert worksheet.cagrilar.count("batch_update") == 2
+
+
+def test_rewrite_after_dropped_batches(sheet, writer):
+    """append, append, rewrite: atlanan append'lerden sonra rewrite E-Tablonun gerçek durumunu beklemeli."""
+    worksheet, storage = sheet
+    kapi = _Gate(storage)
+    df = writer.load()
+    df = writer.append(df, _next_entry(df))
+    df = writer.append(df, _next_entry(df))
+    df = writer.rewrite(df.iloc[::-1])
+    kapi.kapi.set()
+
+    assert writer.flush(timeout=5), writer.son_hata
+    assert writer.status()["bekleyen"] == 0
+    _assert_same(worksheet, df)
+
+
+def test_rewrite_retry_after_transient_error_keeps_expectation(sheet, writer, monkeypatch):
+    worksheet, storage = sheet
+    kapi = _Gate(storage)
+    df = writer.load()
+    df = writer.append(df, _next_entry(df))
+    df = writer.append(df, _next_entry(df))
+    df = writer.rewrite(df)
+
+    # rewrite'ın ilk denemesi bir ağ hatasıyla kesilir, tekrar denemede gönderilir
+    gercek_update = worksheet.update
+    hatalar = [OSError("bağlantı koptu")]
+
+    def update(*args, **kwargs):
+        if hatalar:
+            raise hatalar.pop()
+        return gercek_update(*args, **kwargs)
+
+    monkeypatch.setattr(worksheet, "update", update)
+    kapi.kapi.set()
+
+    assert writer.flush(timeout=5), writer.son_hata
+    _assert_same(worksheet, df)
+
+
+def test_load_returns_queued_model_without_waiting(sheet, writer):
+    worksheet, storage = sheet
+    kapi = _Gate(storage)
+    df = writer.load()
+    df = writer.append(df, _next_entry(df))
+    worksheet.cagrilar.clear()
+
+    assert writer.load() is df
+    assert worksheet.cagrilar == []
+    kapi.kapi.set()
+    assert writer.flush(timeout=5)
+
+
+#
+# --- Günlük ---
+#
+def test_journal_adopts_only_orphaned_journals(tmp_path):
+    yol = str(tmp_path / "gunluk.jsonl")
+    eski = WriteJournal(yol)
+    islem_id = eski.append({"tur": "batch", "istekler": [], "once": 1, "sonra": 1})
+
+    # Sahibi çalışan günlük devralınmaz
+    calisan = WriteJournal(yol)
+    assert calisan.pending() == []
+
+    eski.close()
+    assert os.path.exists(eski.own_path)
+    yeni = WriteJournal(yol)
+    assert [i for i, _ in yeni.pending()] == [islem_id]
+    assert not os.path.exists(eski.own_path)
+    # Devralınan işlem yeni günlükte kalıcıdır
+    yeni.close()
+    assert [i for i, _ in WriteJournal(yol).pending()] == [islem_id]
+    calisan.close()
+    assert not os.path.exists(calisan.own_path)
+
+
+def test_journal_truncates_when_empty(tmp_path):
+    gunluk = WriteJournal(str(tmp_path / "gunluk.jsonl"))
+    idler = [gunluk.append({"tur": "batch", "istekler": [], "once": 1, "sonra": 1}) for _ in range(3)]
+    gunluk.checkpoint(idler[0], 5)
+    gunluk.mark_done(idler[:2])
+    assert os.path.getsize(gunluk.own_path) > 0
+    gunluk.mark_done(idler[2:])
+    assert os.path.getsize(gunluk.own_path) == 0
+
+
+def _previous_session(worksheet, yol, gonderildi):
+    """Bir işlemi planlayıp günlüğe yazar; gonderildi ise E-Tabloya da gönderir (işaretlenmeden çöküş)."""
+    storage = GoogleSheetsStorage(lambda: worksheet)
+    df = storage.load()
+    df, islem = storage.plan_append(df, _next_entry(df))
+    gunluk = WriteJournal(yol)
+    gunluk.append(islem)
+    if gonderildi:
+        storage.execute(islem)
+    gunluk.close()
+    return df
+
+
+@pytest.mark.parametrize("gonderildi", [False, True])
+def test_replay_after_restart(sheet, tmp_path, gonderildi):
+    worksheet, _ = sheet
+    yol = str(tmp_path / "gunluk.jsonl")
+    beklenen = _previous_session(worksheet, yol, gonderildi)
+
+    yazici = WriteBehindStorage(GoogleSheetsStorage(lambda: worksheet), WriteJournal(yol))
+    try:
+        assert yazici.flush(timeout=5), yazici.son_hata
+        # Gönderilmiş işlem satır sayısından anlaşılır ve tekrar gönderilmez
+        _assert_same(worksheet, beklenen)
+        assert format_for_sheets(yazici.load()) == format_for_sheets(beklenen)
+    finally:
+        yazici.stop()
+
+
+def test_replay_stops_on_drift(sheet, tmp_path):
+    worksheet, _ = sheet
+    yol = str(tmp_path / "gunluk.jsonl")
+    _previous_session(worksheet, yol, gonderildi=False)
+    # Arada başka bir yerden iki satır eklendi: satır sayısı işlemin ne öncesine ne sonrasına uyar
+    worksheet.rows += worksheet.rows[-2:]
+    kopya = [list(satir) for satir in worksheet.rows]
+
+    kapi = threading.Event()
+    storage = GoogleSheetsStorage(lambda: worksheet)
+    _Gate(storage).kapi = kapi
+    yazici = WriteBehindStorage(storage, WriteJournal(yol))
+    try:
+        with pytest.raises(PendingWritesError):
+            yazici.load()
+        kapi.set()
+        assert not yazici.flush(timeout=5)
+        assert "satır sayısı" in yazici.son_hata
+        assert worksheet.rows == kopya
+    finally:
+        yazici.stop()